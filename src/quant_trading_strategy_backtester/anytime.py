@@ -0,0 +1,209 @@
+"""
+Contains the deadlines, cancellation tokens and coverage reports that make the
+optimisers anytime algorithms: when a deadline passes or an optimisation is
+cancelled, it stops between evaluations and returns the best result found so
+far, with a report of how much of the search it covered.
+"""
+
+import threading
+import time
+
+# Why an optimisation stopped before covering its whole search.
+STOP_REASONS = ["deadline", "cancelled"]
+
+
+class CancellationToken:
+    """
+    Lets an optimisation be cancelled from another thread, e.g. by a button
+    in the app.
+    """
+
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """
+        Asks the optimisations holding this token to stop.
+        """
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        Returns:
+            Whether the token has been cancelled.
+        """
+        return self._cancelled.is_set()
+
+
+class Deadline:
+    """
+    A wall-clock time limit and cancellation token for an optimisation, which
+    the optimisers check between evaluations.
+
+    Attributes:
+        time_limit: The number of seconds the optimisation may run for from
+                    when the deadline is created, or None for no time limit.
+        cancellation_token: The token to cancel the optimisation with.
+    """
+
+    def __init__(
+        self,
+        time_limit: float | None = None,
+        cancellation_token: CancellationToken | None = None,
+    ):
+        if time_limit is not None and time_limit <= 0:
+            raise ValueError(f"Invalid time limit: {time_limit}")
+
+        self.time_limit = time_limit
+        self.cancellation_token = cancellation_token or CancellationToken()
+        self._expiry_time = (
+            None if time_limit is None else time.monotonic() + time_limit
+        )
+
+    def cancel(self) -> None:
+        """
+        Cancels the optimisation.
+        """
+        self.cancellation_token.cancel()
+
+    def get_expiry_time(self) -> float | None:
+        """
+        Gets the wall-clock time the time limit expires at, e.g. to pass it to
+        a worker process, whose monotonic clock can't be compared.
+
+        Returns:
+            The expiry time as a Unix timestamp, or None for no time limit.
+        """
+        if self._expiry_time is None:
+            return None
+        return time.time() + self._expiry_time - time.monotonic()
+
+    @classmethod
+    def from_expiry_time(cls, expiry_time: float | None) -> "Deadline":
+        """
+        Creates a deadline whose time limit expires at a wall-clock time, e.g.
+        in a worker process. It has its own cancellation token.
+
+        Args:
+            expiry_time: The expiry time as a Unix timestamp, which may have
+                         passed already, or None for no time limit.
+
+        Returns:
+            The deadline.
+        """
+        deadline = cls()
+        if expiry_time is not None:
+            deadline.time_limit = expiry_time - time.time()
+            deadline._expiry_time = time.monotonic() + deadline.time_limit
+        return deadline
+
+    def get_stop_reason(self) -> str | None:
+        """
+        Gets why the optimisation should stop.
+
+        Returns:
+            One of STOP_REASONS, or None if the optimisation can carry on.
+        """
+        if self.cancellation_token.is_cancelled():
+            return "cancelled"
+        if self._expiry_time is not None and time.monotonic() >= self._expiry_time:
+            return "deadline"
+        return None
+
+
+class CoverageReport:
+    """
+    Records how much of its search an optimisation covered, and why it
+    stopped if it didn't cover all of it.
+
+    Attributes:
+        num_evaluated: The number of evaluations completed.
+        num_planned: The number of evaluations in the whole search.
+        stop_reason: One of STOP_REASONS, or None if the search was completed.
+    """
+
+    def __init__(self) -> None:
+        self.num_evaluated = 0
+        self.num_planned = 0
+        self.stop_reason: str | None = None
+
+    @property
+    def is_complete(self) -> bool:
+        return self.stop_reason is None
+
+    def record(
+        self, num_evaluated: int, num_planned: int, stop_reason: str | None
+    ) -> None:
+        """
+        Records the coverage of a finished optimisation.
+
+        Args:
+            num_evaluated: The number of evaluations completed.
+            num_planned: The number of evaluations in the whole search.
+            stop_reason: Why the optimisation stopped early, or None.
+        """
+        self.num_evaluated = num_evaluated
+        self.num_planned = num_planned
+        self.stop_reason = stop_reason
+
+    def get_summary(self) -> str:
+        """
+        Returns:
+            A sentence describing the coverage, for displaying to the user.
+        """
+        if self.is_complete:
+            return f"Completed all {self.num_planned} evaluations."
+        percentage = self.num_evaluated / max(self.num_planned, 1)
+        reason = (
+            "the time limit was reached"
+            if self.stop_reason == "deadline"
+            else "the optimisation was cancelled"
+        )
+        return (
+            f"Completed {self.num_evaluated} / {self.num_planned} evaluations "
+            f"({percentage:.0%}) before {reason}, so the results are the best "
+            "found so far."
+        )
+
+
+def should_stop(deadline: Deadline | None, num_evaluated: int) -> bool:
+    """
+    Checks whether an optimisation should stop before its next evaluation.
+    An optimisation always makes at least one evaluation, so that it has a
+    result to return.
+
+    Args:
+        deadline: The deadline of the optimisation, or None for no deadline.
+        num_evaluated: The number of evaluations completed so far.
+
+    Returns:
+        Whether to stop.
+    """
+    return (
+        deadline is not None
+        and num_evaluated > 0
+        and deadline.get_stop_reason() is not None
+    )
+
+
+def record_coverage(
+    coverage: CoverageReport | None,
+    deadline: Deadline | None,
+    num_evaluated: int,
+    num_planned: int,
+) -> None:
+    """
+    Records the coverage of a finished optimisation, if it's being reported.
+
+    Args:
+        coverage: The report to record the coverage in, or None.
+        deadline: The deadline of the optimisation, or None for no deadline.
+        num_evaluated: The number of evaluations completed.
+        num_planned: The number of evaluations in the whole search.
+    """
+    if coverage is None:
+        return
+    stop_reason = None
+    if num_evaluated < num_planned and deadline is not None:
+        stop_reason = deadline.get_stop_reason()
+    coverage.record(num_evaluated, num_planned, stop_reason)
@@ -17,6 +17,7 @@ from typing import Any, cast
 import polars as pl
 import streamlit as st
 
+from quant_trading_strategy_backtester.anytime import CoverageReport, Deadline
 from quant_trading_strategy_backtester.backtester import is_running_locally
 from quant_trading_strategy_backtester.data import (
     get_full_company_name,
@@ -24,6 +25,7 @@ from quant_trading_strategy_backtester.data import (
     load_yfinance_data_one_ticker,
     load_yfinance_data_two_tickers,
 )
+from quant_trading_strategy_backtester.grid_results import GridResults, TickerRanking
 from quant_trading_strategy_backtester.models import Session, StrategyModel
 from quant_trading_strategy_backtester.optimiser import (
     optimise_buy_and_hold_ticker,
@@ -34,16 +36,21 @@ from quant_trading_strategy_backtester.optimiser import (
     run_optimisation,
 )
 from quant_trading_strategy_backtester.streamlit_ui import (
+    get_search_method,
+    get_time_limit,
     get_user_inputs_except_strategy_params,
     get_user_inputs_for_strategy_params,
 )
 from quant_trading_strategy_backtester.utils import (
+    NUM_CANDIDATE_PAIRS,
     NUM_TOP_COMPANIES_ONE_TICKER,
     NUM_TOP_COMPANIES_TWO_TICKERS,
 )
 from quant_trading_strategy_backtester.visualisation import (
+    display_grid_results,
     display_performance_metrics,
     display_returns_by_month,
+    display_ticker_ranking,
     plot_equity_curve,
     plot_strategy_returns,
 )
@@ -54,6 +61,7 @@ from quant_trading_strategy_backtester.visualisation import (
 def prepare_buy_and_hold_strategy_with_optimisation(
     start_date: datetime.date,
     end_date: datetime.date,
+    deadline: Deadline | None = None,
 ) -> tuple[pl.DataFrame, str, dict[str, Any]]:
     """
     Handles the optimisation process for Buy and Hold strategy.
@@ -63,6 +71,8 @@ def prepare_buy_and_hold_strategy_with_optimisation(
     Args:
         start_date: The start date for historical data.
         end_date: The end date for historical data.
+        deadline: The deadline to stop optimising at, or None for no
+                  deadline.
 
     Returns:
         A tuple containing:
@@ -82,18 +92,28 @@ def prepare_buy_and_hold_strategy_with_optimisation(
         top_companies = get_top_sp500_companies(NUM_TOP_COMPANIES_ONE_TICKER)
 
     # Optimise ticker selection
+    coverage = CoverageReport()
+    ranking = TickerRanking()
     best_ticker, _, _ = optimise_buy_and_hold_ticker(
-        top_companies, start_date, end_date
+        top_companies,
+        start_date,
+        end_date,
+        deadline=deadline,
+        coverage=coverage,
+        ranking=ranking,
     )
 
     # Calculate and display the time taken for optimisation
     end_time = time.time()
     duration = end_time - start_time
     st.success(f"Optimisation complete! Time taken: {duration:.4f} seconds")
+    if not coverage.is_complete:
+        st.warning(coverage.get_summary())
 
     # Display the optimal ticker
     st.header("Optimal Ticker")
     st.write(f"Best performing ticker: {best_ticker}")
+    display_ticker_ranking(ranking)
 
     # Load historical data for the selected ticker
     data = load_yfinance_data_one_ticker(best_ticker, start_date, end_date)
@@ -107,6 +127,8 @@ def prepare_single_ticker_strategy_with_optimisation(
     strategy_type: str,
     strategy_params: dict[str, Any],
     optimise: bool,
+    search_method: str = "grid",
+    deadline: Deadline | None = None,
 ) -> tuple[pl.DataFrame, str, dict[str, Any]]:
     """
     Handles the optimisation process for single ticker strategies.
@@ -120,6 +142,10 @@ def prepare_single_ticker_strategy_with_optimisation(
         strategy_type: The type of strategy being used.
         strategy_params: Initial strategy parameters.
         optimise: Whether to optimise strategy parameters.
+        search_method: How to search the strategy parameters, one of
+                       SEARCH_METHODS.
+        deadline: The deadline to stop optimising at, or None for no
+                  deadline.
 
     Returns:
         A tuple containing:
@@ -139,20 +165,33 @@ def prepare_single_ticker_strategy_with_optimisation(
         top_companies = get_top_sp500_companies(NUM_TOP_COMPANIES_ONE_TICKER)
 
     # Optimise ticker selection
+    ticker_coverage = CoverageReport()
     best_ticker = optimise_single_ticker_strategy_ticker(
-        top_companies, start_date, end_date, strategy_type, strategy_params
+        top_companies,
+        start_date,
+        end_date,
+        strategy_type,
+        strategy_params,
+        deadline=deadline,
+        coverage=ticker_coverage,
     )
 
     # Load historical data for the selected ticker
     data = load_yfinance_data_one_ticker(best_ticker, start_date, end_date)
 
     # Optimise strategy parameters if requested
+    grid_results = GridResults(list(strategy_params.keys()))
+    params_coverage = CoverageReport()
     if optimise:
         best_params, _ = optimise_strategy_params(
             data,
             strategy_type,
             cast(dict[str, range | list[int | float]], strategy_params),
             best_ticker,
+            grid_results=grid_results,
+            search_method=search_method,
+            deadline=deadline,
+            coverage=params_coverage,
         )
     else:
         best_params = {
@@ -164,6 +203,9 @@ def prepare_single_ticker_strategy_with_optimisation(
     end_time = time.time()
     duration = end_time - start_time
     st.success(f"Optimisation complete! Time taken: {duration:.4f} seconds")
+    for coverage in [ticker_coverage, params_coverage]:
+        if not coverage.is_complete:
+            st.warning(coverage.get_summary())
 
     # Display the optimal ticker and parameters (if optimised)
     st.header("Optimal Ticker and Parameters")
@@ -177,6 +219,7 @@ def prepare_single_ticker_strategy_with_optimisation(
             "ticker": best_ticker,
         }
     st.write(result)
+    display_grid_results(grid_results)
 
     return data, best_ticker, best_params
 
@@ -186,6 +229,8 @@ def prepare_pairs_trading_strategy_with_optimisation(
     end_date: datetime.date,
     strategy_params: dict[str, Any],
     optimise: bool,
+    search_method: str = "grid",
+    deadline: Deadline | None = None,
 ) -> tuple[pl.DataFrame, str, dict[str, int | float]]:
     """
     Handles the optimisation process for pairs trading strategy.
@@ -198,6 +243,10 @@ def prepare_pairs_trading_strategy_with_optimisation(
         end_date: The end date for historical data.
         strategy_params: Initial strategy parameters.
         optimise: Whether to optimise strategy parameters.
+        search_method: How to search the strategy parameters, one of
+                       SEARCH_METHODS.
+        deadline: The deadline to stop optimising at, or None for no
+                  deadline.
 
     Returns:
         A tuple containing:
@@ -217,9 +266,20 @@ def prepare_pairs_trading_strategy_with_optimisation(
     with st.spinner("Fetching top S&P 500 companies..."):
         top_companies = get_top_sp500_companies(NUM_TOP_COMPANIES_TWO_TICKERS)
 
-    # Optimise ticker pair selection and strategy parameters
+    # Optimise ticker pair selection and strategy parameters, backtesting
+    # only the pairs that pass screening. Locally, the pairs are split between
+    # a worker process per CPU.
+    coverage = CoverageReport()
     ticker, strategy_params, _ = optimise_pairs_trading_tickers(
-        top_companies, start_date, end_date, strategy_params, optimise
+        top_companies,
+        start_date,
+        end_date,
+        strategy_params,
+        optimise,
+        n_jobs=-1 if is_running_locally() else 1,
+        num_candidate_pairs=NUM_CANDIDATE_PAIRS,
+        deadline=deadline,
+        coverage=coverage,
     )
     ticker1, ticker2 = ticker
 
@@ -227,6 +287,8 @@ def prepare_pairs_trading_strategy_with_optimisation(
     end_time = time.time()
     duration = end_time - start_time
     st.success(f"Optimisation complete! Time taken: {duration:.4f} seconds")
+    if not coverage.is_complete:
+        st.warning(coverage.get_summary())
 
     # Display the optimal tickers and parameters
     st.header("Optimal Tickers and Parameters")
@@ -248,6 +310,8 @@ def prepare_pairs_trading_strategy_with_optimisation(
             start_date,
             end_date,
             [ticker1, ticker2],
+            search_method,
+            deadline,
         )
 
     return data, ticker_display, strategy_params
@@ -259,6 +323,8 @@ def prepare_pairs_trading_strategy_without_optimisation(
     end_date: datetime.date,
     strategy_params: dict[str, Any],
     optimise: bool,
+    search_method: str = "grid",
+    deadline: Deadline | None = None,
 ) -> tuple[pl.DataFrame, str, dict[str, Any]]:
     """
     Handles the pairs trading strategy for user-selected tickers.
@@ -272,6 +338,10 @@ def prepare_pairs_trading_strategy_without_optimisation(
         end_date: The end date for historical data.
         strategy_params: Initial strategy parameters.
         optimise: Whether to optimise strategy parameters.
+        search_method: How to search the strategy parameters, one of
+                       SEARCH_METHODS.
+        deadline: The deadline to stop optimising at, or None for no
+                  deadline.
 
     Returns:
         A tuple containing:
@@ -292,6 +362,8 @@ def prepare_pairs_trading_strategy_without_optimisation(
             start_date,
             end_date,
             [ticker1, ticker2],
+            search_method,
+            deadline,
         )
 
     return data, ticker_display, strategy_params
@@ -304,6 +376,8 @@ def prepare_single_ticker_strategy(
     strategy_type: str,
     strategy_params: dict[str, Any],
     optimise: bool,
+    search_method: str = "grid",
+    deadline: Deadline | None = None,
 ) -> tuple[pl.DataFrame, str, dict[str, Any]]:
     """
     Handles strategies for a single ticker.
@@ -318,6 +392,10 @@ def prepare_single_ticker_strategy(
         strategy_type: The type of strategy being used.
         strategy_params: Initial strategy parameters.
         optimise: Whether to optimise strategy parameters.
+        search_method: How to search the strategy parameters, one of
+                       SEARCH_METHODS.
+        deadline: The deadline to stop optimising at, or None for no
+                  deadline.
 
     Returns:
         A tuple containing:
@@ -331,13 +409,30 @@ def prepare_single_ticker_strategy(
 
     if optimise and strategy_type != "Buy and Hold":
         strategy_params, _ = run_optimisation(
-            data, strategy_type, strategy_params, start_date, end_date, ticker
+            data,
+            strategy_type,
+            strategy_params,
+            start_date,
+            end_date,
+            ticker,
+            search_method,
+            deadline,
         )
     elif optimise and strategy_type == "Buy and Hold":
         top_companies = get_top_sp500_companies(NUM_TOP_COMPANIES_ONE_TICKER)
+        coverage = CoverageReport()
+        ranking = TickerRanking()
         best_ticker, strategy_params, _ = optimise_buy_and_hold_ticker(
-            top_companies, start_date, end_date
+            top_companies,
+            start_date,
+            end_date,
+            deadline=deadline,
+            coverage=coverage,
+            ranking=ranking,
         )
+        if not coverage.is_complete:
+            st.warning(coverage.get_summary())
+        display_ticker_ranking(ranking)
         ticker = best_ticker
         ticker_display = best_ticker
         data = load_yfinance_data_one_ticker(ticker, start_date, end_date)
@@ -461,6 +556,13 @@ def main():
         get_user_inputs_except_strategy_params()
     )
     optimise, strategy_params = get_user_inputs_for_strategy_params(strategy_type)
+    search_method = (
+        get_search_method() if optimise and strategy_type != "Buy and Hold" else "grid"
+    )
+    # The time limit applies to the whole optimisation, so the deadline is
+    # set before any of it starts.
+    time_limit = get_time_limit() if optimise or auto_select_tickers else None
+    deadline = Deadline(time_limit)
 
     # Initialise company names
     company_name1 = None
@@ -470,7 +572,12 @@ def main():
     if strategy_type == "Pairs Trading" and auto_select_tickers:
         data, ticker_display, strategy_params = (
             prepare_pairs_trading_strategy_with_optimisation(
-                start_date, end_date, strategy_params, optimise
+                start_date,
+                end_date,
+                strategy_params,
+                optimise,
+                search_method,
+                deadline,
             )
         )
         # Update company names with the selected pair
@@ -485,6 +592,8 @@ def main():
                 end_date,
                 strategy_params,
                 optimise,
+                search_method,
+                deadline,
             )
         )
         ticker1, ticker2 = cast(tuple[str, str], ticker)
@@ -497,7 +606,13 @@ def main():
     ):
         data, ticker_display, strategy_params = (
             prepare_single_ticker_strategy_with_optimisation(
-                start_date, end_date, strategy_type, strategy_params, optimise
+                start_date,
+                end_date,
+                strategy_type,
+                strategy_params,
+                optimise,
+                search_method,
+                deadline,
             )
         )
         company_name1 = get_full_company_name(ticker_display)
@@ -509,6 +624,8 @@ def main():
             strategy_type,
             strategy_params,
             optimise,
+            search_method,
+            deadline,
         )
         company_name1 = get_full_company_name(ticker_display)
 
@@ -16,6 +16,10 @@ import streamlit as st
 
 from quant_trading_strategy_backtester.models import Session
 from quant_trading_strategy_backtester.models import StrategyModel as StrategyModel
+from quant_trading_strategy_backtester.results_writer import (
+    ResultsWriter,
+    make_result_row,
+)
 from quant_trading_strategy_backtester.strategies.base import BaseStrategy
 
 
@@ -31,6 +35,52 @@ def is_running_locally() -> bool:
     return bool(platform.processor())
 
 
+def get_asset_returns_expr(columns: list[str]) -> pl.Expr:
+    """
+    Builds the expression for the daily asset returns of the price data. For
+    pairs trading, this is the return of the long asset 1, short asset 2
+    spread.
+
+    Args:
+        columns: The columns of the price data.
+
+    Returns:
+        An expression that evaluates to the asset returns.
+    """
+    # Pairs trading
+    if "Close_1" in columns and "Close_2" in columns:
+        return (pl.col("Close_1") - pl.col("Close_1").shift(1)) / pl.col(
+            "Close_1"
+        ).shift(1) - (pl.col("Close_2") - pl.col("Close_2").shift(1)) / pl.col(
+            "Close_2"
+        ).shift(1)
+    # Single asset trading
+    if "Close" in columns:
+        return (pl.col("Close") - pl.col("Close").shift(1)) / pl.col("Close").shift(1)
+
+    raise ValueError("Data does not contain required 'Close' columns")
+
+
+def get_strategy_returns_expr(positions: pl.Expr, asset_returns: pl.Expr) -> pl.Expr:
+    """
+    Builds the expression for the daily strategy returns, which are the asset
+    returns earned by the previous day's positions.
+
+    Args:
+        positions: An expression for the strategy's positions.
+        asset_returns: An expression for the asset returns.
+
+    Returns:
+        An expression that evaluates to the strategy returns.
+    """
+    # Handle potential NaN or inf values
+    return (
+        (positions.shift(1) * asset_returns)
+        .replace({float("inf"): None, float("-inf"): None})
+        .fill_null(0)
+    )
+
+
 class Backtester:
     """
     Backtests trading strategies.
@@ -44,6 +94,9 @@ class Backtester:
         initial_capital: The initial capital for the backtest.
         results: The results of the backtest (initialised after running).
         tickers: The ticker or tickers used in the backtest.
+        persist: Whether to save the results when the backtest is run.
+        results_writer: An optional write-behind writer that batches saves to
+                        the database instead of committing on every run.
     """
 
     def __init__(
@@ -53,6 +106,8 @@ class Backtester:
         initial_capital: float = 100000.0,
         session=None,
         tickers: str | list[str] | None = None,
+        persist: bool = True,
+        results_writer: ResultsWriter | None = None,
     ) -> None:
         self.data = data
         self.strategy = strategy
@@ -60,74 +115,63 @@ class Backtester:
         self.results: None | pl.DataFrame = None
         self.session = session or Session()
         self.tickers = tickers
+        self.persist = persist
+        self.results_writer = results_writer
 
     def run(self) -> pl.DataFrame:
         """
         Runs the backtest.
 
-        Generates trading signals using the strategy, calculates returns,
-        stores the results, and saves them to the database.
+        Composes the strategy's lazy signal plan with the returns calculation
+        into a single query plan, collects it once, stores the results, and
+        saves them to the database if persistence is enabled.
 
         Returns:
             A DataFrame containing the backtest results.
         """
-        signals = self.strategy.generate_signals(self.data)
-        self.results = self._calculate_returns(signals)
-        self.save_results()
+        signals = self.strategy.generate_signals_lazy(self.data.lazy())
+        self.results = self._calculate_returns(signals).collect()
+        if self.persist:
+            self.save_results()
         return self.results
 
-    def _calculate_returns(self, signals: pl.DataFrame) -> pl.DataFrame:
+    def _calculate_returns(self, signals: pl.LazyFrame) -> pl.LazyFrame:
         """
         Calculates returns based on the generated signals.
 
         Computes asset returns, strategy returns, cumulative returns, and the
-        equity curve.
+        equity curve as a lazy query plan on top of the signals.
 
         Args:
-            signals: The trading signals generated by the strategy.
+            signals: A lazy plan of the trading signals generated by the
+                     strategy.
 
         Returns:
-            A DataFrame containing calculated returns and related metrics.
+            A LazyFrame that evaluates to the calculated returns and related
+            metrics.
         """
         # Ensure 'Date' column is present in signals DataFrame
-        if "Date" not in signals.columns:
+        if "Date" not in signals.collect_schema().names():
             raise ValueError("'Date' column is missing from the signals DataFrame")
 
-        # Pairs trading
-        if "Close_1" in self.data.columns and "Close_2" in self.data.columns:
-            asset_returns = (
-                self.data["Close_1"] - self.data["Close_1"].shift(1)
-            ) / self.data["Close_1"].shift(1) - (
-                self.data["Close_2"] - self.data["Close_2"].shift(1)
-            ) / self.data["Close_2"].shift(1)
-        # Single asset trading
-        elif "Close" in self.data.columns:
-            asset_returns = (
-                self.data["Close"] - self.data["Close"].shift(1)
-            ) / self.data["Close"].shift(1)
-        else:
-            raise ValueError("Data does not contain required 'Close' columns")
+        asset_returns = get_asset_returns_expr(self.data.columns)
 
-        portfolio = signals.with_columns(
-            [
-                pl.col("positions"),
-                asset_returns.alias("asset_returns"),
-                (pl.col("positions").shift(1) * asset_returns).alias(
-                    "strategy_returns"
-                ),
-            ]
+        # Asset returns come from the raw data rather than the signals, so
+        # strategies don't have to carry the price columns through.
+        portfolio = pl.concat(
+            [signals, self.data.lazy().select(asset_returns.alias("asset_returns"))],
+            how="horizontal",
         )
 
-        # Handle potential NaN or inf values
         portfolio = portfolio.with_columns(
             [
-                pl.col("strategy_returns")
-                .replace({float("inf"): None, float("-inf"): None})
-                .fill_null(0)
+                get_strategy_returns_expr(
+                    pl.col("positions"), pl.col("asset_returns")
+                ).alias("strategy_returns")
             ]
         )
 
-        portfolio = portfolio.with_columns(
+        return portfolio.with_columns(
             [
                 (1 + pl.col("strategy_returns")).cum_prod().alias("cumulative_returns"),
                 (
@@ -136,8 +180,6 @@ class Backtester:
             ]
         )
 
-        return portfolio
-
     def get_performance_metrics(self) -> dict[str, float] | None:
         """
         Calculates key performance metrics from the trading strategy backtest.
@@ -180,7 +222,8 @@ class Backtester:
     def save_results(self) -> None:
         """
         Saves the strategy and its backtest results to either the local database
-        or session state, depending on the environment.
+        or session state, depending on the environment. Database saves are
+        queued on the results writer if one was provided.
         """
         metrics = self.get_performance_metrics()
         if metrics is None:
@@ -211,7 +254,18 @@ class Backtester:
         start_date = date(start_date_row[0], start_date_row[1], start_date_row[2])
         end_date = date(end_date_row[0], end_date_row[1], end_date_row[2])
 
-        if is_running_locally():
+        if is_running_locally() and self.results_writer is not None:
+            self.results_writer.enqueue(
+                make_result_row(
+                    strategy_name,
+                    strategy_params,
+                    metrics,
+                    self.tickers,
+                    start_date,
+                    end_date,
+                )
+            )
+        elif is_running_locally():
             try:
                 # Check if a strategy with the same name, parameters, and date
                 # range already exists
@@ -0,0 +1,196 @@
+"""
+Contains a sequential model-based search of strategy parameters, for
+parameter spaces too large or too fine to search exhaustively, such as
+continuous z-score thresholds.
+
+The search is a tree-structured Parzen estimator (TPE). The parameter
+combinations evaluated so far are split into the best fraction and the rest
+by Sharpe ratio, a kernel density is fitted to each, and the next
+combinations proposed are those most likely under the density of the best
+relative to the density of the rest.
+"""
+
+import math
+from typing import Any
+
+import numpy as np
+
+# The default number of parameter combinations a search evaluates.
+DEFAULT_MAX_EVALUATIONS = 100
+# The default number of combinations proposed at once, which are evaluated
+# together in one vectorised pass.
+DEFAULT_BATCH_SIZE = 10
+# The number of combinations drawn at random before the densities are fitted.
+NUM_INITIAL_POINTS = 10
+# The fraction of the evaluated combinations that are treated as the best.
+GOOD_FRACTION = 0.25
+# The number of candidates drawn from the density of the best combinations
+# for each combination proposed.
+NUM_CANDIDATES = 24
+# The narrowest kernel, as a fraction of the width of each parameter's bounds,
+# so the search doesn't collapse onto the first good combinations it finds.
+MIN_BANDWIDTH = 0.2
+# The number of decimal places non-integer parameters are rounded to, so that
+# proposals can be deduplicated and their results cached.
+FLOAT_DECIMALS = 3
+
+
+class TreeParzenEstimator:
+    """
+    Proposes strategy parameter combinations to evaluate within bounds, from
+    the results of the combinations evaluated so far.
+
+    Parameters with integer bounds take integer values, and the others are
+    searched continuously. Combinations are never proposed twice.
+
+    Attributes:
+        param_names: The names of the strategy parameters.
+        bounds: The lowest and highest value of each parameter.
+    """
+
+    def __init__(
+        self,
+        bounds: dict[str, tuple[int | float, int | float]],
+        seed: int | None = None,
+    ):
+        for name, (low, high) in bounds.items():
+            if low > high:
+                raise ValueError(f"Invalid bounds for {name}: ({low}, {high})")
+
+        self.param_names = list(bounds)
+        self.bounds = bounds
+        self._low = np.array([low for low, _ in bounds.values()], dtype=np.float64)
+        self._width = np.array(
+            [high - low for low, high in bounds.values()], dtype=np.float64
+        )
+        self._is_integer = np.array(
+            [
+                isinstance(low, int) and isinstance(high, int)
+                for low, high in bounds.values()
+            ]
+        )
+        self._rng = np.random.default_rng(seed)
+        # The evaluated combinations, scaled to the unit cube, and their
+        # Sharpe ratios.
+        self._points: list[np.ndarray] = []
+        self._scores: list[float] = []
+        self._seen: set[tuple] = set()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def observe(self, param_combinations: list[tuple], sharpe_ratios: Any) -> None:
+        """
+        Records the results of evaluated parameter combinations.
+
+        Args:
+            param_combinations: The values of the parameters in each
+                                combination.
+            sharpe_ratios: The Sharpe ratio of each combination, in order,
+                           which may be NaN.
+        """
+        for params, sharpe_ratio in zip(param_combinations, sharpe_ratios):
+            self._points.append(self._to_unit(np.array(params, dtype=np.float64)))
+            self._scores.append(
+                float("-inf")
+                if sharpe_ratio is None or math.isnan(sharpe_ratio)
+                else float(sharpe_ratio)
+            )
+            self._seen.add(tuple(params))
+
+    def suggest(self, num_suggestions: int) -> list[tuple]:
+        """
+        Proposes parameter combinations that haven't been evaluated yet.
+
+        Args:
+            num_suggestions: The number of combinations to propose.
+
+        Returns:
+            Up to num_suggestions distinct combinations, in order of how
+            promising they are. Fewer are returned if the combinations with
+            integer parameters run out.
+        """
+        if len(self._points) < NUM_INITIAL_POINTS:
+            candidates = self._rng.random(
+                (num_suggestions * NUM_CANDIDATES, len(self.param_names))
+            )
+        else:
+            # Each proposal is the most promising of its own pool of
+            # candidates, so a batch of proposals doesn't all crowd around the
+            # single most promising point.
+            good, bad = self._split_points()
+            pools = self._sample(good, num_suggestions * NUM_CANDIDATES).reshape(
+                num_suggestions, NUM_CANDIDATES, -1
+            )
+            scores = self._log_density(pools, good) - self._log_density(pools, bad)
+            order = np.argsort(-scores, axis=1, kind="stable")
+            # Take the best candidate of every pool first, then the second
+            # best, etc., in case some have been evaluated already.
+            candidates = np.take_along_axis(pools, order[..., None], axis=1)
+            candidates = candidates.transpose(1, 0, 2).reshape(
+                -1, len(self.param_names)
+            )
+
+        suggestions = []
+        suggested = set()
+        for candidate in candidates:
+            params = self._from_unit(candidate)
+            if params in self._seen or params in suggested:
+                continue
+            suggestions.append(params)
+            suggested.add(params)
+            if len(suggestions) == num_suggestions:
+                break
+        return suggestions
+
+    def _split_points(self) -> tuple[np.ndarray, np.ndarray]:
+        # Splits the evaluated combinations into the best and the rest, with
+        # ties broken by the order they were evaluated in.
+        order = np.argsort(-np.array(self._scores), kind="stable")
+        num_good = max(1, math.ceil(GOOD_FRACTION * len(order)))
+        points = np.array(self._points)
+        return points[order[:num_good]], points[order[num_good:]]
+
+    def _get_bandwidth(self, points: np.ndarray) -> np.ndarray:
+        # Scott's rule for each parameter, within [MIN_BANDWIDTH, 1].
+        num_points, num_params = points.shape
+        spread = points.std(axis=0) if num_points > 1 else np.ones(num_params)
+        return np.clip(
+            spread * num_points ** (-1 / (num_params + 4)), MIN_BANDWIDTH, 1.0
+        )
+
+    def _sample(self, points: np.ndarray, num_samples: int) -> np.ndarray:
+        # Draws from a mixture of a Gaussian kernel around each point and a
+        # uniform prior over the whole space, so no region is ruled out.
+        bandwidth = self._get_bandwidth(points)
+        components = self._rng.integers(0, len(points) + 1, num_samples)
+        from_prior = components == len(points)
+        centres = points[np.minimum(components, len(points) - 1)]
+        samples = centres + self._rng.normal(size=centres.shape) * bandwidth
+        samples[from_prior] = self._rng.random((int(from_prior.sum()), points.shape[1]))
+        # Reflect samples off the bounds rather than clipping them, so they
+        # don't pile up on the bounds.
+        return np.clip(1 - np.abs(1 - np.abs(samples)), 0.0, 1.0)
+
+    def _log_density(self, samples: np.ndarray, points: np.ndarray) -> np.ndarray:
+        # The log density of the mixture _sample draws from, with the uniform
+        # prior weighted as one more point.
+        if len(points) == 0:
+            return np.zeros(samples.shape[:-1])
+        bandwidth = self._get_bandwidth(points)
+        distances = (samples[..., None, :] - points) / bandwidth
+        kernels = np.exp(-0.5 * (distances**2).sum(axis=-1)) / np.prod(
+            np.sqrt(2 * np.pi) * bandwidth
+        )
+        return np.log((kernels.sum(axis=-1) + 1.0) / (len(points) + 1))
+
+    def _to_unit(self, values: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self._width > 0, (values - self._low) / self._width, 0.0)
+
+    def _from_unit(self, point: np.ndarray) -> tuple:
+        values = self._low + point * self._width
+        return tuple(
+            int(round(value)) if is_integer else round(float(value), FLOAT_DECIMALS)
+            for value, is_integer in zip(values, self._is_integer)
+        )
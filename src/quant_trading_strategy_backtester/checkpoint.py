@@ -0,0 +1,200 @@
+"""
+Contains checkpoints for long optimisations over many tickers or pairs of
+tickers, so that an optimisation interrupted by a Streamlit rerun, a crash or
+a redeploy resumes from where it left off on the next identical request,
+rather than starting over.
+
+Each checkpoint is keyed by a hash of the optimisation request, and holds the
+best parameters and performance metrics of every item evaluated so far, from
+which the leaderboard of the items is rebuilt on resuming. The checkpoint is
+written periodically while the optimisation runs, and deleted once it has
+evaluated every item. Checkpoints of interrupted optimisations that are never
+repeated, e.g. with other dates, are deleted once they haven't been written to
+for longer than their time to live.
+"""
+
+import datetime
+import hashlib
+import json
+import math
+import time
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from quant_trading_strategy_backtester import models
+from quant_trading_strategy_backtester.models import OptimisationCheckpointModel
+from quant_trading_strategy_backtester.result_cache import ENGINE_VERSION
+
+# How often a checkpoint is written while an optimisation runs, in seconds.
+CHECKPOINT_INTERVAL = 10.0
+# How long after it was last written a checkpoint is kept, before it's
+# deleted as the checkpoint of an optimisation that won't be resumed.
+CHECKPOINT_TTL = datetime.timedelta(days=7)
+
+
+def get_checkpoint_key(optimiser: str, request: dict[str, Any]) -> str:
+    """
+    Hashes an optimisation request, for keying its checkpoint.
+
+    Args:
+        optimiser: The name of the optimiser.
+        request: Everything the result of the optimisation depends on, e.g.
+                 the tickers, dates and strategy parameters.
+
+    Returns:
+        The hex digest of the SHA-256 hash of the request.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [ENGINE_VERSION, optimiser, request], sort_keys=True, default=_to_json
+        ).encode()
+    ).hexdigest()
+
+
+class Checkpoint:
+    """
+    Records the result of each item evaluated by an optimisation, writing
+    them to the database in batches.
+
+    Attributes:
+        checkpoint_key: The key of the checkpoint, from get_checkpoint_key.
+        interval: How often to write the results recorded since the last
+                  write, in seconds.
+        ttl: How long after they were last written checkpoints are kept.
+    """
+
+    def __init__(
+        self,
+        checkpoint_key: str,
+        session_factory: Callable[[], Any] | None = None,
+        interval: float = CHECKPOINT_INTERVAL,
+        ttl: datetime.timedelta = CHECKPOINT_TTL,
+    ):
+        self.checkpoint_key = checkpoint_key
+        self.interval = interval
+        self.ttl = ttl
+        self._session_factory = session_factory
+        self._pending: list[dict[str, Any]] = []
+        self._last_write_time = time.monotonic()
+
+    def load(
+        self,
+    ) -> dict[Hashable, tuple[dict[str, Any], dict[str, float]] | None]:
+        """
+        Loads the results of the items evaluated before the optimisation was
+        interrupted, first deleting every checkpoint that hasn't been written
+        to for longer than the time to live, including this one.
+
+        Returns:
+            A dictionary of the evaluated items to their best parameters and
+            performance metrics, or None if the item had no data. Pairs of
+            tickers are returned as tuples.
+        """
+        expiry_time = datetime.datetime.now() - self.ttl
+        with models.session_scope(self._session_factory) as session:
+            stale_keys = (
+                select(OptimisationCheckpointModel.checkpoint_key)
+                .group_by(OptimisationCheckpointModel.checkpoint_key)
+                .having(func.max(OptimisationCheckpointModel.created_at) <= expiry_time)
+            )
+            session.query(OptimisationCheckpointModel).filter(
+                OptimisationCheckpointModel.checkpoint_key.in_(stale_keys)
+            ).delete(synchronize_session=False)
+            session.commit()
+
+            rows = session.query(
+                OptimisationCheckpointModel.item,
+                OptimisationCheckpointModel.parameters,
+                OptimisationCheckpointModel.metrics,
+            ).filter(OptimisationCheckpointModel.checkpoint_key == self.checkpoint_key)
+            results: dict[Hashable, tuple[dict[str, Any], dict[str, float]] | None] = {}
+            for item_json, parameters, metrics in rows:
+                item = json.loads(item_json)
+                results[tuple(item) if isinstance(item, list) else item] = (
+                    None
+                    if parameters is None
+                    else (parameters, _from_json_metrics(metrics))
+                )
+            return results
+
+    def add(
+        self,
+        item: Hashable,
+        result: tuple[dict[str, Any], dict[str, float]] | None,
+    ) -> None:
+        """
+        Records the result of an evaluated item, writing the checkpoint if
+        it's due.
+
+        Args:
+            item: The evaluated item, e.g. a ticker or pair of tickers.
+            result: The best parameters and performance metrics of the item,
+                    or None if it had no data.
+        """
+        params, metrics = (None, None) if result is None else result
+        self._pending.append(
+            {
+                "checkpoint_key": self.checkpoint_key,
+                "item": json.dumps(item),
+                "parameters": params,
+                "metrics": None if metrics is None else _to_json_metrics(metrics),
+                "created_at": datetime.datetime.now(),
+            }
+        )
+        if time.monotonic() - self._last_write_time >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the results recorded since the last write.
+        """
+        self._last_write_time = time.monotonic()
+        if not self._pending:
+            return
+
+        with models.session_scope(self._session_factory) as session:
+            session.execute(
+                insert(OptimisationCheckpointModel).on_conflict_do_nothing(),
+                self._pending,
+            )
+            session.commit()
+            self._pending = []
+
+    def delete(self) -> None:
+        """
+        Deletes the checkpoint, once the optimisation has evaluated every
+        item.
+        """
+        self._pending = []
+        with models.session_scope(self._session_factory) as session:
+            session.query(OptimisationCheckpointModel).filter(
+                OptimisationCheckpointModel.checkpoint_key == self.checkpoint_key
+            ).delete()
+            session.commit()
+
+
+def _to_json(value: Any) -> Any:
+    # Serialises the values in a request that JSON doesn't support.
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, range):
+        return list(value)
+    raise TypeError(f"Can't serialise {type(value).__name__} in a checkpoint key")
+
+
+def _to_json_metrics(metrics: dict[str, float]) -> dict[str, float | None]:
+    # JSON has no NaN, so NaN metrics are stored as nulls.
+    return {
+        name: None if value is None or math.isnan(value) else float(value)
+        for name, value in metrics.items()
+    }
+
+
+def _from_json_metrics(metrics: dict[str, float | None]) -> dict[str, float]:
+    return {
+        name: float("nan") if value is None else value
+        for name, value in metrics.items()
+    }
@@ -0,0 +1,152 @@
+"""
+Contains a persistent cache of company metadata from Yahoo Finance, such as
+market caps and company names.
+
+Fetching a ticker's metadata is a slow request, so the fetched fields are
+kept in the database and reused until they're older than their time to live.
+Missing or stale tickers are refreshed in bulk, with the requests made
+concurrently within the Yahoo Finance rate limits and the results written in
+a single transaction.
+"""
+
+import datetime
+from collections.abc import Callable
+from typing import Any
+
+import yfinance as yf
+
+from quant_trading_strategy_backtester import models
+from quant_trading_strategy_backtester.failed_tickers import (
+    get_failed_tickers,
+    record_failed_tickers,
+)
+from quant_trading_strategy_backtester.fetching import yahoo_finance_fetcher
+from quant_trading_strategy_backtester.models import CompanyMetadataModel
+from quant_trading_strategy_backtester.utils import logger
+
+# How long each field is reused before it's fetched again. Company names
+# rarely change, while market caps move every trading day.
+METADATA_TTLS = {
+    "long_name": datetime.timedelta(days=30),
+    "market_cap": datetime.timedelta(days=1),
+}
+# The key of each field in the Yahoo Finance ticker info.
+INFO_KEYS = {
+    "long_name": "longName",
+    "market_cap": "marketCap",
+}
+# The keys in the info of every ticker Yahoo Finance knows. For tickers it
+# doesn't know, the info isn't empty, e.g. {"trailingPegRatio": None}, but
+# has none of these.
+IDENTIFYING_INFO_KEYS = ["quoteType", "longName", "shortName"]
+
+
+def get_company_metadata(
+    tickers: list[str],
+    fields: list[str] | None = None,
+    force_refresh: bool = False,
+    session_factory: Callable[[], Any] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Gets metadata fields for many tickers from the database, refreshing the
+    tickers with any of the fields missing or stale from Yahoo Finance.
+
+    If a refresh fails, the stale fields are returned instead. Tickers that
+    Yahoo Finance has no info for are recorded as failed tickers, and aren't
+    refreshed again until the failure expires.
+
+    Args:
+        tickers: The stock ticker symbols.
+        fields: The fields to get, from METADATA_TTLS. Defaults to all fields.
+        force_refresh: Whether to refresh every ticker, even if its fields are
+                       up to date.
+        session_factory: The session factory for the database. Defaults to the
+                         app's database session.
+
+    Returns:
+        A dictionary of tickers to the values of their fields, for each ticker
+        with metadata available. A field is None if Yahoo Finance doesn't have
+        it for the ticker.
+    """
+    fields = fields or list(METADATA_TTLS)
+    for field in fields:
+        if field not in METADATA_TTLS:
+            raise ValueError(f"Unexpected metadata field: {field}")
+    tickers = list(dict.fromkeys(tickers))
+
+    with models.session_scope(session_factory) as session:
+        rows = {
+            ticker: row
+            for ticker, row in session.query(
+                CompanyMetadataModel.ticker, CompanyMetadataModel
+            ).filter(CompanyMetadataModel.ticker.in_(tickers))
+        }
+        now = datetime.datetime.now()
+        stale_tickers = [
+            ticker
+            for ticker in tickers
+            if force_refresh
+            or ticker not in rows
+            or any(_is_stale(rows[ticker], field, now) for field in fields)
+        ]
+        # Tickers that Yahoo Finance recently had no info for are skipped,
+        # unless every ticker is being refreshed.
+        if not force_refresh:
+            failed_tickers = get_failed_tickers(stale_tickers, session_factory)
+            stale_tickers = [t for t in stale_tickers if t not in failed_tickers]
+
+        tickers_without_info = []
+        if stale_tickers:
+            for ticker, info in _fetch_company_info(stale_tickers).items():
+                if not _is_known_ticker(info):
+                    tickers_without_info.append(ticker)
+                if ticker not in rows:
+                    rows[ticker] = CompanyMetadataModel(ticker=ticker)
+                    session.add(rows[ticker])
+                # A single info request has every field, so all of them are
+                # refreshed.
+                for field, key in INFO_KEYS.items():
+                    setattr(rows[ticker], field, info.get(key))
+                    setattr(rows[ticker], f"{field}_updated_at", now)
+
+        # Read the values before committing, which expires the loaded rows.
+        metadata = {
+            ticker: {field: getattr(rows[ticker], field) for field in fields}
+            for ticker in tickers
+            if ticker in rows
+        }
+        session.commit()
+        record_failed_tickers(
+            {ticker: "No company info found" for ticker in tickers_without_info},
+            session_factory,
+        )
+        return metadata
+
+
+def _is_known_ticker(info: dict[str, Any]) -> bool:
+    return any(info.get(key) is not None for key in IDENTIFYING_INFO_KEYS)
+
+
+def _is_stale(row: CompanyMetadataModel, field: str, now: datetime.datetime) -> bool:
+    updated_at = getattr(row, f"{field}_updated_at")
+    return updated_at is None or now - updated_at > METADATA_TTLS[field]
+
+
+def _fetch_company_info(tickers: list[str]) -> dict[str, dict[str, Any]]:
+    # Fetch the info concurrently, within the limits of the shared Yahoo
+    # Finance fetcher.
+    results = yahoo_finance_fetcher.fetch_many_sync(
+        _get_ticker_info, [(ticker,) for ticker in tickers]
+    )
+
+    company_info = {}
+    for ticker, result in zip(tickers, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to fetch company info for {ticker}: {result}")
+        else:
+            company_info[ticker] = result
+    return company_info
+
+
+def _get_ticker_info(ticker: str) -> dict[str, Any]:
+    return yf.Ticker(ticker).info
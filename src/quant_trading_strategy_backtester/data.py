@@ -4,38 +4,66 @@ Yahoo Finance and Wikipedia.
 """
 
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import polars as pl
 import streamlit as st
 import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError, YFTzMissingError
+
+from quant_trading_strategy_backtester.company_metadata import get_company_metadata
+from quant_trading_strategy_backtester.failed_tickers import (
+    get_failed_tickers,
+    normalise_ticker,
+    record_failed_tickers,
+)
+from quant_trading_strategy_backtester.fetching import yahoo_finance_fetcher
+from quant_trading_strategy_backtester.price_store import PriceStore
+from quant_trading_strategy_backtester.universe import UniverseSnapshotStore
 from quant_trading_strategy_backtester.utils import logger
 
+# The directory of the local price store can be overridden with this
+# environment variable.
+PRICE_STORE_DIR_ENV_VAR = "PRICE_STORE_DIR"
+DEFAULT_PRICE_STORE_DIR = "price_store"
+# The number of tickers iter_yfinance_data_many_tickers loads from the price
+# store at a time, fetching any missing dates for them from Yahoo Finance in
+# one batched download, while the previous chunk is processed.
+BULK_DOWNLOAD_CHUNK_SIZE = 20
+# The source of the S&P 500 constituents can be overridden with this
+# environment variable, e.g. to use a local CSV file.
+SP500_SOURCE_ENV_VAR = "SP500_SOURCE"
+DEFAULT_SP500_SOURCE = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+# The directory of the S&P 500 snapshots can be overridden with this
+# environment variable.
+UNIVERSE_SNAPSHOT_DIR_ENV_VAR = "UNIVERSE_SNAPSHOT_DIR"
+DEFAULT_UNIVERSE_SNAPSHOT_DIR = "universe_snapshots"
+# How old the latest S&P 500 snapshot can be before a new one is built.
+SP500_SNAPSHOT_MAX_AGE = datetime.timedelta(days=7)
+
 
 @st.cache_data
 def load_yfinance_data_one_ticker(
     ticker: str, start_date: datetime.date, end_date: datetime.date
 ) -> pl.DataFrame:
     """
-    Fetches historical stock data for a ticker from Yahoo Finance.
+    Loads historical stock data for a ticker from the local price store,
+    fetching any dates it doesn't have yet from Yahoo Finance.
 
     Args:
         ticker: The stock ticker symbol.
         start_date: The start date for the data.
-        end_date: The end date for the data.
+        end_date: The end date for the data (inclusive).
 
     Returns:
         A Polars DataFrame containing the historical stock data.
     """
-    data = yf.download(ticker, start=start_date, end=end_date)
-    # Handle MultiIndex columns by taking just the first level
-    if isinstance(data.columns, pd.MultiIndex):
-        data.columns = data.columns.get_level_values(0)
-    # Reset index to make Date a regular column
-    data = data.reset_index()
-
-    return pl.from_pandas(data)
+    return get_price_store().load(ticker, start_date, end_date)
 
 
 @st.cache_data
@@ -43,36 +71,333 @@ def load_yfinance_data_two_tickers(
     ticker1: str, ticker2: str, start_date: datetime.date, end_date: datetime.date
 ) -> pl.DataFrame:
     """
-    Fetches historical stock data for two tickers from Yahoo Finance.
+    Loads historical stock data for two tickers from the local price store,
+    fetching any dates it doesn't have yet from Yahoo Finance.
 
     Args:
         ticker1: The first stock ticker symbol.
         ticker2: The second stock ticker symbol.
         start_date: The start date for the data.
-        end_date: The end date for the data.
+        end_date: The end date for the data (inclusive).
 
     Returns:
-        A Polars DataFrame containing the historical stock data for both tickers.
-    """
-    data1 = yf.download(ticker1, start=start_date, end=end_date)
-    data2 = yf.download(ticker2, start=start_date, end=end_date)
-    data1 = data1.reset_index()
-    data2 = data2.reset_index()
-    combined_data = pl.DataFrame(
-        {
-            "Date": pl.from_pandas(data1["Date"]),
-            "Close_1": pl.from_pandas(data1["Close"]),
-            "Close_2": pl.from_pandas(data2["Close"]),
-        }
+        A Polars DataFrame containing the historical stock data for both
+        tickers, on the dates that both of them traded.
+    """
+    price_store = get_price_store()
+    data1 = price_store.load(ticker1, start_date, end_date)
+    data2 = price_store.load(ticker2, start_date, end_date)
+    combined_data = (
+        data1.select("Date", pl.col("Close").alias("Close_1"))
+        .join(data2.select("Date", pl.col("Close").alias("Close_2")), on="Date")
+        .sort("Date")
     )
 
     return combined_data
 
 
+def iter_yfinance_data_many_tickers(
+    tickers: list[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    chunk_size: int = BULK_DOWNLOAD_CHUNK_SIZE,
+) -> Iterator[tuple[str, pl.DataFrame]]:
+    """
+    Loads historical stock data for many tickers from the local price store in
+    chunks, fetching any dates it doesn't have yet for the tickers in a chunk
+    from Yahoo Finance in one batched download.
+
+    The next chunk is loaded in the background while the data for the current
+    chunk is being processed, so that fetching overlaps with computation.
+
+    Args:
+        tickers: The stock ticker symbols.
+        start_date: The start date for the data.
+        end_date: The end date for the data (inclusive).
+        chunk_size: The number of tickers to load per chunk.
+
+    Yields:
+        Each ticker and a Polars DataFrame containing its historical stock
+        data, which is empty if there's no data, in the order given.
+    """
+    price_store = get_price_store()
+    chunks = [tickers[i : i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    if not chunks:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        next_chunk = executor.submit(
+            price_store.load_many, chunks[0], start_date, end_date
+        )
+        for i, chunk in enumerate(chunks):
+            data_by_ticker = next_chunk.result()
+            if i + 1 < len(chunks):
+                next_chunk = executor.submit(
+                    price_store.load_many, chunks[i + 1], start_date, end_date
+                )
+            for ticker in chunk:
+                yield ticker, data_by_ticker[ticker]
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def load_yfinance_data_panel(
+    tickers: list[str], start_date: datetime.date, end_date: datetime.date
+) -> pl.DataFrame:
+    """
+    Loads the closing prices of many tickers from the local price store into
+    one panel aligned by date, so that the data for any pair of them can be
+    taken from the panel rather than loaded again.
+
+    Args:
+        tickers: The stock ticker symbols.
+        start_date: The start date for the data.
+        end_date: The end date for the data (inclusive).
+
+    Returns:
+        A Polars DataFrame with a Date column and a column of closing prices
+        named after each ticker with data, which is null on dates the ticker
+        didn't trade.
+    """
+    closes = []
+    for ticker, data in iter_yfinance_data_many_tickers(
+        list(dict.fromkeys(tickers)), start_date, end_date
+    ):
+        if not data.is_empty():
+            closes.append(data.select("Date", pl.col("Close").alias(ticker)))
+    if not closes:
+        return pl.DataFrame(schema={"Date": pl.Datetime("ns")})
+
+    return pl.concat(closes, how="align")
+
+
+def get_pair_data(panel: pl.DataFrame, ticker1: str, ticker2: str) -> pl.DataFrame:
+    """
+    Selects the data for a pair of tickers from a panel of closing prices.
+
+    Args:
+        panel: A panel of closing prices from load_yfinance_data_panel.
+        ticker1: The first stock ticker symbol.
+        ticker2: The second stock ticker symbol.
+
+    Returns:
+        A Polars DataFrame containing the historical stock data for both
+        tickers, on the dates that both of them traded. It's empty if either
+        ticker has no data.
+    """
+    if ticker1 not in panel.columns or ticker2 not in panel.columns:
+        return pl.DataFrame(
+            schema={
+                "Date": pl.Datetime("ns"),
+                "Close_1": pl.Float64,
+                "Close_2": pl.Float64,
+            }
+        )
+
+    return panel.select(
+        "Date", pl.col(ticker1).alias("Close_1"), pl.col(ticker2).alias("Close_2")
+    ).drop_nulls()
+
+
+def fetch_yfinance_prices(
+    ticker: str, start_date: datetime.date, end_date: datetime.date
+) -> pl.DataFrame:
+    """
+    Downloads historical stock data for a ticker from Yahoo Finance, within
+    the limits of the shared Yahoo Finance fetcher.
+
+    Tickers that recently failed because Yahoo Finance doesn't know them are
+    skipped without a request, and a request made while an identical one is in
+    flight, e.g. from another session, shares its result.
+
+    Args:
+        ticker: The stock ticker symbol.
+        start_date: The start date for the data.
+        end_date: The end date for the data (inclusive).
+
+    Returns:
+        A Polars DataFrame containing the historical stock data, which is
+        empty if Yahoo Finance has no data for the ticker in the date range.
+
+    Raises:
+        ValueError: If the ticker recently failed because Yahoo Finance
+                    doesn't know it.
+        Exception: The error of the request, if it failed.
+    """
+    failed_tickers = get_failed_tickers([ticker])
+    if failed_tickers:
+        raise ValueError(f"Skipped {ticker}, which failed: {failed_tickers[ticker]}")
+
+    try:
+        return yahoo_finance_fetcher.fetch_sync(
+            _download_yfinance_prices, ticker, start_date, end_date
+        )
+    except YFTzMissingError as e:
+        record_failed_tickers({ticker: str(e)})
+        raise
+
+
+def fetch_yfinance_prices_many(
+    tickers: list[str], start_date: datetime.date, end_date: datetime.date
+) -> dict[str, pl.DataFrame]:
+    """
+    Downloads historical stock data for many tickers from Yahoo Finance in one
+    batched download, within the limits of the shared Yahoo Finance fetcher.
+    The batched download requests the tickers one after another, counting one
+    request per ticker towards the rate limit, and the tickers it has no
+    prices for are requested again on their own as separate requests.
+
+    Tickers that recently failed because Yahoo Finance doesn't know them are
+    skipped without a request, and a download made while an identical one is
+    in flight, e.g. from another session, shares its result.
+
+    Args:
+        tickers: The stock ticker symbols.
+        start_date: The start date for the data.
+        end_date: The end date for the data (inclusive).
+
+    Returns:
+        A dictionary of tickers to Polars DataFrames containing their
+        historical stock data, which are empty if Yahoo Finance has no data for
+        the ticker in the date range. Tickers that were skipped or failed are
+        left out.
+    """
+    failed_tickers = get_failed_tickers(tickers)
+    tickers = [ticker for ticker in tickers if ticker not in failed_tickers]
+    if not tickers:
+        return {}
+
+    data_by_ticker, missing_tickers = yahoo_finance_fetcher.fetch_sync(
+        _download_yfinance_prices_many,
+        tuple(tickers),
+        start_date,
+        end_date,
+        num_requests=len(tickers),
+    )
+
+    # yf.download doesn't raise the errors of the tickers it has no prices
+    # for, so they're requested again on their own, which tells a ticker
+    # without prices in the date range from one Yahoo Finance doesn't know.
+    results = yahoo_finance_fetcher.fetch_many_sync(
+        _download_yfinance_prices,
+        [(ticker, start_date, end_date) for ticker in missing_tickers],
+    )
+    new_failed_tickers = {}
+    for ticker, result in zip(missing_tickers, results):
+        if isinstance(result, YFTzMissingError):
+            new_failed_tickers[ticker] = str(result)
+        elif isinstance(result, Exception):
+            logger.error(f"Failed to fetch prices for {ticker}: {result}")
+        else:
+            data_by_ticker[ticker] = result
+    record_failed_tickers(new_failed_tickers)
+
+    return data_by_ticker
+
+
+def _download_yfinance_prices(
+    ticker: str, start_date: datetime.date, end_date: datetime.date
+) -> pl.DataFrame:
+    # A single ticker's history is requested on its own rather than with
+    # yf.download, so it doesn't wait for the download lock. Yahoo Finance
+    # treats the end date as exclusive.
+    try:
+        data = yf.Ticker(ticker).history(
+            start=start_date,
+            end=end_date + datetime.timedelta(days=1),
+            actions=False,
+            raise_errors=True,
+        )
+    except YFPricesMissingError:
+        # The ticker has no prices in the date range, e.g. over a weekend.
+        return _get_empty_prices()
+
+    # Keep the exchange's local dates, without the time zone.
+    if isinstance(data.index, pd.DatetimeIndex) and data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+    # Reset index to make Date a regular column
+    data = data.reset_index()
+
+    return pl.from_pandas(data)
+
+
+# yf.download keeps the results of each download in global state, so only one
+# download is run at a time.
+_yfinance_download_lock = threading.Lock()
+
+
+def _download_yfinance_prices_many(
+    tickers: tuple[str, ...], start_date: datetime.date, end_date: datetime.date
+) -> tuple[dict[str, pl.DataFrame], list[str]]:
+    # Returns the prices of each ticker, and the tickers without any prices.
+    # The tickers are requested one after another rather than in threads of
+    # its own, so the download only takes one of the fetcher's slots. Yahoo
+    # Finance treats the end date as exclusive.
+    with _yfinance_download_lock:
+        data = yf.download(
+            list(tickers),
+            start=start_date,
+            end=end_date + datetime.timedelta(days=1),
+            group_by="ticker",
+            threads=False,
+            progress=False,
+        )
+    # Keep the exchange's local dates, without the time zone.
+    if isinstance(data.index, pd.DatetimeIndex) and data.index.tz is not None:
+        data.index = data.index.tz_localize(None)
+
+    # Split the wide result, which has a column per ticker and price type,
+    # into the data for each ticker.
+    data_by_ticker = {}
+    missing_tickers = []
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker.upper() not in data.columns.get_level_values(0):
+                missing_tickers.append(ticker)
+                continue
+            ticker_data = data[ticker.upper()]
+        else:
+            ticker_data = data
+        # Drop the dates on which only the other tickers traded. Tickers
+        # without any prices left failed or have none in the date range.
+        ticker_data = ticker_data.dropna(how="all")
+        if ticker_data.empty:
+            missing_tickers.append(ticker)
+            continue
+        data_by_ticker[ticker] = pl.from_pandas(
+            ticker_data.rename_axis(columns=None).reset_index()
+        )
+    return data_by_ticker, missing_tickers
+
+
+def _get_empty_prices() -> pl.DataFrame:
+    return pl.DataFrame(schema={"Date": pl.Datetime("ns"), "Close": pl.Float64})
+
+
+def get_price_store() -> PriceStore:
+    """
+    Gets the local price store, in the directory set by the PRICE_STORE_DIR
+    environment variable if present.
+
+    Returns:
+        The price store shared by the process for that directory.
+    """
+    return _get_price_store(
+        os.environ.get(PRICE_STORE_DIR_ENV_VAR, DEFAULT_PRICE_STORE_DIR)
+    )
+
+
+@functools.cache
+def _get_price_store(directory: str) -> PriceStore:
+    return PriceStore(directory, fetch_yfinance_prices, fetch_yfinance_prices_many)
+
+
 @st.cache_data
 def get_ticker_market_cap(ticker: str) -> tuple[str, float | None]:
     """
-    Fetch market cap data for a single ticker from Yahoo Finance.
+    Fetch market cap data for a single ticker from the company metadata
+    cache, refreshing it from Yahoo Finance if it's stale.
 
     Args:
         ticker: The stock ticker symbol.
@@ -80,8 +405,8 @@ def get_ticker_market_cap(ticker: str) -> tuple[str, float | None]:
     Returns:
         A tuple containing the ticker symbol and market cap if available.
     """
-    data = yf.Ticker(ticker).info
-    market_cap = data.get("marketCap")
+    metadata = get_company_metadata([ticker], ["market_cap"])
+    market_cap = metadata.get(ticker, {}).get("market_cap")
     if market_cap is None:
         logger.error(f"Market cap data for {ticker} is unavailable")
         return ticker, None
@@ -92,59 +417,156 @@ def get_ticker_market_cap(ticker: str) -> tuple[str, float | None]:
 @st.cache_data
 def get_top_sp500_companies(num_companies: int) -> list[tuple[str, float]]:
     """
-    Fetches the top X companies in the S&P 500 index by market cap using
-    yfinance.
+    Gets the top X companies in the S&P 500 index by market cap from the
+    latest S&P 500 snapshot.
 
     Args:
-        num_companies: The number of top companies to fetch.
+        num_companies: The number of top companies to get, or 0 for all of
+                       them.
 
     Returns:
         A list of tuples containing the ticker symbols and market cap
         of each company in the top X of the S&P 500 index, sorted by market
         cap.
     """
-    # Fetch the list of S&P 500 companies from the Wikipedia table.
-    SOURCE = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
-    sp500_constituents = pd.read_html(SOURCE)[0]
-    tickers = sp500_constituents["Symbol"].to_list()
-
-    # Fetch market cap data with threading for faster execution.
-    sp500_companies = []
-    with ThreadPoolExecutor() as executor:
-        future_to_ticker = {
-            executor.submit(get_ticker_market_cap, ticker): ticker for ticker in tickers
-        }
-        for future in as_completed(future_to_ticker):
-            ticker, market_cap = future.result()
-            if market_cap is not None:
-                sp500_companies.append((ticker, market_cap))
-
-    # Sort companies by market cap (descending) and take the top X companies.
-    sorted_companies = sorted(sp500_companies, key=lambda x: x[1], reverse=True)
-    top_companies = (
-        sorted_companies[:num_companies] if num_companies > 0 else sorted_companies
+    snapshot = get_sp500_snapshot()
+    if num_companies > 0:
+        snapshot = snapshot.head(num_companies)
+
+    return list(snapshot.select("Ticker", "Market Cap").iter_rows())
+
+
+def get_sp500_snapshot(
+    refresh: bool = False,
+    max_age: datetime.timedelta = SP500_SNAPSHOT_MAX_AGE,
+) -> pl.DataFrame:
+    """
+    Gets the latest snapshot of the S&P 500 constituents and their market
+    caps, building and saving a new one if the latest is too old.
+
+    If building a new snapshot fails, the latest one is used regardless of
+    its age.
+
+    Args:
+        refresh: Whether to build a new snapshot regardless of the age of the
+                 latest one.
+        max_age: The maximum age of a snapshot before a new one is built.
+
+    Returns:
+        A Polars DataFrame containing the 'Ticker' and 'Market Cap' of each
+        constituent, sorted by market cap from highest to lowest.
+    """
+    snapshot_store = UniverseSnapshotStore(
+        os.environ.get(UNIVERSE_SNAPSHOT_DIR_ENV_VAR, DEFAULT_UNIVERSE_SNAPSHOT_DIR),
+        "sp500",
     )
+    latest_date = snapshot_store.get_latest_date()
+    if (
+        not refresh
+        and latest_date is not None
+        and datetime.date.today() - latest_date <= max_age
+    ):
+        return snapshot_store.load(latest_date)
+
+    try:
+        snapshot = fetch_sp500_snapshot()
+    except Exception as e:
+        if latest_date is None:
+            raise
+        logger.error(
+            f"Failed to refresh the S&P 500 snapshot, using the one from "
+            f"{latest_date}: {e}"
+        )
+        return snapshot_store.load(latest_date)
+
+    snapshot_store.save(snapshot)
+    return snapshot
+
+
+def fetch_sp500_snapshot(source: str | None = None) -> pl.DataFrame:
+    """
+    Builds a snapshot of the S&P 500 constituents and their market caps.
+
+    Args:
+        source: The URL of a page with a table of the constituents, or the
+                path of a CSV file of them, with their tickers in a 'Symbol'
+                column. If the CSV file has a 'Market Cap' column, it's used
+                rather than fetching the market caps. Defaults to the
+                SP500_SOURCE environment variable if present, or else the
+                Wikipedia list of S&P 500 companies.
 
-    return top_companies
+    Returns:
+        A Polars DataFrame containing the 'Ticker' and 'Market Cap' of each
+        constituent with a market cap, sorted by market cap from highest to
+        lowest.
+    """
+    source = source or os.environ.get(SP500_SOURCE_ENV_VAR, DEFAULT_SP500_SOURCE)
+    if source.endswith(".csv"):
+        constituents = pl.read_csv(source)
+    else:
+        constituents = pl.from_pandas(pd.read_html(source)[0])
+    # Wikipedia writes some symbols differently from Yahoo Finance.
+    tickers = [
+        normalise_ticker(ticker)
+        for ticker in constituents["Symbol"].cast(pl.String).to_list()
+    ]
+
+    if "Market Cap" in constituents.columns:
+        market_caps = constituents["Market Cap"].cast(pl.Float64).to_list()
+    else:
+        # Get the market caps from the company metadata cache, which
+        # refreshes any stale ones concurrently.
+        metadata = get_company_metadata(tickers, ["market_cap"])
+        market_caps = [metadata.get(ticker, {}).get("market_cap") for ticker in tickers]
+
+    return (
+        pl.DataFrame(
+            {"Ticker": tickers, "Market Cap": market_caps},
+            schema={"Ticker": pl.String, "Market Cap": pl.Float64},
+        )
+        .drop_nulls()
+        .sort("Market Cap", descending=True, maintain_order=True)
+    )
 
 
 @st.cache_data
 def get_full_company_name(ticker: str) -> str | None:
     """
-    Fetches the full company name for a given ticker symbol.
+    Gets the full company name for a given ticker symbol from the company
+    metadata cache, refreshing it from Yahoo Finance if it's stale.
 
     Args:
         ticker: The stock ticker symbol.
 
     Returns:
-        The full company name if available, otherwise None.
+        The full company name if available, the ticker symbol if Yahoo Finance
+        doesn't have one, or None if it couldn't be fetched.
     """
-    try:
-        company_info = yf.Ticker(ticker).info
-        return company_info.get("longName", ticker)
-    except Exception as e:
-        logger.error(f"Failed to fetch company name for {ticker}: {e}")
+    metadata = get_company_metadata([ticker], ["long_name"])
+    if ticker not in metadata:
         return None
+    return metadata[ticker]["long_name"] or ticker
+
+
+def get_company_names(tickers: list[str]) -> dict[str, str]:
+    """
+    Gets the normalised company names of many tickers, refreshing any stale
+    ones concurrently, so that tickers can be compared by company with dictionary
+    lookups.
+
+    Args:
+        tickers: The stock ticker symbols.
+
+    Returns:
+        A dictionary of tickers to their lowercase company names, for each
+        ticker with a company name available.
+    """
+    metadata = get_company_metadata(tickers, ["long_name"])
+    return {
+        ticker: fields["long_name"].lower()
+        for ticker, fields in metadata.items()
+        if fields["long_name"]
+    }
 
 
 @st.cache_data
@@ -159,10 +581,6 @@ def is_same_company(ticker1: str, ticker2: str) -> bool:
     Returns:
         True if the tickers likely represent the same company, False otherwise.
     """
-    try:
-        company1 = yf.Ticker(ticker1).info.get("longName", "").lower()
-        company2 = yf.Ticker(ticker2).info.get("longName", "").lower()
-        return company1 == company2 and company1 != "" and company2 != ""
-    except Exception as e:
-        logger.error(f"Error comparing {ticker1} and {ticker2}: {e}")
-        return False
+    company_names = get_company_names([ticker1, ticker2])
+    company1 = company_names.get(ticker1)
+    return company1 is not None and company1 == company_names.get(ticker2)
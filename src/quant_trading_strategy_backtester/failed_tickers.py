@@ -0,0 +1,91 @@
+"""
+Contains a persistent negative cache of tickers that data couldn't be fetched
+for, such as delisted tickers, and the normalisation of ticker symbols to the
+form Yahoo Finance uses.
+
+A request for a ticker Yahoo Finance doesn't know fails the same way on every
+run, so failed tickers are kept in the database with the reason they failed,
+and skipped without any requests until the failure is older than its time to
+live.
+"""
+
+import datetime
+from collections.abc import Callable
+from typing import Any
+
+from quant_trading_strategy_backtester import models
+from quant_trading_strategy_backtester.models import FailedTickerModel
+
+# How long a failed ticker is skipped before it's fetched again, in case it
+# was a temporary failure.
+FAILED_TICKER_TTL = datetime.timedelta(days=7)
+
+
+def normalise_ticker(ticker: str) -> str:
+    """
+    Normalises a ticker symbol, such as one from Wikipedia, to the form Yahoo
+    Finance uses, e.g. 'BRK.B' to 'BRK-B'.
+
+    Args:
+        ticker: The stock ticker symbol.
+
+    Returns:
+        The ticker symbol used by Yahoo Finance.
+    """
+    # Yahoo Finance separates share classes with a dash rather than a dot.
+    return ticker.strip().upper().replace(".", "-")
+
+
+def get_failed_tickers(
+    tickers: list[str], session_factory: Callable[[], Any] | None = None
+) -> dict[str, str]:
+    """
+    Gets which of the tickers failed to be fetched recently enough to be
+    skipped.
+
+    Args:
+        tickers: The stock ticker symbols.
+        session_factory: The session factory for the database. Defaults to the
+                         app's database session.
+
+    Returns:
+        A dictionary of the failed tickers to the reasons they failed.
+    """
+    if not tickers:
+        return {}
+
+    expiry_time = datetime.datetime.now() - FAILED_TICKER_TTL
+    with models.session_scope(session_factory) as session:
+        return {
+            ticker: reason
+            for ticker, reason in session.query(
+                FailedTickerModel.ticker, FailedTickerModel.reason
+            ).filter(
+                FailedTickerModel.ticker.in_(tickers),
+                FailedTickerModel.failed_at > expiry_time,
+            )
+        }
+
+
+def record_failed_tickers(
+    reasons: dict[str, str], session_factory: Callable[[], Any] | None = None
+) -> None:
+    """
+    Records tickers that failed to be fetched, so that they're skipped until
+    the failure expires.
+
+    Args:
+        reasons: A dictionary of the failed tickers to the reasons they failed.
+        session_factory: The session factory for the database. Defaults to the
+                         app's database session.
+    """
+    if not reasons:
+        return
+
+    now = datetime.datetime.now()
+    with models.session_scope(session_factory) as session:
+        for ticker, reason in reasons.items():
+            session.merge(
+                FailedTickerModel(ticker=ticker, reason=reason, failed_at=now)
+            )
+        session.commit()
@@ -0,0 +1,178 @@
+"""
+Contains the rolling features that strategies compute over price data, and a
+cache that shares them between the backtests of an optimisation.
+
+Strategies declare the rolling statistics they need as RollingFeatures and
+read them from columns named after each feature. A single backtest computes
+the columns inline, while the grid backtester fetches them from a
+RollingFeatureCache, so each distinct window is only computed once however
+many parameter combinations use it.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import polars as pl
+
+# Columns that are derived from the price data rather than read from it.
+DERIVED_COLUMNS = {
+    "spread": pl.col("Close_1") - pl.col("Close_2"),
+}
+
+
+class RollingFeature(NamedTuple):
+    """
+    A rolling statistic of a price column over a window.
+
+    Attributes:
+        column: The name of the price column, or of a derived column in
+                DERIVED_COLUMNS.
+        statistic: The rolling statistic, either 'mean' or 'std'.
+        window: The number of rows in the rolling window.
+    """
+
+    column: str
+    statistic: str
+    window: int
+
+    @property
+    def name(self) -> str:
+        """
+        Returns:
+            The name of the column that holds the feature.
+        """
+        return f"{self.column}_rolling_{self.statistic}_{self.window}"
+
+    def expr(self) -> pl.Expr:
+        """
+        Builds the expression that computes the feature from the price data.
+
+        Returns:
+            An expression that evaluates to the feature, aliased to its name.
+        """
+        source = DERIVED_COLUMNS.get(self.column, pl.col(self.column))
+        match self.statistic:
+            case "mean":
+                rolling = source.rolling_mean(
+                    window_size=self.window, min_samples=self.window
+                )
+            case "std":
+                rolling = source.rolling_std(
+                    window_size=self.window, min_samples=self.window
+                )
+            case _:
+                raise ValueError(f"Unexpected rolling statistic: {self.statistic}")
+        return rolling.alias(self.name)
+
+
+def get_data_fingerprint(data: pl.DataFrame) -> str:
+    """
+    Computes a fingerprint that identifies the contents of a DataFrame.
+
+    Args:
+        data: The DataFrame to fingerprint.
+
+    Returns:
+        A hex digest of the column names and the hashes of every row.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(",".join(data.columns).encode())
+    digest.update(data.hash_rows(seed=0).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class RollingFeatureCache:
+    """
+    A least-recently-used cache of computed rolling features, bounded by the
+    total size of the cached columns.
+
+    Features are keyed by the fingerprint of the data they were computed on,
+    the column, the statistic and the window.
+
+    Attributes:
+        max_bytes: The maximum total estimated size of the cached columns.
+        hits: The number of features served from the cache.
+        misses: The number of features that had to be computed.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str, str, int], pl.Series] = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Returns:
+            The total estimated size of the cached columns.
+        """
+        return self._size_bytes
+
+    def get_features(
+        self,
+        data: pl.DataFrame,
+        features: list[RollingFeature],
+        fingerprint: str | None = None,
+    ) -> list[pl.Series]:
+        """
+        Gets the columns for a list of features, computing any that aren't
+        cached in a single pass over the data.
+
+        Args:
+            data: The price data to compute the features on.
+            features: The features to get.
+            fingerprint: The fingerprint of the data, if already known.
+
+        Returns:
+            A Series for each feature, in the order given, named after it.
+        """
+        fingerprint = fingerprint or get_data_fingerprint(data)
+        columns: dict[RollingFeature, pl.Series] = {}
+        with self._lock:
+            for feature in features:
+                key = (fingerprint, *feature)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    columns[feature] = self._entries[key]
+                    self.hits += 1
+
+        missing = list(dict.fromkeys(f for f in features if f not in columns))
+        if missing:
+            computed = data.select([feature.expr() for feature in missing])
+            with self._lock:
+                for feature, column in zip(missing, computed.get_columns()):
+                    columns[feature] = column
+                    self._put((fingerprint, *feature), column)
+                    self.misses += 1
+
+        return [columns[feature] for feature in features]
+
+    def clear(self) -> None:
+        """
+        Removes all cached features.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def _put(self, key: tuple[str, str, str, int], column: pl.Series) -> None:
+        if key in self._entries:
+            return
+        size = int(column.estimated_size())
+        if size > self.max_bytes:
+            return
+        self._entries[key] = column
+        self._size_bytes += size
+        # Evict the least recently used features until under the size limit.
+        while self._size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size_bytes -= int(evicted.estimated_size())
+
+
+# The cache shared by the optimisations run in this process.
+rolling_feature_cache = RollingFeatureCache()
@@ -0,0 +1,335 @@
+"""
+Contains an asyncio layer for fetching data from rate-limited providers such
+as Yahoo Finance, with bounded concurrency, rate limiting, per-request
+timeouts and retries with jittered exponential backoff.
+
+Each fetcher runs its requests on its own event loop in a background thread,
+so its limits hold across every thread and Streamlit session in the process.
+Identical requests made while one is in flight, e.g. by several sessions
+opening the app at once, wait for that request and share its result rather
+than being made again.
+Blocking functions, such as the Yahoo Finance client, are run in worker
+threads from the loop, and sync wrappers let the existing callers use the
+fetcher without an event loop of their own.
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import random
+import threading
+import time
+from collections.abc import Callable, Coroutine, Sequence
+from typing import Any
+
+from yfinance.exceptions import YFRateLimitError
+
+from quant_trading_strategy_backtester.utils import logger
+
+# Limits for Yahoo Finance, which throttles clients that make too many
+# requests in a short time.
+YAHOO_FINANCE_MAX_CONCURRENCY = 8
+YAHOO_FINANCE_REQUESTS_PER_SECOND = 5.0
+YAHOO_FINANCE_TIMEOUT = 30.0
+
+
+class RateLimiter:
+    """
+    Spaces out the start of requests so that no more than a given number
+    start per second.
+
+    Attributes:
+        interval: The minimum number of seconds between the start of two
+                  requests.
+    """
+
+    def __init__(self, requests_per_second: float) -> None:
+        if requests_per_second <= 0:
+            raise ValueError(f"Invalid requests per second: {requests_per_second}")
+        self.interval = 1 / requests_per_second
+        self._next_start_time = 0.0
+
+    async def wait(self, num_requests: int = 1) -> None:
+        """
+        Waits until the next request is allowed to start.
+
+        Args:
+            num_requests: The number of requests starting, e.g. for a call
+                          that makes several requests one after another. The
+                          next request after them waits for all of their slots.
+        """
+        # The slot is reserved before sleeping, so concurrent callers on the
+        # same event loop queue up behind each other.
+        now = time.monotonic()
+        start_time = max(now, self._next_start_time)
+        self._next_start_time = start_time + self.interval * num_requests
+        await asyncio.sleep(start_time - now)
+
+
+class AsyncFetcher:
+    """
+    Fetches data with bounded concurrency, rate limiting, per-request
+    timeouts and retries with jittered exponential backoff. Concurrent calls
+    with the same function and arguments are coalesced into one request.
+
+    Attributes:
+        max_concurrency: The maximum number of requests in flight at once.
+        max_retries: The number of times a failed request is retried.
+        backoff_base: The maximum delay in seconds before the first retry,
+                      which doubles with each retry after it.
+        backoff_max: The cap on the maximum delay in seconds before a retry.
+        timeout: The number of seconds each attempt of a request may take, or
+                 None for no timeout.
+        retry_on: The exception types that are retried. Timeouts are always
+                  retried.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_second: float | None = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float | None = None,
+        retry_on: tuple[type[BaseException], ...] = (OSError,),
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError(f"Invalid max concurrency: {max_concurrency}")
+        if max_retries < 0:
+            raise ValueError(f"Invalid max retries: {max_retries}")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.retry_on: tuple[type[BaseException], ...] = (TimeoutError, *retry_on)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = (
+            RateLimiter(requests_per_second) if requests_per_second else None
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._loop_lock = threading.Lock()
+        # The requests in flight on the loop, by function and arguments.
+        self._in_flight: dict[tuple[Any, ...], asyncio.Future] = {}
+        # The calls running on the loop, including those abandoned on
+        # timeout.
+        self._calls: set[asyncio.Task] = set()
+
+    async def fetch(
+        self, func: Callable[..., Any], *args: Any, num_requests: int = 1
+    ) -> Any:
+        """
+        Calls a function to fetch data within the fetcher's limits, retrying
+        it if it fails with a retryable error.
+
+        Args:
+            func: The function to call, which may be a blocking function or a
+                  coroutine function.
+            *args: The arguments to call the function with.
+            num_requests: The number of requests the function makes one after
+                          another, which each count towards the rate limit.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            The error from the last attempt, if every attempt fails.
+        """
+        return await self._run_on_loop(self._fetch(func, args, num_requests))
+
+    async def fetch_many(
+        self, func: Callable[..., Any], args_list: Sequence[Sequence[Any]]
+    ) -> list[Any]:
+        """
+        Calls a function to fetch data for many sets of arguments
+        concurrently, within the fetcher's limits.
+
+        Args:
+            func: The function to call, which may be a blocking function or a
+                  coroutine function.
+            args_list: The arguments for each call.
+
+        Returns:
+            The result of each call in the order given, or the error it
+            failed with if every attempt failed.
+        """
+        return await self._run_on_loop(self._fetch_many(func, args_list))
+
+    def fetch_sync(
+        self, func: Callable[..., Any], *args: Any, num_requests: int = 1
+    ) -> Any:
+        """
+        Blocking version of fetch, for callers without an event loop.
+        """
+        return self._run_sync(self._fetch(func, args, num_requests))
+
+    def fetch_many_sync(
+        self, func: Callable[..., Any], args_list: Sequence[Sequence[Any]]
+    ) -> list[Any]:
+        """
+        Blocking version of fetch_many, for callers without an event loop.
+        """
+        return self._run_sync(self._fetch_many(func, args_list))
+
+    def close(self) -> None:
+        """
+        Stops the fetcher's event loop, once any calls abandoned on timeout
+        have finished. It's started again if the fetcher is used afterwards.
+        """
+        with self._loop_lock:
+            if self._loop is None or self._thread is None:
+                return
+            # Let the calls abandoned on timeout finish first, rather than
+            # destroying them while they're pending.
+            asyncio.run_coroutine_threadsafe(
+                self._wait_for_calls(), self._loop
+            ).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    async def _fetch(
+        self, func: Callable[..., Any], args: Sequence[Any], num_requests: int = 1
+    ) -> Any:
+        key = (func, tuple(args))
+        try:
+            task = self._in_flight.get(key)
+        except TypeError:
+            # Requests with unhashable arguments can't be matched up.
+            return await self._fetch_with_retries(func, args, num_requests)
+
+        if task is None:
+            task = asyncio.ensure_future(
+                self._fetch_with_retries(func, args, num_requests)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield the shared request, so one caller giving up doesn't cancel it
+        # for the others.
+        return await asyncio.shield(task)
+
+    async def _fetch_with_retries(
+        self, func: Callable[..., Any], args: Sequence[Any], num_requests: int
+    ) -> Any:
+        for attempt in range(self.max_retries + 1):
+            call = await self._start_call(func, args, num_requests)
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), self.timeout)
+            except self.retry_on as e:
+                # A coroutine can be cancelled, but a blocking call is left to
+                # finish in its worker thread, still holding its slot.
+                if inspect.iscoroutinefunction(func):
+                    call.cancel()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(
+                    f"Request failed on attempt {attempt + 1}, retrying: {e!r}"
+                )
+            # Back off without holding a slot, so other requests can go ahead.
+            await asyncio.sleep(
+                get_backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            )
+
+    async def _start_call(
+        self, func: Callable[..., Any], args: Sequence[Any], num_requests: int
+    ) -> asyncio.Task:
+        # Takes a slot and starts the call. The slot is only released once
+        # the call has actually finished, rather than when its caller stops
+        # waiting for it, so that calls abandoned on timeout still count
+        # towards the maximum concurrency.
+        await self._semaphore.acquire()
+        try:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.wait(num_requests)
+            call = asyncio.ensure_future(_call(func, args))
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self._calls.add(call)
+        call.add_done_callback(self._on_call_done)
+        return call
+
+    def _on_call_done(self, call: asyncio.Task) -> None:
+        self._calls.discard(call)
+        self._semaphore.release()
+        # Retrieve the errors of abandoned calls, so they aren't logged as
+        # never retrieved.
+        if not call.cancelled():
+            call.exception()
+
+    async def _wait_for_calls(self) -> None:
+        if self._calls:
+            await asyncio.wait(set(self._calls))
+
+    async def _fetch_many(
+        self, func: Callable[..., Any], args_list: Sequence[Sequence[Any]]
+    ) -> list[Any]:
+        return await asyncio.gather(
+            *(self._fetch(func, args) for args in args_list), return_exceptions=True
+        )
+
+    async def _run_on_loop(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        return await asyncio.wrap_future(self._submit(coroutine))
+
+    def _run_sync(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("Can't block the fetcher's own event loop")
+        return self._submit(coroutine).result()
+
+    def _submit(self, coroutine: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                # The semaphore is bound to the loop it's first used on.
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._in_flight = {}
+                self._calls = set()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="AsyncFetcher", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+
+def get_backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Gets a random delay before retrying a failed request, using exponential
+    backoff with full jitter so that clients which failed together don't retry
+    together.
+
+    Args:
+        attempt: The number of the attempt that failed, starting from 0.
+        base: The maximum delay after the first attempt.
+        maximum: The cap on the maximum delay.
+
+    Returns:
+        The delay in seconds, between 0 and base * 2**attempt, capped at the
+        maximum.
+    """
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+async def _call(func: Callable[..., Any], args: Sequence[Any]) -> Any:
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    # A blocking call can't be cancelled, so on timeout it's abandoned and
+    # left to finish in its worker thread, which keeps its slot until then.
+    return await asyncio.to_thread(func, *args)
+
+
+# Shared by every Yahoo Finance request in the process, so that universe scans
+# and concurrent sessions stay within the same limits.
+yahoo_finance_fetcher = AsyncFetcher(
+    max_concurrency=YAHOO_FINANCE_MAX_CONCURRENCY,
+    requests_per_second=YAHOO_FINANCE_REQUESTS_PER_SECOND,
+    timeout=YAHOO_FINANCE_TIMEOUT,
+    retry_on=(OSError, YFRateLimitError),
+)
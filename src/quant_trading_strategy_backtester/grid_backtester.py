@@ -0,0 +1,698 @@
+"""
+A vectorised backtesting engine that evaluates many strategies on the same
+price data in one pass.
+
+Rather than running a Backtester per parameter combination, it evaluates the
+strategy returns of every strategy side by side as a 2-D (bars x strategies)
+block, and computes all of their performance metrics with a handful of
+vectorised reductions. Likewise, the Buy and Hold strategy is scored on a
+whole universe of tickers at once, and the Pairs Trading strategy on every
+pair of tickers in a panel of prices at once.
+"""
+
+import math
+from collections import defaultdict
+from typing import Any, cast
+
+import numpy as np
+import polars as pl
+
+from quant_trading_strategy_backtester.backtester import (
+    get_asset_returns_expr,
+    get_strategy_returns_expr,
+)
+from quant_trading_strategy_backtester.feature_cache import (
+    RollingFeatureCache,
+    rolling_feature_cache,
+)
+from quant_trading_strategy_backtester.strategies.base import BaseStrategy
+from quant_trading_strategy_backtester.strategies.mean_reversion import (
+    MeanReversionStrategy,
+)
+from quant_trading_strategy_backtester.strategies.moving_average_crossover import (
+    MovingAverageCrossoverStrategy,
+)
+from quant_trading_strategy_backtester.strategies.pairs_trading import (
+    PairsTradingStrategy,
+)
+
+# The memory that the pairs kernel may use at once for its blocks of
+# intermediate arrays, which bounds how many pairs it backtests together.
+PAIRS_MEMORY_BUDGET = 256 * 1024**2
+# Roughly how many (bars x pairs) arrays of 8-byte values the pairs kernel
+# holds at once for each set of thresholds.
+_PAIRS_BLOCK_ARRAYS = 8
+# Moving averages within this distance of each other, relative to the
+# long-term one, are compared again on the strategy's own rolling means. It's
+# well above the rounding errors of the cumulative sum over any price history.
+NEAR_TIE_TOLERANCE = 1e-8
+
+
+def backtest_strategies(
+    data: pl.DataFrame,
+    strategies: list[BaseStrategy],
+    feature_cache: RollingFeatureCache | None = None,
+) -> pl.DataFrame:
+    """
+    Backtests a list of strategies on the same price data.
+
+    The rolling features of all the strategies are fetched from the feature
+    cache, so each distinct window is computed at most once, and then the
+    positions of every strategy are evaluated in a single select.
+
+    Grids of Pairs Trading or Mean Reversion strategies are swept instead.
+    The rolling statistics are shared by every strategy with the same window,
+    so the signals of all the thresholds or band widths with that window are
+    derived from them together as a matrix. Likewise, the moving averages of
+    a grid of Moving Average Crossover strategies are all derived from one
+    cumulative sum of the prices.
+
+    Args:
+        data: Historical price data.
+        strategies: The strategies to backtest. Each must provide a positions
+                    expression.
+        feature_cache: The cache to fetch rolling features from. Defaults to
+                       the cache shared across the process.
+
+    Returns:
+        A DataFrame with one row per strategy, in the order given, containing
+        the 'Total Return', 'Sharpe Ratio' and 'Max Drawdown' of each.
+    """
+    if data.is_empty():
+        raise ValueError("No data available to backtest")
+    if not strategies:
+        return get_performance_metrics_matrix(np.empty((len(data), 0)))
+
+    feature_cache = feature_cache or rolling_feature_cache
+    if all(isinstance(strategy, PairsTradingStrategy) for strategy in strategies):
+        closes = _get_complete_prices(data, ["Close_1", "Close_2"])
+        if closes is not None:
+            return _sweep_pairs_trading_strategies(
+                data,
+                closes,
+                cast(list[PairsTradingStrategy], strategies),
+                feature_cache,
+            )
+    elif all(isinstance(strategy, MeanReversionStrategy) for strategy in strategies):
+        closes = _get_complete_prices(data, ["Close"])
+        if closes is not None:
+            return _sweep_mean_reversion_strategies(
+                data,
+                closes,
+                cast(list[MeanReversionStrategy], strategies),
+                feature_cache,
+            )
+    elif all(
+        isinstance(strategy, MovingAverageCrossoverStrategy) for strategy in strategies
+    ):
+        closes = _get_complete_prices(data, ["Close"])
+        if closes is not None:
+            return _sweep_moving_average_crossover_strategies(
+                data,
+                closes,
+                cast(list[MovingAverageCrossoverStrategy], strategies),
+                feature_cache,
+            )
+
+    features = list(
+        dict.fromkeys(
+            feature
+            for strategy in strategies
+            for feature in strategy.get_rolling_features()
+        )
+    )
+    feature_columns = feature_cache.get_features(data, features)
+
+    asset_returns = get_asset_returns_expr(data.columns)
+    strategy_returns = (
+        data.with_columns(feature_columns)
+        .lazy()
+        .select(
+            [
+                get_strategy_returns_expr(strategy.positions_expr(), asset_returns)
+                .cast(pl.Float64)
+                .alias(str(i))
+                for i, strategy in enumerate(strategies)
+            ]
+        )
+        .collect()
+    )
+
+    return get_performance_metrics_matrix(strategy_returns.to_numpy())
+
+
+def _get_complete_prices(data: pl.DataFrame, columns: list[str]) -> np.ndarray | None:
+    # Gets the prices for a sweep, which relies on every bar having every
+    # price.
+    prices = data.select(pl.col(columns).cast(pl.Float64)).to_numpy()
+    return None if np.isnan(prices).any() else prices
+
+
+def _group_by_window(strategies: list[Any]) -> list[list[int]]:
+    # Groups the indices of the strategies by their window.
+    indices_by_window = defaultdict(list)
+    for i, strategy in enumerate(strategies):
+        indices_by_window[strategy.window].append(i)
+    return list(indices_by_window.values())
+
+
+def _sweep_pairs_trading_strategies(
+    data: pl.DataFrame,
+    closes: np.ndarray,
+    strategies: list[PairsTradingStrategy],
+    feature_cache: RollingFeatureCache,
+) -> pl.DataFrame:
+    # The z-scores only depend on the window, so the strategies with the same
+    # window are evaluated as layers of one (bars x 1 x thresholds) block.
+    features = list(
+        dict.fromkeys(
+            feature
+            for strategy in strategies
+            for feature in strategy.get_rolling_features()
+        )
+    )
+    feature_columns = {
+        column.name: column.to_numpy()[:, np.newaxis]
+        for column in feature_cache.get_features(data, features)
+    }
+    close_1 = closes[:, :1]
+    close_2 = closes[:, 1:]
+    spread = close_1 - close_2
+
+    strategy_returns = np.empty((len(data), len(strategies)))
+    for indices in _group_by_window(strategies):
+        strategy = strategies[indices[0]]
+        z_score = get_spread_z_scores(
+            spread,
+            feature_columns[strategy.spread_mean_feature.name],
+            feature_columns[strategy.spread_std_feature.name],
+        )
+        strategy_returns[:, indices] = get_pairs_trading_returns_matrix(
+            close_1,
+            close_2,
+            np.array([len(data)]),
+            z_score,
+            np.array([strategies[i].entry_z_score for i in indices]),
+            np.array([strategies[i].exit_z_score for i in indices]),
+        )[:, 0, :]
+
+    return get_performance_metrics_matrix(strategy_returns)
+
+
+def _sweep_mean_reversion_strategies(
+    data: pl.DataFrame,
+    closes: np.ndarray,
+    strategies: list[MeanReversionStrategy],
+    feature_cache: RollingFeatureCache,
+) -> pl.DataFrame:
+    # The bands of the strategies with the same window are all derived from
+    # one rolling mean and standard deviation, with a column per band width.
+    features = list(
+        dict.fromkeys(
+            feature
+            for strategy in strategies
+            for feature in strategy.get_rolling_features()
+        )
+    )
+    feature_columns = {
+        column.name: column for column in feature_cache.get_features(data, features)
+    }
+    asset_returns = _get_asset_returns_matrix(data)
+
+    strategy_returns = np.empty((len(data), len(strategies)))
+    for indices in _group_by_window(strategies):
+        strategy = strategies[indices[0]]
+        mean = feature_columns[strategy.mean_feature.name].to_numpy()[:, np.newaxis]
+        std_column = feature_columns[strategy.std_feature.name]
+        # Until there's a full window, there are no bands and no signal.
+        has_bands = std_column.is_not_null().to_numpy()[:, np.newaxis]
+        std = std_column.to_numpy()[:, np.newaxis]
+        # A flat price has bands of NaN, which Polars considers to be above
+        # every price, so it gives a buy signal.
+        is_flat = std == 0
+        std_devs = np.array([strategies[i].std_dev for i in indices])
+        signal = np.select(
+            [
+                ~has_bands,
+                is_flat | (closes < mean - std_devs * std),
+                closes > mean + std_devs * std,
+            ],
+            [0.0, 1.0, -1.0],
+            0.0,
+        )
+        strategy_returns[:, indices] = _get_strategy_returns_matrix(
+            signal[:, np.newaxis, :], asset_returns
+        )[:, 0, :]
+
+    return get_performance_metrics_matrix(strategy_returns)
+
+
+def _sweep_moving_average_crossover_strategies(
+    data: pl.DataFrame,
+    closes: np.ndarray,
+    strategies: list[MovingAverageCrossoverStrategy],
+    feature_cache: RollingFeatureCache,
+) -> pl.DataFrame:
+    # Every moving average in the grid is one column of a (bars x windows)
+    # matrix, and the signals of every strategy come from comparing its two
+    # columns.
+    windows = sorted(
+        {strategy.short_window for strategy in strategies}
+        | {strategy.long_window for strategy in strategies}
+    )
+    window_indices = {window: i for i, window in enumerate(windows)}
+    moving_averages = get_rolling_means_matrix(closes[:, 0], windows)
+    short_mavg = moving_averages[
+        :, [window_indices[strategy.short_window] for strategy in strategies]
+    ]
+    long_mavg = moving_averages[
+        :, [window_indices[strategy.long_window] for strategy in strategies]
+    ]
+    # Until there are full windows, the moving averages are NaN and don't
+    # compare as above each other, so the signal is 0.
+    signal = short_mavg > long_mavg
+    # The rounding errors of the cumulative sum differ from those of the
+    # strategy's Polars rolling means, so where the averages are nearly equal,
+    # e.g. over a flat stretch of prices, they could compare differently.
+    # Those cells are compared again on the strategy's own rolling means.
+    near_ties = np.abs(short_mavg - long_mavg) <= NEAR_TIE_TOLERANCE * np.abs(long_mavg)
+    tied_indices = np.flatnonzero(near_ties.any(axis=0))
+    if tied_indices.size:
+        tied_strategies = [strategies[i] for i in tied_indices]
+        features = list(
+            dict.fromkeys(
+                feature
+                for strategy in tied_strategies
+                for feature in strategy.get_rolling_features()
+            )
+        )
+        exact_mavgs = {
+            column.name: column.fill_null(np.nan).to_numpy()
+            for column in feature_cache.get_features(data, features)
+        }
+        for i, strategy in zip(tied_indices, tied_strategies):
+            rows = near_ties[:, i]
+            signal[rows, i] = (
+                exact_mavgs[strategy.short_mavg_feature.name][rows]
+                > exact_mavgs[strategy.long_mavg_feature.name][rows]
+            )
+    signal = signal.astype(np.float64)
+
+    strategy_returns = _get_strategy_returns_matrix(
+        signal[:, np.newaxis, :], _get_asset_returns_matrix(data)
+    )[:, 0, :]
+    return get_performance_metrics_matrix(strategy_returns)
+
+
+def get_rolling_means_matrix(close: np.ndarray, windows: list[int]) -> np.ndarray:
+    """
+    Calculates the rolling means of the closing prices over many windows at
+    once. The cumulative sum of the prices is computed once, and each mean is
+    the difference of two of its values, so the cost doesn't depend on the
+    lengths of the windows.
+
+    Args:
+        close: A 1-D array of closing prices.
+        windows: The windows of the rolling means.
+
+    Returns:
+        A 2-D array of the rolling means, with one row per bar and one column
+        per window. Like a Polars rolling mean, it's NaN until there's a full
+        window.
+    """
+    # Centre the prices on the first one, which keeps the cumulative sum and
+    # its rounding errors small.
+    offset = close[0] if len(close) else 0.0
+    cumulative_sum = np.concatenate([[0.0], np.cumsum(close - offset)])
+    window_sizes = np.array(windows)
+    ends = np.arange(1, len(close) + 1)[:, np.newaxis]
+    starts = ends - window_sizes
+    window_sums = cumulative_sum[ends] - cumulative_sum[np.maximum(starts, 0)]
+    return np.where(starts >= 0, window_sums / window_sizes + offset, np.nan)
+
+
+def get_performance_metrics_matrix(
+    strategy_returns: np.ndarray, num_rows: np.ndarray | None = None
+) -> pl.DataFrame:
+    """
+    Calculates the performance metrics of many backtests at once, matching
+    Backtester.get_performance_metrics for each column of strategy returns.
+
+    Args:
+        strategy_returns: A 2-D array of daily strategy returns, with one row
+                          per bar and one column per backtest.
+        num_rows: The number of bars in each backtest, if some are shorter
+                  than others. The returns of a shorter backtest are padded
+                  with zeros after its last bar.
+
+    Returns:
+        A DataFrame with one row per backtest containing the 'Total Return',
+        'Sharpe Ratio' and 'Max Drawdown'.
+    """
+    if strategy_returns.shape[1] == 0:
+        return pl.DataFrame(
+            schema=[
+                ("Total Return", pl.Float64),
+                ("Sharpe Ratio", pl.Float64),
+                ("Max Drawdown", pl.Float64),
+            ]
+        )
+
+    cumulative_returns = np.cumprod(1 + strategy_returns, axis=0)
+    total_return = cumulative_returns[-1] - 1
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Measure the risk-adjusted return, assuming 252 trading days per year.
+        if num_rows is None:
+            returns_mean = strategy_returns.mean(axis=0)
+            returns_std = strategy_returns.std(axis=0, ddof=1)
+        else:
+            # The padding doesn't change the cumulative returns, but it's left
+            # out of the mean and standard deviation.
+            returns_mean = strategy_returns.sum(axis=0) / num_rows
+            deviations = np.where(
+                np.arange(len(strategy_returns))[:, np.newaxis] < num_rows,
+                strategy_returns - returns_mean,
+                0.0,
+            )
+            returns_std = np.sqrt((deviations**2).sum(axis=0) / (num_rows - 1))
+        sharpe_ratio = np.where(
+            returns_std != 0, (252**0.5) * returns_mean / returns_std, np.nan
+        )
+
+        # Measure the maximum loss from a peak to a trough of the equity curve.
+        # The initial capital cancels out, so the cumulative returns are used.
+        drawdowns = (
+            cumulative_returns / np.maximum.accumulate(cumulative_returns, axis=0) - 1
+        )
+    # Like Polars' min, fmin skips NaN values.
+    max_drawdown = np.fmin.reduce(drawdowns, axis=0)
+
+    return pl.DataFrame(
+        {
+            "Total Return": total_return,
+            "Sharpe Ratio": sharpe_ratio,
+            "Max Drawdown": max_drawdown,
+        }
+    )
+
+
+def rank_buy_and_hold_tickers(data_by_ticker: dict[str, pl.DataFrame]) -> pl.DataFrame:
+    """
+    Scores the Buy and Hold strategy on every ticker in one pass, matching
+    Backtester.get_performance_metrics for each ticker without running a
+    backtest per ticker.
+
+    Args:
+        data_by_ticker: The historical price data of each ticker.
+
+    Returns:
+        A DataFrame with one row per ticker with data, containing the
+        'Ticker', 'Total Return', 'Sharpe Ratio' and 'Max Drawdown', ranked by
+        total return from highest to lowest. Tickers with the same total
+        return keep the order given, and those without one are ranked last.
+    """
+    prices = [
+        data.select(pl.lit(ticker).alias("Ticker"), pl.col("Close").cast(pl.Float64))
+        for ticker, data in data_by_ticker.items()
+        if not data.is_empty()
+    ]
+    if not prices:
+        return pl.DataFrame(
+            schema=[
+                ("Ticker", pl.String),
+                ("Total Return", pl.Float64),
+                ("Sharpe Ratio", pl.Float64),
+                ("Max Drawdown", pl.Float64),
+            ]
+        )
+
+    # The strategy holds a constant long position, so it earns the returns of
+    # each ticker from its second bar onwards.
+    strategy_returns = get_strategy_returns_expr(
+        pl.col("positions"), get_asset_returns_expr(["Close"])
+    ).over("Ticker")
+    cumulative_returns = (1 + pl.col("strategy_returns")).cum_prod()
+    returns_std = pl.col("strategy_returns").std()
+
+    return (
+        pl.concat(prices)
+        .lazy()
+        .with_columns(pl.lit(1.0).alias("positions"))
+        .with_columns(strategy_returns.alias("strategy_returns"))
+        .group_by("Ticker", maintain_order=True)
+        .agg(
+            (cumulative_returns.last() - 1).alias("Total Return"),
+            # Measure the risk-adjusted return, assuming 252 trading days per
+            # year.
+            pl.when(returns_std != 0)
+            .then((252**0.5) * pl.col("strategy_returns").mean() / returns_std)
+            .otherwise(math.nan)
+            .alias("Sharpe Ratio"),
+            # Measure the maximum loss from a peak to a trough of the equity
+            # curve. The initial capital cancels out, so the cumulative
+            # returns are used.
+            (cumulative_returns / cumulative_returns.cum_max() - 1)
+            .min()
+            .alias("Max Drawdown"),
+        )
+        .sort(
+            pl.col("Total Return").fill_nan(None),
+            descending=True,
+            nulls_last=True,
+            maintain_order=True,
+        )
+        .collect()
+    )
+
+
+def backtest_ticker_pairs(
+    panel: pl.DataFrame,
+    ticker_pairs: list[tuple[str, str]],
+    strategy_params: dict[str, Any],
+    memory_budget: int = PAIRS_MEMORY_BUDGET,
+) -> pl.DataFrame:
+    """
+    Backtests the Pairs Trading strategy with the same parameters on many
+    pairs of tickers at once, matching a Backtester on the data of each pair
+    from get_pair_data.
+
+    The prices of the pairs are taken from the panel side by side as
+    (bars x pairs) blocks, and the spreads, z-scores, signals and returns of
+    every pair in a block are evaluated together. The blocks are sized so
+    that their intermediate arrays fit within the memory budget.
+
+    Args:
+        panel: A panel of closing prices from load_yfinance_data_panel.
+        ticker_pairs: The pairs of tickers to backtest.
+        strategy_params: The parameters of the Pairs Trading strategy.
+        memory_budget: The number of bytes the blocks may use at once.
+
+    Returns:
+        A DataFrame with one row per pair with data, in the order given,
+        containing the 'Ticker 1', 'Ticker 2', 'Total Return', 'Sharpe Ratio'
+        and 'Max Drawdown'.
+    """
+    ticker_pairs = [
+        (ticker1, ticker2)
+        for ticker1, ticker2 in ticker_pairs
+        if ticker1 in panel.columns and ticker2 in panel.columns
+    ]
+    tickers = list(dict.fromkeys(ticker for pair in ticker_pairs for ticker in pair))
+    ticker_indices = {ticker: i for i, ticker in enumerate(tickers)}
+    prices = panel.select(tickers).cast(pl.Float64).fill_nan(None).to_numpy()
+    first = np.array([ticker_indices[ticker1] for ticker1, _ in ticker_pairs])
+    second = np.array([ticker_indices[ticker2] for _, ticker2 in ticker_pairs])
+
+    pairs_per_block = _get_pairs_per_block(len(prices), 1, memory_budget)
+    metrics = [get_performance_metrics_matrix(np.empty((len(prices), 0)))]
+    has_data = [np.zeros(0, dtype=bool)]
+    for start in range(0, len(ticker_pairs), pairs_per_block):
+        block = slice(start, start + pairs_per_block)
+        close_1, close_2, num_rows = _get_pair_closes(
+            prices, first[block], second[block]
+        )
+        spread = close_1 - close_2
+        spread_mean, spread_std = _get_rolling_spread_statistics(
+            spread, int(strategy_params["window"])
+        )
+        strategy_returns = get_pairs_trading_returns_matrix(
+            close_1,
+            close_2,
+            num_rows,
+            get_spread_z_scores(spread, spread_mean, spread_std),
+            np.array([float(strategy_params["entry_z_score"])]),
+            np.array([float(strategy_params["exit_z_score"])]),
+        )
+        metrics.append(
+            get_performance_metrics_matrix(strategy_returns[:, :, 0], num_rows)
+        )
+        has_data.append(num_rows > 0)
+
+    return (
+        pl.concat(metrics)
+        .select(
+            pl.Series("Ticker 1", [ticker1 for ticker1, _ in ticker_pairs], pl.String),
+            pl.Series("Ticker 2", [ticker2 for _, ticker2 in ticker_pairs], pl.String),
+            pl.all(),
+        )
+        .filter(np.concatenate(has_data))
+    )
+
+
+def get_pairs_trading_returns_matrix(
+    close_1: np.ndarray,
+    close_2: np.ndarray,
+    num_rows: np.ndarray,
+    z_score: np.ndarray,
+    entry_z_scores: np.ndarray,
+    exit_z_scores: np.ndarray,
+) -> np.ndarray:
+    """
+    Calculates the daily returns of the Pairs Trading strategy on many pairs
+    and with many thresholds at once, matching PairsTradingStrategy.
+
+    Args:
+        close_1: A 2-D array of the closing prices of the first ticker of
+                 each pair, with one row per bar and one column per pair.
+        close_2: The closing prices of the second ticker of each pair.
+        num_rows: The number of bars of each pair. The prices of a pair with
+                  fewer bars than there are rows are padded with its last
+                  prices.
+        z_score: The z-scores of the spread of each pair, from
+                 get_spread_z_scores.
+        entry_z_scores: The entry z-score of each set of thresholds.
+        exit_z_scores: The exit z-score of each set of thresholds.
+
+    Returns:
+        A 3-D array of the daily strategy returns, with one row per bar, one
+        column per pair and one layer per set of thresholds. The returns in
+        the padding are zero.
+    """
+    # The z-scores don't depend on the thresholds, so they're shared by every
+    # layer.
+    z_score = z_score[:, :, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        asset_returns = (close_1[1:] - close_1[:-1]) / close_1[:-1] - (
+            close_2[1:] - close_2[:-1]
+        ) / close_2[:-1]
+
+    signal = np.select(
+        [
+            z_score > entry_z_scores,
+            z_score < -entry_z_scores,
+            np.abs(z_score) < exit_z_scores,
+        ],
+        [-1.0, 1.0, 0.0],
+        np.nan,
+    )
+    # Hold the previous signal between the entry and exit thresholds, by
+    # forward filling from the last bar that set one.
+    bars = np.arange(len(signal)).reshape(-1, 1, 1)
+    last_set = np.maximum.accumulate(np.where(np.isnan(signal), -1, bars), axis=0)
+    signal = np.where(
+        last_set >= 0,
+        np.take_along_axis(signal, np.maximum(last_set, 0), axis=0),
+        0.0,
+    )
+    strategy_returns = _get_strategy_returns_matrix(signal, asset_returns)
+    strategy_returns[bars[:, :, 0] >= num_rows] = 0.0
+    return strategy_returns
+
+
+def _get_asset_returns_matrix(data: pl.DataFrame) -> np.ndarray:
+    # Gets the asset returns of each bar after the first as a column,
+    # matching get_asset_returns_expr. A missing return earns nothing.
+    return data.select(
+        get_asset_returns_expr(data.columns).cast(pl.Float64).fill_null(0)
+    ).to_numpy()[1:]
+
+
+def _get_strategy_returns_matrix(
+    signal: np.ndarray, asset_returns: np.ndarray
+) -> np.ndarray:
+    # Calculates the strategy returns of (bars x columns x layers) signals,
+    # matching get_strategy_returns_expr. Each bar earns the asset returns on
+    # the previous bar's positions, which are the changes in the signal.
+    positions = np.diff(signal, axis=0, prepend=signal[:1])
+    strategy_returns = np.zeros_like(positions)
+    strategy_returns[1:] = positions[:-1] * asset_returns[:, :, np.newaxis]
+    strategy_returns[np.isinf(strategy_returns)] = 0.0
+    return strategy_returns
+
+
+def get_spread_z_scores(
+    spread: np.ndarray, spread_mean: np.ndarray, spread_std: np.ndarray
+) -> np.ndarray:
+    """
+    Calculates the z-scores of the spreads of pairs, matching
+    PairsTradingStrategy.
+
+    Args:
+        spread: A 2-D array of the spread of each pair, with one row per bar
+                and one column per pair.
+        spread_mean: The rolling mean of each spread, which is NaN until
+                     there's a full window.
+        spread_std: The rolling standard deviation of each spread.
+
+    Returns:
+        A 2-D array of the z-scores of each spread.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Use a z-score of 0 for a flat spread, and until there's a full
+        # window, where the rolling statistics are missing.
+        return np.where(
+            np.isnan(spread_std) | (spread_std == 0),
+            0.0,
+            (spread - spread_mean) / spread_std,
+        )
+
+
+def _get_rolling_spread_statistics(
+    spread: np.ndarray, window: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # Computes the rolling means and standard deviations of the spreads with
+    # Polars, so they match the rolling features of PairsTradingStrategy.
+    spreads = pl.DataFrame(
+        spread, schema=[str(i) for i in range(spread.shape[1])], orient="row"
+    )
+    return (
+        spreads.select(
+            pl.all().rolling_mean(window_size=window, min_samples=window)
+        ).to_numpy(),
+        spreads.select(
+            pl.all().rolling_std(window_size=window, min_samples=window)
+        ).to_numpy(),
+    )
+
+
+def _get_pairs_per_block(num_bars: int, num_thresholds: int, memory_budget: int) -> int:
+    # Each pair has (bars x pairs) arrays for its prices and z-scores, and
+    # (bars x pairs x thresholds) arrays for its signals and returns.
+    pair_size = max(1, num_bars) * 8 * _PAIRS_BLOCK_ARRAYS * (1 + num_thresholds)
+    return max(1, memory_budget // pair_size)
+
+
+def _get_pair_closes(
+    prices: np.ndarray, first: np.ndarray, second: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Takes the closing prices of each pair from a price matrix, keeping only
+    # the dates both tickers traded like get_pair_data. Those dates are moved
+    # to the top of each column, and the rest are padded with the last prices.
+    close_1 = prices[:, first]
+    close_2 = prices[:, second]
+    traded = ~np.isnan(close_1) & ~np.isnan(close_2)
+    num_rows = traded.sum(axis=0)
+    if traded.all():
+        return close_1, close_2, num_rows
+
+    order = np.argsort(~traded, axis=0, kind="stable")
+    rows = np.minimum(
+        np.arange(len(prices))[:, np.newaxis], np.maximum(num_rows - 1, 0)
+    )
+    order = np.take_along_axis(order, rows, axis=0)
+    return (
+        np.take_along_axis(close_1, order, axis=0),
+        np.take_along_axis(close_2, order, axis=0),
+        num_rows,
+    )
@@ -0,0 +1,195 @@
+"""
+Contains collectors for the results of a parameter grid search and of a ticker
+selection, which keep every evaluated candidate rather than only the best one,
+so the sensitivity of a strategy to its parameters, or how close the other
+tickers came to the best one, can be analysed without rerunning the search.
+"""
+
+import heapq
+import math
+from pathlib import Path
+from typing import IO, Any
+
+import polars as pl
+
+# The number of parameter combinations kept on the leaderboard by default.
+DEFAULT_TOP_K = 10
+METRIC_NAMES = ["Total Return", "Sharpe Ratio", "Max Drawdown"]
+
+
+class GridResults:
+    """
+    Collects the results of every parameter combination evaluated in a grid
+    search.
+
+    Every combination is kept in a results table with its parameters,
+    performance metrics and evaluation time. The combinations with the
+    highest Sharpe ratios are also kept on a leaderboard in a bounded
+    min-heap, so the leaderboard stays up to date as results are added
+    without sorting the whole table.
+
+    Attributes:
+        param_names: The names of the strategy parameters.
+        top_k: The number of combinations kept on the leaderboard.
+    """
+
+    def __init__(self, param_names: list[str], top_k: int = DEFAULT_TOP_K):
+        if top_k < 1:
+            raise ValueError(f"Invalid leaderboard size: {top_k}")
+
+        self.param_names = param_names
+        self.top_k = top_k
+        self._frames: list[pl.DataFrame] = []
+        self._num_results = 0
+        # Entries of (Sharpe ratio, -evaluation order, row), so the smallest
+        # entry is the worst combination on the leaderboard, and of those
+        # with the same Sharpe ratio, the one evaluated last.
+        self._leaderboard: list[tuple[float, int, dict[str, Any]]] = []
+
+    def __len__(self) -> int:
+        return self._num_results
+
+    def add(
+        self,
+        param_combinations: list[tuple],
+        grid_metrics: pl.DataFrame,
+        evaluation_time: float | list[float],
+    ) -> None:
+        """
+        Records a batch of evaluated parameter combinations.
+
+        Args:
+            param_combinations: The values of the parameters in each
+                                combination.
+            grid_metrics: The performance metrics of each combination, in
+                          order.
+            evaluation_time: The number of seconds the batch took to
+                             evaluate, which is split evenly between its
+                             combinations, or the number of seconds each
+                             combination took.
+        """
+        if not param_combinations:
+            return
+        if not isinstance(evaluation_time, list):
+            evaluation_time = [evaluation_time / len(param_combinations)] * len(
+                param_combinations
+            )
+
+        frame = pl.DataFrame(
+            param_combinations,
+            schema=self.param_names,
+            orient="row",
+            strict=False,
+        ).with_columns(
+            *grid_metrics.select(METRIC_NAMES),
+            pl.Series("Evaluation Time (s)", evaluation_time, dtype=pl.Float64),
+        )
+        self._frames.append(frame)
+
+        for row in frame.iter_rows(named=True):
+            sharpe_ratio = row["Sharpe Ratio"]
+            if sharpe_ratio is None or math.isnan(sharpe_ratio):
+                sharpe_ratio = float("-inf")
+            entry = (sharpe_ratio, -self._num_results, row)
+            self._num_results += 1
+            if len(self._leaderboard) < self.top_k:
+                heapq.heappush(self._leaderboard, entry)
+            elif entry[:2] > self._leaderboard[0][:2]:
+                heapq.heapreplace(self._leaderboard, entry)
+
+    def to_frame(self) -> pl.DataFrame:
+        """
+        Gets the results table.
+
+        Returns:
+            A DataFrame with one row per evaluated combination, in the order
+            they were evaluated, containing the parameters, the 'Total
+            Return', 'Sharpe Ratio' and 'Max Drawdown', and the 'Evaluation
+            Time (s)'.
+        """
+        if not self._frames:
+            return pl.DataFrame(
+                schema=[(name, pl.Float64) for name in self.param_names]
+                + [(name, pl.Float64) for name in METRIC_NAMES]
+                + [("Evaluation Time (s)", pl.Float64)]
+            )
+        return pl.concat(self._frames, how="vertical_relaxed")
+
+    def get_leaderboard(self) -> pl.DataFrame:
+        """
+        Gets the combinations with the highest Sharpe ratios.
+
+        Returns:
+            A DataFrame with the same columns as the results table, containing
+            up to top_k combinations ranked by Sharpe ratio from highest to
+            lowest. Combinations with the same Sharpe ratio are ranked in the
+            order they were evaluated.
+        """
+        if not self._leaderboard:
+            return self.to_frame().clear()
+        entries = sorted(self._leaderboard, key=lambda entry: entry[:2], reverse=True)
+        return pl.DataFrame(
+            [row for *_, row in entries], schema=self.to_frame().schema, strict=False
+        )
+
+    def write_parquet(self, file: str | Path | IO[bytes]) -> None:
+        """
+        Exports the results table to a Parquet file.
+
+        Args:
+            file: The path or file object to write to.
+        """
+        self.to_frame().write_parquet(file)
+
+
+class TickerRanking:
+    """
+    Collects the performance metrics of every ticker evaluated in a ticker
+    selection, so the tickers can be ranked rather than only the best one
+    being kept.
+    """
+
+    def __init__(self):
+        self._frames: list[pl.DataFrame] = []
+
+    def __len__(self) -> int:
+        return sum(frame.height for frame in self._frames)
+
+    def add(self, ticker_metrics: pl.DataFrame) -> None:
+        """
+        Records the performance metrics of a batch of evaluated tickers.
+
+        Args:
+            ticker_metrics: A DataFrame with a 'Ticker' column and the 'Total
+                            Return', 'Sharpe Ratio' and 'Max Drawdown' of
+                            each ticker.
+        """
+        self._frames.append(
+            ticker_metrics.select(
+                pl.col("Ticker").cast(pl.String),
+                *[pl.col(name).cast(pl.Float64) for name in METRIC_NAMES],
+            )
+        )
+
+    def to_frame(self) -> pl.DataFrame:
+        """
+        Gets the ranking table.
+
+        Returns:
+            A DataFrame with one row per evaluated ticker, containing the
+            'Ticker', 'Total Return', 'Sharpe Ratio' and 'Max Drawdown',
+            ranked by total return from highest to lowest. Tickers without a
+            total return are ranked last, and tickers with the same total
+            return are ranked in the order they were evaluated.
+        """
+        if not self._frames:
+            return pl.DataFrame(
+                schema=[("Ticker", pl.String)]
+                + [(name, pl.Float64) for name in METRIC_NAMES]
+            )
+        return pl.concat(self._frames).sort(
+            pl.col("Total Return").fill_nan(None),
+            descending=True,
+            nulls_last=True,
+            maintain_order=True,
+        )
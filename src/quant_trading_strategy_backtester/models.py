@@ -1,4 +1,6 @@
+import contextlib
 import datetime
+from collections.abc import Callable, Iterator
 
 from sqlalchemy import (
     JSON,
@@ -10,10 +12,14 @@ from sqlalchemy import (
     String,
     create_engine,
 )
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.orm import Session as OrmSession
 
-Base = declarative_base()
+
+class Base(DeclarativeBase):
+    """
+    The base class of the database models.
+    """
 
 
 class StrategyModel(Base):
@@ -47,7 +53,132 @@ class StrategyModel(Base):
     end_date = Column(Date, nullable=False)
 
 
+class CompanyMetadataModel(Base):
+    """
+    Represents the cached metadata of a company in the database.
+
+    Attributes:
+        ticker: The stock ticker symbol of the company.
+        long_name: The full name of the company.
+        long_name_updated_at: The date and time when the full name was fetched.
+        market_cap: The market cap of the company.
+        market_cap_updated_at: The date and time when the market cap was
+                               fetched.
+    """
+
+    __tablename__ = "company_metadata"
+
+    ticker = Column(String, primary_key=True)
+    long_name = Column(String, nullable=True)
+    long_name_updated_at = Column(DateTime, nullable=True)
+    market_cap = Column(Float, nullable=True)
+    market_cap_updated_at = Column(DateTime, nullable=True)
+
+
+class FailedTickerModel(Base):
+    """
+    Represents a ticker that data couldn't be fetched for, so that it's
+    skipped rather than fetched again until the failure expires.
+
+    Attributes:
+        ticker: The stock ticker symbol.
+        reason: Why fetching data for the ticker failed.
+        failed_at: The date and time when fetching data for the ticker failed.
+    """
+
+    __tablename__ = "failed_tickers"
+
+    ticker = Column(String, primary_key=True)
+    reason = Column(String, nullable=False)
+    failed_at = Column(DateTime, nullable=False)
+
+
+class OptimisationResultModel(Base):
+    """
+    Represents the cached performance metrics of a strategy backtested with
+    one parameter combination on one set of price data.
+
+    Attributes:
+        cache_key: The hash of the price data, strategy, parameters and engine
+                   version the result was computed from.
+        strategy_type: The type of strategy backtested.
+        parameters: The parameters used for the strategy.
+        total_return: The total return of the strategy.
+        sharpe_ratio: The Sharpe ratio of the strategy.
+        max_drawdown: The maximum drawdown of the strategy.
+        created_at: The date and time when the result was computed.
+    """
+
+    __tablename__ = "optimisation_results"
+
+    cache_key = Column(String, primary_key=True)
+    strategy_type = Column(String, nullable=False)
+    parameters = Column(JSON, nullable=False)
+    # Metrics that are NaN, e.g. the Sharpe ratio of a strategy that never
+    # trades, are stored as nulls.
+    total_return = Column(Float, nullable=True)
+    sharpe_ratio = Column(Float, nullable=True)
+    max_drawdown = Column(Float, nullable=True)
+    # Indexed for evicting the oldest results.
+    created_at = Column(DateTime, default=datetime.datetime.now, index=True)
+
+
+class OptimisationCheckpointModel(Base):
+    """
+    Represents one item, e.g. a ticker or pair of tickers, evaluated by an
+    interrupted optimisation, so that the optimisation can resume from where
+    it left off.
+
+    Attributes:
+        checkpoint_key: The hash of the optimisation request the item was
+                        evaluated for.
+        item: The evaluated item, as JSON.
+        parameters: The best parameters for the item, or None if it had no
+                    data to evaluate.
+        metrics: The performance metrics of the best parameters, or None if
+                 the item had no data to evaluate.
+        created_at: The date and time when the item was evaluated.
+    """
+
+    __tablename__ = "optimisation_checkpoints"
+
+    checkpoint_key = Column(String, primary_key=True)
+    item = Column(String, primary_key=True)
+    parameters = Column(JSON, nullable=True)
+    metrics = Column(JSON, nullable=True)
+    # Indexed for deleting stale checkpoints.
+    created_at = Column(DateTime, default=datetime.datetime.now, index=True)
+
+
 # Database setup
 engine = create_engine("sqlite:///strategies.db")
 Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
+
+
+@contextlib.contextmanager
+def session_scope(
+    session_factory: Callable[[], OrmSession] | None = None,
+) -> Iterator[OrmSession]:
+    """
+    Provides a database session for a unit of work, rolling it back if the
+    work raises. Callers commit the work themselves.
+
+    Args:
+        session_factory: The session factory for the database. Defaults to the
+                         app's database session.
+
+    Yields:
+        The session. Sessions from the app's database session are closed
+        afterwards, while sessions handed in by a factory, e.g. a shared test
+        session, are owned by the caller and left open.
+    """
+    session = (session_factory or Session)()
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        if session_factory is None:
+            session.close()
@@ -5,18 +5,65 @@ parameters and ticker pairs.
 
 import datetime
 import itertools
+import math
 import time
+from collections.abc import Callable, Hashable, Mapping
 from typing import Any, cast
 
+import numpy as np
 import polars as pl
 import streamlit as st
 
+from quant_trading_strategy_backtester.anytime import (
+    CoverageReport,
+    Deadline,
+    record_coverage,
+    should_stop,
+)
 from quant_trading_strategy_backtester.backtester import Backtester
+from quant_trading_strategy_backtester.bayesian_search import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_EVALUATIONS,
+    TreeParzenEstimator,
+)
+from quant_trading_strategy_backtester.checkpoint import Checkpoint, get_checkpoint_key
 from quant_trading_strategy_backtester.data import (
+    get_company_names,
+    get_pair_data,
     get_top_sp500_companies,
-    is_same_company,
+    iter_yfinance_data_many_tickers,
     load_yfinance_data_one_ticker,
-    load_yfinance_data_two_tickers,
+    load_yfinance_data_panel,
+)
+from quant_trading_strategy_backtester.grid_backtester import (
+    backtest_strategies,
+    backtest_ticker_pairs,
+    rank_buy_and_hold_tickers,
+)
+from quant_trading_strategy_backtester.grid_results import (
+    METRIC_NAMES,
+    GridResults,
+    TickerRanking,
+)
+from quant_trading_strategy_backtester.pair_screening import (
+    select_candidate_pairs,
+    sort_ticker_pairs_by_cointegration,
+)
+from quant_trading_strategy_backtester.parallel import (
+    get_num_workers,
+    get_shared_frame,
+    run_in_process_pool,
+    split_into_chunks,
+)
+from quant_trading_strategy_backtester.result_cache import (
+    cache_results,
+    get_cached_results,
+    get_price_data_fingerprint,
+    get_result_cache_keys,
+)
+from quant_trading_strategy_backtester.results_writer import (
+    ResultsWriter,
+    get_results_writer,
 )
 from quant_trading_strategy_backtester.strategies.base import (
     TRADING_STRATEGIES,
@@ -33,6 +80,52 @@ from quant_trading_strategy_backtester.strategies.pairs_trading import (
     PairsTradingStrategy,
 )
 from quant_trading_strategy_backtester.utils import NUM_TOP_COMPANIES_ONE_TICKER
+from quant_trading_strategy_backtester.visualisation import display_grid_results
+
+# Which of the backtests evaluated during an optimisation are saved: every
+# evaluated combination (via the write-behind results writer), only the final
+# winner, or none of them. The app saves the backtest it displays regardless.
+PERSIST_MODES = ["all", "best", "none"]
+# How to search the parameter combinations: evaluating every combination on
+# the full history, successive halving over longer and longer histories, or a
+# Bayesian search proposing combinations within bounds from the results so
+# far.
+SEARCH_METHODS = ["grid", "successive_halving", "bayesian"]
+# The fraction of candidates successive halving keeps at each rung is
+# 1 / HALVING_RATE, and each rung evaluates them on HALVING_RATE times as many
+# bars as the last.
+HALVING_RATE = 3
+# The fewest bars successive halving scores the candidates on, as Sharpe
+# ratios over shorter periods are too noisy to rank them by.
+MIN_RUNG_BARS = 20
+# The number of parameter combinations a grid search with a deadline
+# evaluates at a time, checking the deadline in between.
+ANYTIME_CHUNK_SIZE = 50
+# The number of ticker pairs backtested at a time by the pairs kernel when
+# there's a deadline.
+ANYTIME_PAIRS_BLOCK_SIZE = 100
+# How many chunks to split the work into per worker process, so that the
+# workers stay busy when some chunks take longer than others.
+CHUNKS_PER_WORKER = 4
+
+
+def get_persistence_options(persist: str) -> tuple[bool, ResultsWriter | None]:
+    """
+    Gets the Backtester persistence options for the backtests evaluated
+    during an optimisation.
+
+    Args:
+        persist: The persistence mode, one of PERSIST_MODES.
+
+    Returns:
+        A tuple containing whether to save each evaluated backtest, and the
+        results writer to queue the saves on.
+    """
+    if persist not in PERSIST_MODES:
+        raise ValueError(f"Invalid persistence mode: {persist}")
+    if persist == "all":
+        return True, get_results_writer()
+    return False, None
 
 
 def run_optimisation(
@@ -42,9 +135,14 @@ def run_optimisation(
     start_date: datetime.date,
     end_date: datetime.date,
     tickers: str | list[str],
+    search_method: str = "grid",
+    deadline: Deadline | None = None,
+    coverage: CoverageReport | None = None,
 ) -> tuple[dict[str, Any], dict[str, float]]:
     """
     Runs the optimisation process for strategy parameters or ticker selection.
+    If the deadline passes first, the best result found so far is displayed,
+    with a warning of how much of the search was covered.
 
     Args:
         data: Historical price data.
@@ -53,6 +151,11 @@ def run_optimisation(
         start_date: Start date for historical data.
         end_date: End date for historical data.
         tickers: The ticker or tickers used in the backtest.
+        search_method: How to search the strategy parameters, one of
+                       SEARCH_METHODS.
+        deadline: The deadline to stop optimising at, or None for no
+                  deadline.
+        coverage: A report to record how much of the search was covered in.
 
     Returns:
         A tuple containing:
@@ -61,27 +164,42 @@ def run_optimisation(
     """
     st.info("Optimising strategy. This may take a while...")
     start_time = time.time()
+    coverage = coverage or CoverageReport()
 
     if strategy_type == "Buy and Hold":
         top_companies = get_top_sp500_companies(NUM_TOP_COMPANIES_ONE_TICKER)
         best_ticker, strategy_params, metrics = optimise_buy_and_hold_ticker(
-            top_companies, start_date, end_date
+            top_companies,
+            start_date,
+            end_date,
+            deadline=deadline,
+            coverage=coverage,
         )
         st.success(f"Best ticker for Buy and Hold: {best_ticker}")
+        grid_results = None
     else:
+        grid_results = GridResults(list(strategy_params.keys()))
         strategy_params, metrics = optimise_strategy_params(
             data,
             strategy_type,
             cast(dict[str, range | list[int | float]], strategy_params),
             tickers,
+            grid_results=grid_results,
+            search_method=search_method,
+            deadline=deadline,
+            coverage=coverage,
         )
 
     end_time = time.time()
     duration = end_time - start_time
     st.success(f"Optimisation complete! Time taken: {duration:.4f} seconds")
+    if not coverage.is_complete:
+        st.warning(coverage.get_summary())
 
     st.header("Optimal Parameters")
     st.write(strategy_params)
+    if grid_results is not None:
+        display_grid_results(grid_results)
 
     return strategy_params, metrics
 
@@ -90,15 +208,27 @@ def optimise_buy_and_hold_ticker(
     top_companies: list[tuple[str, float]],
     start_date: datetime.date,
     end_date: datetime.date,
+    persist: str = "none",
+    deadline: Deadline | None = None,
+    coverage: CoverageReport | None = None,
+    ranking: TickerRanking | None = None,
 ) -> tuple[str, dict[str, Any], dict[str, float]]:
     """
-    Optimises ticker selection for the Buy and Hold strategy.
+    Optimises ticker selection for the Buy and Hold strategy. Every ticker is
+    scored in one vectorised pass, and only the winner is backtested, unless
+    every ticker's backtest has to be saved. If the deadline passes, only the
+    tickers loaded so far, which have the largest market caps, are scored.
 
     Args:
         top_companies: List of tuples containing ticker symbols and market caps
                        of top companies.
         start_date: Start date for historical data.
         end_date: End date for historical data.
+        persist: Which evaluated backtests to save, one of PERSIST_MODES.
+        deadline: The deadline to stop searching at, or None for no deadline.
+        coverage: A report to record how many tickers were evaluated in.
+        ranking: A collector to record the performance metrics of every
+                 evaluated ticker in, so the tickers can be ranked.
 
     Returns:
         A tuple containing the best ticker, strategy parameters, and
@@ -106,36 +236,90 @@ def optimise_buy_and_hold_ticker(
     """
     best_ticker = None
     best_metrics = None
+    best_backtester = None
     best_total_return = float("-inf")
+    save_each, results_writer = get_persistence_options(persist)
 
     total_tickers = len(top_companies)
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for i, (ticker, _) in enumerate(top_companies):
+    # Load the tickers in chunks, fetching the next chunk while the current one
+    # is evaluated.
+    tickers = [ticker for ticker, _ in top_companies]
+    data_by_ticker = {}
+    num_evaluated = 0
+    for i, (ticker, data) in enumerate(
+        iter_yfinance_data_many_tickers(tickers, start_date, end_date)
+    ):
+        if should_stop(deadline, num_evaluated):
+            break
+        num_evaluated += 1
         status_text.text(f"Evaluating ticker {i + 1} / {total_tickers}: {ticker}")
         progress_bar.progress((i + 1) / total_tickers)
 
-        data = load_yfinance_data_one_ticker(ticker, start_date, end_date)
         if data is None or data.is_empty():
             continue
 
+        if not save_each:
+            data_by_ticker[ticker] = data
+            continue
+
+        # Every ticker has to be saved, so each one is run through its own
+        # Backtester.
         strategy = BuyAndHoldStrategy({})
-        backtester = Backtester(data, strategy, tickers=ticker)
+        backtester = Backtester(
+            data,
+            strategy,
+            tickers=ticker,
+            persist=save_each,
+            results_writer=results_writer,
+        )
         backtester.run()
         metrics = backtester.get_performance_metrics()
+        if metrics and ranking is not None:
+            ranking.add(
+                pl.DataFrame(
+                    {"Ticker": [ticker]}
+                    | {name: [metrics[name]] for name in METRIC_NAMES}
+                )
+            )
 
         if metrics and metrics["Total Return"] > best_total_return:
             best_total_return = metrics["Total Return"]
             best_ticker = ticker
             best_metrics = metrics
+            best_backtester = backtester
+
+    if not save_each:
+        ticker_metrics = rank_buy_and_hold_tickers(data_by_ticker)
+        if ranking is not None:
+            ranking.add(ticker_metrics)
+        ticker_metrics = ticker_metrics.filter(pl.col("Total Return").is_not_nan())
+        if not ticker_metrics.is_empty():
+            # Only the winner is run through the Backtester.
+            best_ticker = ticker_metrics["Ticker"][0]
+            best_backtester = Backtester(
+                data_by_ticker[best_ticker],
+                BuyAndHoldStrategy({}),
+                tickers=best_ticker,
+                persist=False,
+            )
+            best_backtester.run()
+            best_metrics = best_backtester.get_performance_metrics()
 
     progress_bar.empty()
     status_text.empty()
+    record_coverage(coverage, deadline, num_evaluated, total_tickers)
 
-    if not best_ticker or not best_metrics:
+    if not best_ticker or not best_metrics or not best_backtester:
         raise ValueError("Buy and Hold optimisation failed")
 
+    if persist == "best":
+        best_backtester.save_results()
+    elif results_writer is not None:
+        results_writer.flush()
+
     return best_ticker, {}, best_metrics
 
 
@@ -145,9 +329,23 @@ def optimise_single_ticker_strategy_ticker(
     end_date: datetime.date,
     strategy_type: str,
     strategy_params: dict[str, Any],
+    persist: str = "none",
+    deadline: Deadline | None = None,
+    coverage: CoverageReport | None = None,
+    use_checkpoint: bool = True,
 ) -> str:
     """
-    Optimises ticker selection for single ticker strategies.
+    Optimises ticker selection for single ticker strategies. If the deadline
+    passes, the best of the tickers evaluated so far, which have the largest
+    market caps, is returned.
+
+    The tickers evaluated are checkpointed as the optimisation runs, so that
+    if it's interrupted, the next identical optimisation resumes from the
+    checkpoint rather than starting over. The tickers are loaded one chunk at
+    a time, so rather than keying the checkpoint by all of their prices, each
+    ticker's result is checkpointed with a fingerprint of its prices, and is
+    only reused if its prices are the same, e.g. not if today's bar has
+    changed since.
 
     Args:
         top_companies: List of tuples containing ticker symbols and market caps
@@ -156,12 +354,21 @@ def optimise_single_ticker_strategy_ticker(
         end_date: End date for historical data.
         strategy_type: The type of strategy being used.
         strategy_params: Strategy parameters.
+        persist: Which evaluated backtests to save, one of PERSIST_MODES.
+        deadline: The deadline to stop searching at, or None for no deadline.
+        coverage: A report to record how many tickers were evaluated in.
+        use_checkpoint: Whether to checkpoint the tickers evaluated, and
+                        resume from an earlier checkpoint. Ignored if every
+                        backtest is saved.
 
     Returns:
         The best ticker.
     """
     best_ticker = None
+    best_data_ticker = None
+    best_data = None
     best_sharpe_ratio = float("-inf")
+    save_each, results_writer = get_persistence_options(persist)
 
     total_tickers = len(top_companies)
     progress_bar = st.progress(0)
@@ -173,45 +380,162 @@ def optimise_single_ticker_strategy_ticker(
         for k, v in strategy_params.items()
     }
 
-    for i, (ticker, _) in enumerate(top_companies):
-        status_text.text(f"Evaluating ticker {i + 1} / {total_tickers}: {ticker}")
-        progress_bar.progress((i + 1) / total_tickers)
-
-        data = load_yfinance_data_one_ticker(ticker, start_date, end_date)
-        if data is None or data.is_empty():
-            continue
-
-        _, current_metrics = run_backtest(data, strategy_type, fixed_params, ticker)
-
-        if current_metrics["Sharpe Ratio"] > best_sharpe_ratio:
-            best_sharpe_ratio = current_metrics["Sharpe Ratio"]
+    tickers = [ticker for ticker, _ in top_companies]
+    # Resume from the checkpoint of an identical optimisation that was
+    # interrupted, unless every backtest has to be saved, as the backtests
+    # before the interruption may not all have been written.
+    checkpoint = None
+    resumed: dict[Hashable, tuple[dict[str, Any], dict[str, float]] | None] = {}
+    ticker_results: dict[str, tuple[dict[str, Any], dict[str, float]] | None] = {}
+    if use_checkpoint and not save_each:
+        checkpoint = Checkpoint(
+            get_checkpoint_key(
+                "single_ticker_strategy_ticker",
+                {
+                    "tickers": tickers,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "strategy_type": strategy_type,
+                    "strategy_params": fixed_params,
+                },
+            )
+        )
+        resumed = checkpoint.load()
+
+    # Load the tickers in chunks, fetching the next chunk while the current one
+    # is evaluated.
+    try:
+        for ticker, data in iter_yfinance_data_many_tickers(
+            tickers, start_date, end_date
+        ):
+            checkpoint_item = (ticker, get_price_data_fingerprint(data))
+            if checkpoint_item in resumed:
+                ticker_results[ticker] = resumed[checkpoint_item]
+                continue
+            if should_stop(deadline, len(ticker_results)):
+                break
+            status_text.text(
+                f"Evaluating ticker {len(ticker_results) + 1} / {total_tickers}: "
+                f"{ticker}"
+            )
+            progress_bar.progress((len(ticker_results) + 1) / total_tickers)
+
+            if data.is_empty():
+                result = None
+            else:
+                _, current_metrics = run_backtest(
+                    data,
+                    strategy_type,
+                    fixed_params,
+                    ticker,
+                    persist=save_each,
+                    results_writer=results_writer,
+                )
+                result = (fixed_params, current_metrics)
+                # Keep the data of the best ticker evaluated, in case it has
+                # to be saved.
+                if current_metrics["Sharpe Ratio"] > best_sharpe_ratio:
+                    best_sharpe_ratio = current_metrics["Sharpe Ratio"]
+                    best_data_ticker = ticker
+                    best_data = data
+
+            ticker_results[ticker] = result
+            if checkpoint is not None:
+                checkpoint.add(checkpoint_item, result)
+    finally:
+        # Write the checkpoint even if the optimisation is interrupted, e.g.
+        # by a Streamlit rerun.
+        if checkpoint is not None:
+            checkpoint.flush()
+
+    # Pick the best ticker in order, so that the same ticker wins whether or
+    # not the optimisation was resumed.
+    best_sharpe_ratio = float("-inf")
+    for ticker in tickers:
+        result = ticker_results.get(ticker)
+        if result is not None and result[1]["Sharpe Ratio"] > best_sharpe_ratio:
+            best_sharpe_ratio = result[1]["Sharpe Ratio"]
             best_ticker = ticker
 
     progress_bar.empty()
     status_text.empty()
+    record_coverage(coverage, deadline, len(ticker_results), total_tickers)
+    if checkpoint is not None and len(ticker_results) == total_tickers:
+        checkpoint.delete()
 
     if not best_ticker:
         raise ValueError("Single ticker strategy ticker optimisation failed")
 
+    if persist == "best":
+        if best_data is None or best_data_ticker != best_ticker:
+            best_data = load_yfinance_data_one_ticker(best_ticker, start_date, end_date)
+        run_backtest(best_data, strategy_type, fixed_params, best_ticker)
+    elif results_writer is not None:
+        results_writer.flush()
+
     return best_ticker
 
 
 def optimise_strategy_params(
     data: pl.DataFrame,
     strategy_type: str,
-    parameter_ranges: dict[str, range | list[int | float]],
+    parameter_ranges: Mapping[
+        str, range | list[int | float] | tuple[int | float, int | float]
+    ],
     tickers: str | list[str],
+    persist: str = "none",
+    n_jobs: int = 1,
+    grid_results: GridResults | None = None,
+    use_result_cache: bool = True,
+    search_method: str = "grid",
+    max_evaluations: int = DEFAULT_MAX_EVALUATIONS,
+    deadline: Deadline | None = None,
+    coverage: CoverageReport | None = None,
 ) -> tuple[dict[str, int | float], dict[str, float]]:
     """
-    Optimises strategy parameters by testing all combinations within given
-    ranges.
+    Optimises strategy parameters by testing combinations within given ranges.
+    The combinations are evaluated in one vectorised pass, unless every
+    combination has to be saved, and those already evaluated on the same data
+    are taken from the result cache.
+
+    A grid search evaluates every combination on the full history. Successive
+    halving evaluates every combination on a short recent period, and only
+    evaluates the best of them on progressively longer periods, until the
+    survivors are evaluated on the full history. Bayesian search treats the
+    lowest and highest values of each parameter as its bounds, and searches
+    between them continuously, proposing batches of combinations from the
+    results so far until it has evaluated max_evaluations of them.
+
+    If the deadline passes or the optimisation is cancelled, it stops after
+    the evaluations in progress, and returns the best combination found so
+    far. With a deadline, a grid search evaluates the combinations in
+    chunks, starting with the chunk spread evenly across the grid, then the
+    chunks closest to the best combination so far.
 
     Args:
         data: Historical price data.
         strategy_type: The type of strategy to optimise.
         parameter_ranges: A dictionary of parameters and their possible values
-                          to test.
+                          to test, or with Bayesian search, their bounds, e.g.
+                          (1.0, 3.0). Parameters with integer bounds are kept
+                          to integers.
         tickers: The ticker or tickers used in the backtest.
+        persist: Which evaluated backtests to save, one of PERSIST_MODES.
+        n_jobs: The number of worker processes to split the grid between, or
+                -1 to use every CPU. Ignored if every combination is saved.
+        grid_results: A collector to record every evaluated combination in,
+                      so the whole grid can be analysed afterwards.
+        use_result_cache: Whether to take the metrics of combinations from the
+                          result cache, and cache the metrics of those
+                          evaluated. Ignored if every combination is saved.
+        search_method: How to search the combinations, one of SEARCH_METHODS.
+                       With successive halving, only the combinations
+                       evaluated on the full history are recorded in
+                       grid_results.
+        max_evaluations: The most combinations Bayesian search evaluates.
+                         Ignored by the other search methods.
+        deadline: The deadline to stop searching at, or None for no deadline.
+        coverage: A report to record how much of the search was covered in.
 
     Returns:
         A tuple containing the best parameters and their performance metrics.
@@ -219,6 +543,11 @@ def optimise_strategy_params(
     best_params = None
     best_metrics = None
     best_sharpe_ratio = float("-inf")
+    save_each, results_writer = get_persistence_options(persist)
+    if search_method not in SEARCH_METHODS:
+        raise ValueError(f"Invalid search method: {search_method}")
+    if save_each and search_method != "grid":
+        raise ValueError("Only a grid search can save every evaluated backtest")
 
     param_names = list(parameter_ranges.keys())
     param_values = [
@@ -226,44 +555,690 @@ def optimise_strategy_params(
         for value in parameter_ranges.values()
     ]
 
-    param_combinations = list(itertools.product(*param_values))
+    # Bayesian search proposes its own combinations within the bounds.
+    param_combinations = (
+        [] if search_method == "bayesian" else list(itertools.product(*param_values))
+    )
     total_combinations = len(param_combinations)
+    num_evaluated = 0
+    num_planned = total_combinations
     # Display progress bar and status text, as this process may take a while.
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for i, params in enumerate(param_combinations):
-        status_text.text(
-            f"Evaluating parameter combination {i + 1} / {total_combinations}"
+    if save_each:
+        # Every combination has to be saved, so each one is run through its
+        # own Backtester.
+        for i, params in enumerate(param_combinations):
+            if should_stop(deadline, i):
+                break
+            status_text.text(
+                f"Evaluating parameter combination {i + 1} / {total_combinations}"
+            )
+            progress_bar.progress((i + 1) / total_combinations)
+
+            current_params = dict(zip(param_names, params))
+            start_time = time.time()
+            _, metrics = run_backtest(
+                data,
+                strategy_type,
+                current_params,
+                tickers,
+                persist=save_each,
+                results_writer=results_writer,
+            )
+            if grid_results is not None:
+                grid_results.add(
+                    [params], pl.DataFrame([metrics]), time.time() - start_time
+                )
+
+            num_evaluated += 1
+
+            if metrics["Sharpe Ratio"] > best_sharpe_ratio:
+                best_sharpe_ratio = metrics["Sharpe Ratio"]
+                best_params = current_params
+                best_metrics = metrics
+    elif search_method == "bayesian":
+        best_params, best_metrics, num_evaluated = _search_by_bayesian_optimisation(
+            data,
+            strategy_type,
+            {
+                name: (min(values), max(values))
+                for name, values in zip(param_names, param_values)
+            },
+            max_evaluations,
+            n_jobs,
+            use_result_cache,
+            grid_results,
+            deadline,
+            progress_bar,
+            status_text,
         )
-        progress_bar.progress((i + 1) / total_combinations)
-
-        current_params = dict(zip(param_names, params))
-        _, metrics = run_backtest(data, strategy_type, current_params, tickers)
-
-        if metrics["Sharpe Ratio"] > best_sharpe_ratio:
-            best_sharpe_ratio = metrics["Sharpe Ratio"]
-            best_params = current_params
-            best_metrics = metrics
+        num_planned = max_evaluations
+    elif search_method == "successive_halving":
+        best_params, best_metrics, num_evaluated, num_planned = (
+            _search_by_successive_halving(
+                data,
+                strategy_type,
+                param_names,
+                param_combinations,
+                n_jobs,
+                use_result_cache,
+                grid_results,
+                deadline,
+                progress_bar,
+                status_text,
+            )
+        )
+    elif deadline is not None:
+        best_params, best_metrics, num_evaluated = _search_parameter_grid_by_priority(
+            data,
+            strategy_type,
+            param_names,
+            param_combinations,
+            n_jobs,
+            use_result_cache,
+            grid_results,
+            deadline,
+            progress_bar,
+            status_text,
+        )
+    else:
+        grid_metrics, evaluation_times = _evaluate_parameter_combinations(
+            data,
+            strategy_type,
+            param_names,
+            param_combinations,
+            n_jobs,
+            use_result_cache,
+            progress_bar,
+            status_text,
+        )
+        if grid_results is not None:
+            grid_results.add(param_combinations, grid_metrics, evaluation_times)
+        best_params, best_metrics = select_best_parameters(
+            param_names, param_combinations, grid_metrics
+        )
+        num_evaluated = total_combinations
 
     progress_bar.empty()
     status_text.empty()
+    record_coverage(coverage, deadline, num_evaluated, num_planned)
     if not best_params or not best_metrics:
         raise ValueError("Parameter optimisation failed")
 
+    if persist == "best":
+        run_backtest(data, strategy_type, best_params, tickers)
+    elif results_writer is not None:
+        results_writer.flush()
+
     return best_params, best_metrics
 
 
+def search_parameter_grid(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+) -> tuple[dict[str, Any] | None, dict[str, float] | None]:
+    """
+    Backtests every parameter combination in one vectorised pass, and picks
+    the best one.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+
+    Returns:
+        A tuple containing the best parameters and their performance metrics,
+        or None for both if no combination has a valid Sharpe ratio.
+    """
+    grid_metrics = backtest_parameter_grid(
+        data, strategy_type, param_names, param_combinations
+    )
+    return select_best_parameters(param_names, param_combinations, grid_metrics)
+
+
+def backtest_parameter_grid(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+) -> pl.DataFrame:
+    """
+    Backtests every parameter combination in one vectorised pass.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+
+    Returns:
+        A DataFrame with the performance metrics of each combination, in
+        order.
+    """
+    strategies = [
+        create_strategy(strategy_type, dict(zip(param_names, params)))
+        for params in param_combinations
+    ]
+    return backtest_strategies(data, strategies)
+
+
+def select_best_parameters(
+    param_names: list[str],
+    param_combinations: list[tuple],
+    grid_metrics: pl.DataFrame,
+) -> tuple[dict[str, Any] | None, dict[str, float] | None]:
+    """
+    Picks the first parameter combination with the highest Sharpe ratio,
+    ignoring NaNs, to match the order the combinations would be evaluated in.
+
+    Args:
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+        grid_metrics: The performance metrics of each combination, in order.
+
+    Returns:
+        A tuple containing the best parameters and their performance metrics,
+        or None for both if no combination has a valid Sharpe ratio.
+    """
+    if not param_combinations:
+        return None, None
+
+    sharpe_ratios = np.nan_to_num(
+        grid_metrics["Sharpe Ratio"].to_numpy(), nan=float("-inf")
+    )
+    best_index = int(np.argmax(sharpe_ratios))
+    if sharpe_ratios[best_index] == float("-inf"):
+        return None, None
+    best_params = dict(zip(param_names, param_combinations[best_index]))
+    return best_params, grid_metrics.row(best_index, named=True)
+
+
+def get_successive_halving_rungs(
+    num_combinations: int, num_bars: int, warm_up_bars: int
+) -> list[int]:
+    """
+    Gets the number of most recent bars of price data that successive halving
+    evaluates the candidates on at each rung.
+
+    Each rung up evaluates HALVING_RATE times fewer candidates on HALVING_RATE
+    times as many bars, after the warm-up bars every candidate needs to start
+    trading, until the last rung evaluates the survivors on every bar. Rungs
+    that would score fewer than MIN_RUNG_BARS bars are left out.
+
+    Args:
+        num_combinations: The number of parameter combinations to search.
+        num_bars: The number of bars of price data.
+        warm_up_bars: The number of bars the candidates need before they can
+                      start trading, such as their longest window.
+
+    Returns:
+        The number of bars of each rung, from the first rung to the last.
+    """
+    rungs = [num_bars]
+    scored_bars = num_bars - warm_up_bars
+    num_candidates = HALVING_RATE
+    while num_candidates <= num_combinations:
+        scored_bars //= HALVING_RATE
+        if scored_bars < MIN_RUNG_BARS:
+            break
+        rungs.append(warm_up_bars + scored_bars)
+        num_candidates *= HALVING_RATE
+    return rungs[::-1]
+
+
+def _search_by_successive_halving(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+    n_jobs: int,
+    use_result_cache: bool,
+    grid_results: GridResults | None,
+    deadline: Deadline | None,
+    progress_bar: Any,
+    status_text: Any,
+) -> tuple[dict[str, Any] | None, dict[str, float] | None, int, int]:
+    """
+    Searches parameter combinations by successive halving, keeping the best
+    1 / HALVING_RATE of the candidates by Sharpe ratio at each rung. If the
+    deadline passes, only the leader of the last rung evaluated is
+    evaluated on the full history.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+        n_jobs: The number of worker processes to split each rung between, or
+                -1 to use every CPU.
+        use_result_cache: Whether to use the result cache.
+        grid_results: A collector to record the combinations evaluated on the
+                      full history in.
+        deadline: The deadline to stop searching at, or None.
+        progress_bar: The progress bar to update.
+        status_text: The status text to update.
+
+    Returns:
+        A tuple containing the best parameters and their performance metrics
+        on the full history, or None for both if no combination has a valid
+        Sharpe ratio, and the number of evaluations made and planned across
+        the rungs.
+    """
+    # The longest window of any candidate, which is how long the candidates
+    # take to start trading.
+    warm_up_bars = max(
+        (
+            int(value)
+            for params in param_combinations
+            for name, value in zip(param_names, params)
+            if name.endswith("window")
+        ),
+        default=0,
+    )
+    rungs = get_successive_halving_rungs(
+        len(param_combinations), len(data), warm_up_bars
+    )
+    num_planned = 0
+    num_candidates = len(param_combinations)
+    for _ in rungs:
+        num_planned += num_candidates
+        num_candidates = math.ceil(num_candidates / HALVING_RATE)
+
+    candidates = param_combinations
+    num_evaluated = 0
+    # The best candidate of the last rung evaluated.
+    leader = None
+    for num_bars in rungs[:-1]:
+        if leader is not None and should_stop(deadline, num_evaluated):
+            # Out of time, so skip straight to the last rung with the leader.
+            candidates = [leader]
+            break
+        grid_metrics, _ = _evaluate_parameter_combinations(
+            data.tail(num_bars),
+            strategy_type,
+            param_names,
+            candidates,
+            n_jobs,
+            use_result_cache,
+            progress_bar,
+            status_text,
+        )
+        # Keep the best candidates, in the order they were given.
+        sharpe_ratios = np.nan_to_num(
+            grid_metrics["Sharpe Ratio"].to_numpy(), nan=float("-inf")
+        )
+        num_evaluated += len(candidates)
+        num_survivors = math.ceil(len(candidates) / HALVING_RATE)
+        ranking = np.argsort(-sharpe_ratios, kind="stable")
+        leader = candidates[ranking[0]]
+        candidates = [candidates[i] for i in sorted(ranking[:num_survivors])]
+
+    grid_metrics, evaluation_times = _evaluate_parameter_combinations(
+        data,
+        strategy_type,
+        param_names,
+        candidates,
+        n_jobs,
+        use_result_cache,
+        progress_bar,
+        status_text,
+    )
+    if grid_results is not None:
+        grid_results.add(candidates, grid_metrics, evaluation_times)
+    num_evaluated += len(candidates)
+    best_params, best_metrics = select_best_parameters(
+        param_names, candidates, grid_metrics
+    )
+    return best_params, best_metrics, num_evaluated, num_planned
+
+
+def _search_parameter_grid_by_priority(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+    n_jobs: int,
+    use_result_cache: bool,
+    grid_results: GridResults | None,
+    deadline: Deadline,
+    progress_bar: Any,
+    status_text: Any,
+) -> tuple[dict[str, Any] | None, dict[str, float] | None, int]:
+    """
+    Searches a parameter grid in chunks, most promising first, until the
+    deadline passes.
+
+    The first chunk is spread evenly across the grid, and each chunk after
+    it is the remaining combinations closest to the best combination so far,
+    so stopping early still covers the neighbourhood of the best
+    combinations.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+        n_jobs: The number of worker processes to split each chunk between,
+                or -1 to use every CPU.
+        use_result_cache: Whether to use the result cache.
+        grid_results: A collector to record every evaluated combination in.
+        deadline: The deadline to stop searching at.
+        progress_bar: The progress bar to update.
+        status_text: The status text to update.
+
+    Returns:
+        A tuple containing the best parameters and their performance metrics,
+        or None for both if no combination has a valid Sharpe ratio, and the
+        number of combinations evaluated.
+    """
+    if not param_combinations:
+        return None, None, 0
+
+    # Scale each parameter to [0, 1] across the grid, so that distances weigh
+    # the parameters equally.
+    points = np.array(param_combinations, dtype=np.float64).reshape(
+        len(param_combinations), -1
+    )
+    spans = np.ptp(points, axis=0)
+    points = (points - points.min(axis=0)) / np.where(spans > 0, spans, 1.0)
+
+    remaining = np.arange(len(param_combinations))
+    evaluated_indices: list[int] = []
+    evaluated_metrics = []
+    best_index = None
+    while len(remaining) and not should_stop(deadline, len(evaluated_indices)):
+        if best_index is None:
+            positions = np.linspace(
+                0, len(remaining) - 1, min(ANYTIME_CHUNK_SIZE, len(remaining))
+            )
+            chunk = remaining[positions.round().astype(int)]
+        else:
+            distances = np.abs(points[remaining] - points[best_index]).sum(axis=1)
+            chunk = remaining[np.argsort(distances, kind="stable")[:ANYTIME_CHUNK_SIZE]]
+        remaining = np.setdiff1d(remaining, chunk)
+
+        chunk_combinations = [param_combinations[i] for i in chunk]
+        grid_metrics, evaluation_times = _evaluate_parameter_combinations(
+            data,
+            strategy_type,
+            param_names,
+            chunk_combinations,
+            n_jobs,
+            use_result_cache,
+            progress_bar,
+            status_text,
+        )
+        if grid_results is not None:
+            grid_results.add(chunk_combinations, grid_metrics, evaluation_times)
+        evaluated_indices.extend(chunk.tolist())
+        evaluated_metrics.append(grid_metrics)
+        progress_bar.progress(len(evaluated_indices) / len(param_combinations))
+
+        sharpe_ratios = np.nan_to_num(
+            pl.concat(evaluated_metrics)["Sharpe Ratio"].to_numpy(),
+            nan=float("-inf"),
+        )
+        if sharpe_ratios.max() > float("-inf"):
+            best_index = evaluated_indices[int(np.argmax(sharpe_ratios))]
+
+    if not evaluated_indices:
+        return None, None, 0
+    # Pick the best combination in grid order, so that ties are broken the
+    # same way as when the whole grid is evaluated at once.
+    order = np.argsort(evaluated_indices)
+    best_params, best_metrics = select_best_parameters(
+        param_names,
+        [param_combinations[evaluated_indices[i]] for i in order],
+        pl.concat(evaluated_metrics)[order],
+    )
+    return best_params, best_metrics, len(evaluated_indices)
+
+
+def _search_by_bayesian_optimisation(
+    data: pl.DataFrame,
+    strategy_type: str,
+    bounds: dict[str, tuple[int | float, int | float]],
+    max_evaluations: int,
+    n_jobs: int,
+    use_result_cache: bool,
+    grid_results: GridResults | None,
+    deadline: Deadline | None,
+    progress_bar: Any,
+    status_text: Any,
+) -> tuple[dict[str, Any] | None, dict[str, float] | None, int]:
+    """
+    Searches parameter combinations within bounds with a tree-structured
+    Parzen estimator, evaluating each batch of proposals in one vectorised
+    pass, until the budget runs out or the deadline passes.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        bounds: The lowest and highest value of each parameter.
+        max_evaluations: The most combinations to evaluate.
+        n_jobs: The number of worker processes to split each batch between,
+                or -1 to use every CPU.
+        use_result_cache: Whether to use the result cache.
+        grid_results: A collector to record every evaluated combination in.
+        deadline: The deadline to stop searching at, or None.
+        progress_bar: The progress bar to update.
+        status_text: The status text to update.
+
+    Returns:
+        A tuple containing the best parameters and their performance metrics,
+        or None for both if no combination has a valid Sharpe ratio, and the
+        number of combinations evaluated.
+    """
+    if max_evaluations < 1:
+        raise ValueError(f"Invalid maximum number of evaluations: {max_evaluations}")
+
+    param_names = list(bounds)
+    # A fixed seed makes repeated searches propose the same combinations, so
+    # they can be answered from the result cache.
+    estimator = TreeParzenEstimator(bounds, seed=0)
+    evaluated: list[tuple] = []
+    evaluated_metrics = []
+    while len(evaluated) < max_evaluations and not should_stop(
+        deadline, len(evaluated)
+    ):
+        batch = estimator.suggest(
+            min(DEFAULT_BATCH_SIZE, max_evaluations - len(evaluated))
+        )
+        if not batch:
+            # Every combination of the integer parameters has been evaluated.
+            break
+        grid_metrics, evaluation_times = _evaluate_parameter_combinations(
+            data,
+            strategy_type,
+            param_names,
+            batch,
+            n_jobs,
+            use_result_cache,
+            progress_bar,
+            status_text,
+        )
+        estimator.observe(batch, grid_metrics["Sharpe Ratio"].to_list())
+        if grid_results is not None:
+            grid_results.add(batch, grid_metrics, evaluation_times)
+        evaluated.extend(batch)
+        evaluated_metrics.append(grid_metrics)
+        progress_bar.progress(len(evaluated) / max_evaluations)
+
+    if not evaluated:
+        return None, None, 0
+    best_params, best_metrics = select_best_parameters(
+        param_names, evaluated, pl.concat(evaluated_metrics)
+    )
+    return best_params, best_metrics, len(evaluated)
+
+
+def _evaluate_parameter_combinations(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+    n_jobs: int,
+    use_result_cache: bool,
+    progress_bar: Any,
+    status_text: Any,
+) -> tuple[pl.DataFrame, list[float]]:
+    """
+    Gets the performance metrics of parameter combinations, only evaluating
+    those without a result cached from an earlier optimisation on the same
+    data.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+        n_jobs: The number of worker processes to split the combinations
+                between, or -1 to use every CPU.
+        use_result_cache: Whether to use the result cache.
+        progress_bar: The progress bar to update.
+        status_text: The status text to update.
+
+    Returns:
+        A tuple containing a DataFrame with the performance metrics of each
+        combination, and the number of seconds each took to evaluate, which
+        is 0 for cached combinations.
+    """
+    total_combinations = len(param_combinations)
+    cache_keys = (
+        get_result_cache_keys(data, strategy_type, param_names, param_combinations)
+        if use_result_cache
+        else []
+    )
+    cached_metrics = get_cached_results(cache_keys)
+    is_pending = [
+        not cache_keys or cache_keys[i] not in cached_metrics
+        for i in range(total_combinations)
+    ]
+    pending_combinations = [
+        params for params, pending in zip(param_combinations, is_pending) if pending
+    ]
+    start_time = time.time()
+    pending_metrics = _evaluate_parameter_grid(
+        data,
+        strategy_type,
+        param_names,
+        pending_combinations,
+        n_jobs,
+        progress_bar,
+        status_text,
+    )
+    evaluation_time = time.time() - start_time
+
+    if cache_keys:
+        pending_keys = [key for key, pending in zip(cache_keys, is_pending) if pending]
+        cache_results(
+            strategy_type,
+            param_names,
+            pending_combinations,
+            pending_keys,
+            pending_metrics,
+        )
+        metrics_by_key = cached_metrics | dict(
+            zip(pending_keys, pending_metrics.iter_rows(named=True))
+        )
+        grid_metrics = pl.DataFrame(
+            [metrics_by_key[key] for key in cache_keys],
+            schema=[(name, pl.Float64) for name in METRIC_NAMES],
+        )
+    else:
+        grid_metrics = pending_metrics
+
+    time_per_combination = evaluation_time / max(len(pending_combinations), 1)
+    return grid_metrics, [
+        time_per_combination if pending else 0.0 for pending in is_pending
+    ]
+
+
+def _evaluate_parameter_grid(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+    n_jobs: int,
+    progress_bar: Any,
+    status_text: Any,
+) -> pl.DataFrame:
+    # Backtests the parameter combinations in one vectorised pass, or in
+    # chunks in a pool of worker processes, updating the progress shown.
+    if not param_combinations:
+        progress_bar.progress(1.0)
+        return pl.DataFrame(schema=[(name, pl.Float64) for name in METRIC_NAMES])
+
+    if n_jobs == 1:
+        status_text.text(f"Evaluating {len(param_combinations)} parameter combinations")
+        grid_metrics = backtest_parameter_grid(
+            data, strategy_type, param_names, param_combinations
+        )
+        progress_bar.progress(1.0)
+        return grid_metrics
+
+    chunks = split_into_chunks(
+        param_combinations, get_num_workers(n_jobs) * CHUNKS_PER_WORKER
+    )
+    status_text.text(
+        f"Evaluating {len(param_combinations)} parameter combinations in "
+        f"{len(chunks)} chunks"
+    )
+    chunk_metrics = run_in_process_pool(
+        _backtest_parameter_chunk,
+        [(strategy_type, param_names, chunk) for chunk in chunks],
+        {"data": data},
+        n_jobs,
+        on_task_done=lambda num_done: progress_bar.progress(num_done / len(chunks)),
+    )
+    return pl.concat(chunk_metrics)
+
+
+def _backtest_parameter_chunk(
+    strategy_type: str, param_names: list[str], param_combinations: list[tuple]
+) -> pl.DataFrame:
+    # Runs in a worker process, on the price data shared by the parent.
+    return backtest_parameter_grid(
+        get_shared_frame("data"), strategy_type, param_names, param_combinations
+    )
+
+
 def optimise_pairs_trading_tickers(
     top_companies: list[tuple[str, float]],
     start_date: datetime.date,
     end_date: datetime.date,
     strategy_params: dict[str, Any],
     optimise: bool,
+    persist: str = "none",
+    n_jobs: int = 1,
+    num_candidate_pairs: int | None = None,
+    deadline: Deadline | None = None,
+    coverage: CoverageReport | None = None,
+    use_checkpoint: bool = True,
 ) -> tuple[tuple[str, str], dict[str, Any], dict[str, float]]:
     """
     Optimises ticker pair selection and strategy parameters for pairs trading.
 
+    If there are more pairs than the number of candidate pairs, every pair is
+    first screened on the cointegration of its prices in one matrix pass, and
+    only the most cointegrated pairs are backtested. Unless the parameters
+    are optimised or every backtest is saved, the pairs are backtested
+    together by the vectorised pairs kernel.
+
+    With a deadline, the most cointegrated pairs are evaluated first, and if
+    the deadline passes or the optimisation is cancelled, the best pair
+    evaluated so far is returned.
+
+    Pairs without a parameter combination that has a valid Sharpe ratio are
+    skipped. The pairs evaluated, with their best parameters, are
+    checkpointed as the optimisation runs, so that if it's interrupted, the next identical
+    optimisation resumes from the checkpoint rather than starting over.
+
     Args:
         top_companies: List of tuples containing ticker symbols and market caps
                        of top companies.
@@ -271,6 +1246,17 @@ def optimise_pairs_trading_tickers(
         end_date: End date for historical data.
         strategy_params: Strategy parameters or parameter ranges.
         optimise: Whether to optimise the strategy parameters.
+        persist: Which evaluated backtests to save, one of PERSIST_MODES.
+        n_jobs: The number of worker processes to split the pairs between, or
+                -1 to use every CPU. Ignored if every backtest is saved or the
+                parameters aren't optimised.
+        num_candidate_pairs: The maximum number of pairs to backtest after
+                             screening, or None to backtest every pair.
+        deadline: The deadline to stop searching at, or None for no deadline.
+        coverage: A report to record how many pairs were evaluated in.
+        use_checkpoint: Whether to checkpoint the pairs evaluated, and resume
+                        from an earlier checkpoint. Ignored if every backtest
+                        is saved.
 
     Returns:
         A tuple containing the best ticker pair, best parameters, and best
@@ -279,70 +1265,333 @@ def optimise_pairs_trading_tickers(
     best_pair = None
     best_params = None
     best_metrics = None
+    best_data = None
     best_sharpe_ratio = float("-inf")
+    save_each, results_writer = get_persistence_options(persist)
 
-    ticker_pairs = list(
-        itertools.combinations([company[0] for company in top_companies], 2)
-    )
-    # Filter out pairs that likely represent the same company
+    tickers = [company[0] for company in top_companies]
+    ticker_pairs = list(itertools.combinations(tickers, 2))
+    # Filter out pairs that likely represent the same company, looking up the
+    # company name of each ticker once rather than twice per pair.
+    company_names = get_company_names(tickers)
     ticker_pairs = [
-        pair for pair in ticker_pairs if not is_same_company(pair[0], pair[1])
+        (ticker1, ticker2)
+        for ticker1, ticker2 in ticker_pairs
+        if ticker1 not in company_names
+        or company_names[ticker1] != company_names.get(ticker2)
     ]
-    total_combinations = len(ticker_pairs)
     # Display progress bar and status text, as this process may take a while.
     progress_bar = st.progress(0)
     status_text = st.empty()
-    prev_pair_processing_time = 0.0
-
-    for i, (ticker1, ticker2) in enumerate(ticker_pairs):
-        start_time = time.time()
-        status_text.text(
-            f"Evaluating pair {i + 1} / {total_combinations}: {ticker1} vs. {ticker2} "
-            f"(prev. pair processing time: {prev_pair_processing_time:.4f} seconds)"
-        )
-        progress_bar.progress((i + 1) / total_combinations)
 
-        data = load_yfinance_data_two_tickers(ticker1, ticker2, start_date, end_date)
-        if data is None or data.is_empty():
-            continue
+    # Load the prices of each ticker once, and take the data for each pair
+    # from the panel rather than loading both of its tickers again.
+    status_text.text(f"Loading prices for {len(tickers)} tickers")
+    panel = load_yfinance_data_panel(tickers, start_date, end_date)
+
+    if num_candidate_pairs is not None and len(ticker_pairs) > num_candidate_pairs:
+        status_text.text(f"Screening {len(ticker_pairs)} pairs")
+        ticker_pairs = select_candidate_pairs(panel, ticker_pairs, num_candidate_pairs)
+    if deadline is not None:
+        # Evaluate the most promising pairs first, in case time runs out.
+        ticker_pairs = sort_ticker_pairs_by_cointegration(panel, ticker_pairs)
+    total_combinations = len(ticker_pairs)
 
-        if optimise:
-            # Convert single values to lists for optimisation
-            param_ranges = {
-                k: [v] if isinstance(v, (int, float)) else v
-                for k, v in strategy_params.items()
-            }
-            current_params, current_metrics = optimise_strategy_params(
-                data, "Pairs Trading", param_ranges, [ticker1, ticker2]
+    # Resume from the checkpoint of an identical optimisation that was
+    # interrupted, unless every backtest has to be saved, as the backtests
+    # before the interruption may not all have been written.
+    checkpoint = None
+    pair_results: dict[
+        tuple[str, str], tuple[dict[str, Any], dict[str, float]] | None
+    ] = {}
+    if use_checkpoint and not save_each:
+        checkpoint = Checkpoint(
+            get_checkpoint_key(
+                "pairs_trading_tickers",
+                {
+                    "prices": get_price_data_fingerprint(panel),
+                    "ticker_pairs": sorted(ticker_pairs),
+                    "strategy_params": strategy_params,
+                    "optimise": optimise,
+                },
             )
+        )
+        resumed = checkpoint.load()
+        pair_results = {pair: resumed[pair] for pair in ticker_pairs if pair in resumed}
+    pending_pairs = [pair for pair in ticker_pairs if pair not in pair_results]
+    # The best results of the pairs whose parameter searches were stopped
+    # early. They can still be returned, but aren't checkpointed, so the
+    # pairs' searches are redone in full on resuming.
+    partial_pair_results: dict[
+        tuple[str, str], tuple[dict[str, Any], dict[str, float]]
+    ] = {}
+
+    def record_result(
+        pair: tuple[str, str],
+        result: tuple[dict[str, Any], dict[str, float]] | None,
+    ) -> None:
+        pair_results[pair] = result
+        if checkpoint is not None:
+            checkpoint.add(pair, result)
+
+    try:
+        if not optimise and not save_each:
+            status_text.text(f"Evaluating {len(pending_pairs)} pairs")
+            # With a deadline, the pairs are backtested in blocks, checking the
+            # deadline in between.
+            block_size = (
+                ANYTIME_PAIRS_BLOCK_SIZE
+                if deadline is not None
+                else max(len(pending_pairs), 1)
+            )
+            for i in range(0, len(pending_pairs), block_size):
+                if should_stop(deadline, len(pair_results)):
+                    break
+                block = pending_pairs[i : i + block_size]
+                block_results = {}
+                for row in backtest_ticker_pairs(
+                    panel, block, strategy_params
+                ).iter_rows(named=True):
+                    pair = (row.pop("Ticker 1"), row.pop("Ticker 2"))
+                    block_results[pair] = (strategy_params, row)
+                # Pairs missing from the panel have no results.
+                for pair in block:
+                    record_result(pair, block_results.get(pair))
+                progress_bar.progress(len(pair_results) / total_combinations)
+        elif n_jobs == 1 or save_each:
+            prev_pair_processing_time = 0.0
+
+            for ticker1, ticker2 in pending_pairs:
+                if should_stop(deadline, len(pair_results)):
+                    break
+                start_time = time.time()
+                status_text.text(
+                    f"Evaluating pair {len(pair_results) + 1} / {total_combinations}: "
+                    f"{ticker1} vs. {ticker2} (prev. pair processing time: "
+                    f"{prev_pair_processing_time:.4f} seconds)"
+                )
+                progress_bar.progress((len(pair_results) + 1) / total_combinations)
+
+                data = get_pair_data(panel, ticker1, ticker2)
+                if data is None or data.is_empty():
+                    record_result((ticker1, ticker2), None)
+                    continue
+
+                if optimise:
+                    result, is_complete = _optimise_pair_parameters(
+                        data,
+                        (ticker1, ticker2),
+                        strategy_params,
+                        "all" if save_each else "none",
+                        deadline,
+                    )
+                    if not is_complete:
+                        if result is not None:
+                            partial_pair_results[(ticker1, ticker2)] = result
+                        break
+                else:
+                    _, current_metrics = run_backtest(
+                        data,
+                        "Pairs Trading",
+                        strategy_params,
+                        [ticker1, ticker2],
+                        persist=save_each,
+                        results_writer=results_writer,
+                    )
+                    result = (strategy_params, current_metrics)
+                record_result((ticker1, ticker2), result)
+
+                end_time = time.time()
+                prev_pair_processing_time = end_time - start_time
         else:
-            _, current_metrics = run_backtest(
-                data, "Pairs Trading", strategy_params, [ticker1, ticker2]
+            partial_pair_results = _optimise_pairs_trading_tickers_in_process_pool(
+                panel,
+                pending_pairs,
+                strategy_params,
+                n_jobs,
+                deadline,
+                record_result,
+                progress_bar,
+                status_text,
             )
-            current_params = strategy_params
-
+    finally:
+        # Write the checkpoint even if the optimisation is interrupted, e.g.
+        # by a Streamlit rerun.
+        if checkpoint is not None:
+            checkpoint.flush()
+
+    # Compare the pairs in their original order, so the same pair wins however
+    # they were evaluated, and whether or not the optimisation was resumed.
+    compared_results = dict(pair_results)
+    for pair, result in partial_pair_results.items():
+        compared_results.setdefault(pair, result)
+    for pair in ticker_pairs:
+        result = compared_results.get(pair)
+        if result is None:
+            continue
+        current_params, current_metrics = result
         if current_metrics["Sharpe Ratio"] > best_sharpe_ratio:
             best_sharpe_ratio = current_metrics["Sharpe Ratio"]
-            best_pair = (ticker1, ticker2)
+            best_pair = pair
             best_params = current_params
             best_metrics = current_metrics
-
-        end_time = time.time()
-        prev_pair_processing_time = end_time - start_time
+    if best_pair is not None:
+        best_data = get_pair_data(panel, *best_pair)
 
     progress_bar.empty()
     status_text.empty()
-    if not best_pair or not best_params or not best_metrics:
+    record_coverage(coverage, deadline, len(pair_results), total_combinations)
+    if checkpoint is not None and len(pair_results) == total_combinations:
+        checkpoint.delete()
+    if not best_pair or not best_params or not best_metrics or best_data is None:
         raise ValueError("Pairs trading optimisation failed")
 
+    if persist == "best":
+        run_backtest(best_data, "Pairs Trading", best_params, list(best_pair))
+    elif results_writer is not None:
+        results_writer.flush()
+
     return best_pair, best_params, best_metrics
 
 
+def _optimise_pair_parameters(
+    data: pl.DataFrame,
+    ticker_pair: tuple[str, str],
+    strategy_params: dict[str, Any],
+    persist: str,
+    deadline: Deadline | None,
+) -> tuple[tuple[dict[str, Any], dict[str, float]] | None, bool]:
+    # Optimises the strategy parameters of a pair, returning its best
+    # parameters and metrics, or None if no combination has a valid Sharpe
+    # ratio, and whether the search covered every combination. Single values
+    # are converted to lists for optimisation.
+    param_ranges = {
+        k: [v] if isinstance(v, (int, float)) else v for k, v in strategy_params.items()
+    }
+    pair_coverage = CoverageReport()
+    try:
+        result = optimise_strategy_params(
+            data,
+            "Pairs Trading",
+            param_ranges,
+            list(ticker_pair),
+            persist=persist,
+            deadline=deadline,
+            coverage=pair_coverage,
+        )
+    except ValueError:
+        return None, pair_coverage.is_complete
+    return result, pair_coverage.is_complete
+
+
+def _optimise_pairs_trading_tickers_in_process_pool(
+    panel: pl.DataFrame,
+    ticker_pairs: list[tuple[str, str]],
+    strategy_params: dict[str, Any],
+    n_jobs: int,
+    deadline: Deadline | None,
+    record_result: Callable[
+        [tuple[str, str], tuple[dict[str, Any], dict[str, float]] | None], None
+    ],
+    progress_bar: Any,
+    status_text: Any,
+) -> dict[tuple[str, str], tuple[dict[str, Any], dict[str, float]]]:
+    # Optimises the parameters of each pair in a pool of worker processes,
+    # returning the best results of the pairs whose searches were stopped
+    # early. Pairs missing from the panel have no results. The workers take
+    # the data for each of the other pairs from the shared panel.
+    for pair in ticker_pairs:
+        if pair[0] not in panel.columns or pair[1] not in panel.columns:
+            record_result(pair, None)
+    ticker_pairs = [
+        pair
+        for pair in ticker_pairs
+        if pair[0] in panel.columns and pair[1] in panel.columns
+    ]
+    chunks = split_into_chunks(
+        ticker_pairs, get_num_workers(n_jobs) * CHUNKS_PER_WORKER
+    )
+    status_text.text(f"Evaluating {len(ticker_pairs)} pairs in {len(chunks)} chunks")
+    num_chunks_done = 0
+    partial_pair_results = {}
+
+    def on_task_done(num_done: int) -> None:
+        nonlocal num_chunks_done
+        num_chunks_done = num_done
+        progress_bar.progress(num_done / len(chunks))
+
+    def on_result(index: int, chunk_results: list) -> None:
+        # Record each chunk's results as it completes, so they're
+        # checkpointed. Chunks cancelled when the deadline passed have no
+        # results, and those stopped by it only have results for some pairs.
+        for pair, (result, is_complete) in zip(chunks[index], chunk_results):
+            if is_complete:
+                record_result(pair, result)
+            elif result is not None:
+                partial_pair_results[pair] = result
+
+    # The workers can't share the deadline's cancellation token, so they only
+    # check its time limit, and cancelling the optimisation only stops the
+    # chunks that haven't started.
+    run_in_process_pool(
+        _optimise_ticker_pair_chunk,
+        [
+            (
+                chunk,
+                strategy_params,
+                deadline is not None,
+                None if deadline is None else deadline.get_expiry_time(),
+            )
+            for chunk in chunks
+        ],
+        {"panel": panel},
+        n_jobs,
+        on_task_done=on_task_done,
+        should_stop=lambda: should_stop(deadline, num_chunks_done),
+        on_result=on_result,
+    )
+    return partial_pair_results
+
+
+def _optimise_ticker_pair_chunk(
+    ticker_pairs: list[tuple[str, str]],
+    strategy_params: dict[str, Any],
+    has_deadline: bool,
+    expiry_time: float | None,
+) -> list[tuple[tuple[dict[str, Any], dict[str, float]] | None, bool]]:
+    # Runs in a worker process, on the panel of prices shared by the parent,
+    # optimising each pair as the serial path does. Returns the result of each
+    # pair evaluated, and whether its search covered every combination,
+    # stopping at the deadline or after a pair whose search was stopped early.
+    panel = get_shared_frame("panel")
+    deadline = Deadline.from_expiry_time(expiry_time) if has_deadline else None
+
+    results: list[tuple[tuple[dict[str, Any], dict[str, float]] | None, bool]] = []
+    for i, (ticker1, ticker2) in enumerate(ticker_pairs):
+        if should_stop(deadline, i):
+            break
+        data = get_pair_data(panel, ticker1, ticker2)
+        if data.is_empty():
+            results.append((None, True))
+            continue
+
+        result, is_complete = _optimise_pair_parameters(
+            data, (ticker1, ticker2), strategy_params, "none", deadline
+        )
+        results.append((result, is_complete))
+        if not is_complete:
+            break
+
+    return results
+
+
 def run_backtest(
     data: pl.DataFrame,
     strategy_type: str,
     strategy_params: dict[str, Any],
     tickers: str | list[str],
+    persist: bool = True,
+    results_writer: ResultsWriter | None = None,
 ) -> tuple[pl.DataFrame, dict]:
     """
     Executes the backtest using the selected strategy and parameters.
@@ -352,17 +1601,25 @@ def run_backtest(
         strategy_type: The type of strategy to use for the backtest.
         strategy_params: Additional parameters required for the strategy.
         tickers: The ticker or tickers used in the backtest.
+        persist: Whether to save the backtest results.
+        results_writer: An optional write-behind writer to queue the save on.
 
     Returns:
         A tuple containing the backtest results DataFrame and performance metrics.
     """
     strategy = create_strategy(strategy_type, strategy_params)
-    backtester = Backtester(data, strategy, tickers=tickers)
+    backtester = Backtester(
+        data,
+        strategy,
+        tickers=tickers,
+        persist=persist,
+        results_writer=results_writer,
+    )
     results = backtester.run()
     metrics = backtester.get_performance_metrics()
-    assert (
-        metrics is not None
-    ), "No results available for the selected ticker and date range"
+    assert metrics is not None, (
+        "No results available for the selected ticker and date range"
+    )
 
     return results, metrics
 
@@ -0,0 +1,226 @@
+"""
+Contains a screening stage for pairs trading, which scores every pair of
+tickers in a universe on how closely their prices move together, so that only
+the most promising pairs are backtested.
+
+The returns correlation and an Engle-Granger cointegration statistic of every
+pair are computed together from a panel of closing prices. Rather than
+running regressions pair by pair, every sum the regressions need is taken
+over the dates both tickers traded with one matrix product over the panel, so
+the whole universe is scored with a handful of (tickers x tickers) products.
+"""
+
+import numpy as np
+import polars as pl
+
+
+def screen_ticker_pairs(
+    panel: pl.DataFrame, ticker_pairs: list[tuple[str, str]]
+) -> pl.DataFrame:
+    """
+    Scores pairs of tickers on the correlation of their daily returns and the
+    cointegration of their prices, over the dates both tickers traded.
+
+    The cointegration statistic is the Engle-Granger test statistic: the
+    prices of the first ticker are regressed on those of the second, and the
+    Dickey-Fuller t-statistic of the residuals is taken. The more negative it
+    is, the more strongly the spread between the two tickers reverts to its
+    mean.
+
+    Args:
+        panel: A panel of closing prices from load_yfinance_data_panel.
+        ticker_pairs: The pairs of tickers to score.
+
+    Returns:
+        A DataFrame with one row per pair with both tickers in the panel,
+        containing the 'Ticker 1', 'Ticker 2', 'Correlation', 'Cointegration
+        Statistic' and 'Observations' (the number of dates both tickers
+        traded). It's sorted by cointegration statistic from most to least
+        negative, with pairs without enough data for one sorted last.
+    """
+    ticker_pairs = [
+        (ticker1, ticker2)
+        for ticker1, ticker2 in ticker_pairs
+        if ticker1 in panel.columns and ticker2 in panel.columns
+    ]
+    if not ticker_pairs:
+        return pl.DataFrame(
+            schema=[
+                ("Ticker 1", pl.String),
+                ("Ticker 2", pl.String),
+                ("Correlation", pl.Float64),
+                ("Cointegration Statistic", pl.Float64),
+                ("Observations", pl.Int64),
+            ]
+        )
+
+    tickers = list(dict.fromkeys(ticker for pair in ticker_pairs for ticker in pair))
+    ticker_indices = {ticker: i for i, ticker in enumerate(tickers)}
+    prices = panel.select(tickers).cast(pl.Float64).fill_nan(None).to_numpy()
+    correlation, statistic, observations = get_pair_statistics(prices)
+    first = [ticker_indices[ticker1] for ticker1, _ in ticker_pairs]
+    second = [ticker_indices[ticker2] for _, ticker2 in ticker_pairs]
+
+    return (
+        pl.DataFrame(
+            {
+                "Ticker 1": [ticker1 for ticker1, _ in ticker_pairs],
+                "Ticker 2": [ticker2 for _, ticker2 in ticker_pairs],
+                "Correlation": correlation[first, second],
+                "Cointegration Statistic": statistic[first, second],
+                "Observations": observations[first, second].astype(np.int64),
+            }
+        )
+        .with_columns(pl.col("Correlation", "Cointegration Statistic").fill_nan(None))
+        .sort("Cointegration Statistic", nulls_last=True, maintain_order=True)
+    )
+
+
+def select_candidate_pairs(
+    panel: pl.DataFrame, ticker_pairs: list[tuple[str, str]], num_candidates: int
+) -> list[tuple[str, str]]:
+    """
+    Selects the pairs of tickers most worth backtesting, which are those with
+    the most negative cointegration statistics.
+
+    Args:
+        panel: A panel of closing prices from load_yfinance_data_panel.
+        ticker_pairs: The pairs of tickers to select from.
+        num_candidates: The maximum number of pairs to select.
+
+    Returns:
+        The selected pairs, in the order given.
+    """
+    if num_candidates < 1:
+        raise ValueError(f"Invalid number of candidate pairs: {num_candidates}")
+
+    screened = screen_ticker_pairs(panel, ticker_pairs).head(num_candidates)
+    selected = set(zip(screened["Ticker 1"], screened["Ticker 2"]))
+    return [pair for pair in ticker_pairs if pair in selected]
+
+
+def sort_ticker_pairs_by_cointegration(
+    panel: pl.DataFrame, ticker_pairs: list[tuple[str, str]]
+) -> list[tuple[str, str]]:
+    """
+    Sorts pairs of tickers from the most to the least promising to backtest,
+    by their cointegration statistics.
+
+    Args:
+        panel: A panel of closing prices from load_yfinance_data_panel.
+        ticker_pairs: The pairs of tickers to sort.
+
+    Returns:
+        The pairs sorted by cointegration statistic from most to least
+        negative, followed by the pairs without enough data for one, in the
+        order given.
+    """
+    screened = screen_ticker_pairs(panel, ticker_pairs)
+    sorted_pairs = list(zip(screened["Ticker 1"], screened["Ticker 2"]))
+    screened_pairs = set(sorted_pairs)
+    return sorted_pairs + [pair for pair in ticker_pairs if pair not in screened_pairs]
+
+
+def get_pair_statistics(
+    prices: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the screening statistics of every pair of columns of a price
+    matrix at once.
+
+    Args:
+        prices: A 2-D array of closing prices, with one row per date and one
+                column per ticker, which is NaN on dates a ticker didn't
+                trade.
+
+    Returns:
+        A tuple of (tickers x tickers) arrays of the returns correlation, the
+        Engle-Granger cointegration statistic and the number of dates both
+        tickers traded, with the first ticker of each pair in the rows and the
+        second in the columns. A statistic is NaN if there's too little data.
+    """
+    traded = ~np.isnan(prices)
+    # The days on which a ticker traded and also traded the day before.
+    changed = traded[1:] & traded[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(changed, prices[1:] / prices[:-1] - 1, 0.0)
+    # Centre each ticker's prices, which doesn't change the residuals of a
+    # regression with an intercept, but keeps the sums small.
+    prices = np.where(traded, prices - np.nanmean(prices, axis=0), 0.0)
+    previous = np.where(changed, prices[:-1], 0.0)
+    change = np.where(changed, prices[1:] - prices[:-1], 0.0)
+    traded = traded.astype(np.float64)
+    changed = changed.astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Regress the prices of the first ticker, y, on those of the second, x.
+        num_dates = _cross_sum(traded, traded)
+        sum_y = _cross_sum(prices, traded)
+        sum_x = sum_y.T
+        sum_xx = _cross_sum(traded, prices**2)
+        sum_xy = _cross_sum(prices, prices)
+        beta = (num_dates * sum_xy - sum_x * sum_y) / (num_dates * sum_xx - sum_x**2)
+        alpha = (sum_y - beta * sum_x) / num_dates
+
+        # Regress the changes in the residuals, e = y - alpha - beta * x, on
+        # their previous values, expanding each sum of the residuals into sums
+        # of the prices.
+        num_changes = _cross_sum(changed, changed)
+        sum_prev_y = _cross_sum(previous, changed)
+        sum_prev_x = sum_prev_y.T
+        sum_prev_yy = _cross_sum(previous**2, changed)
+        sum_prev_xx = sum_prev_yy.T
+        sum_prev_xy = _cross_sum(previous, previous)
+        sum_change_y = _cross_sum(change, changed)
+        sum_change_x = sum_change_y.T
+        sum_change_y_prev_y = _cross_sum(change * previous, changed)
+        sum_change_x_prev_x = sum_change_y_prev_y.T
+        sum_change_y_prev_x = _cross_sum(change, previous)
+        sum_change_x_prev_y = sum_change_y_prev_x.T
+        sum_change_yy = _cross_sum(change**2, changed)
+        sum_change_xx = sum_change_yy.T
+        sum_change_xy = _cross_sum(change, change)
+
+        sum_prev_ee = (
+            sum_prev_yy
+            + num_changes * alpha**2
+            + beta**2 * sum_prev_xx
+            - 2 * alpha * sum_prev_y
+            - 2 * beta * sum_prev_xy
+            + 2 * alpha * beta * sum_prev_x
+        )
+        sum_change_e_prev_e = (
+            sum_change_y_prev_y
+            - alpha * sum_change_y
+            - beta * sum_change_y_prev_x
+            - beta * sum_change_x_prev_y
+            + alpha * beta * sum_change_x
+            + beta**2 * sum_change_x_prev_x
+        )
+        sum_change_ee = (
+            sum_change_yy - 2 * beta * sum_change_xy + beta**2 * sum_change_xx
+        )
+        gamma = sum_change_e_prev_e / sum_prev_ee
+        residual_variance = (sum_change_ee - gamma * sum_change_e_prev_e) / (
+            num_changes - 1
+        )
+        statistic = gamma / np.sqrt(residual_variance / sum_prev_ee)
+
+        # Correlate the returns of the two tickers.
+        sum_r1 = _cross_sum(returns, changed)
+        sum_r2 = sum_r1.T
+        sum_r1r1 = _cross_sum(returns**2, changed)
+        sum_r2r2 = sum_r1r1.T
+        sum_r1r2 = _cross_sum(returns, returns)
+        correlation = (num_changes * sum_r1r2 - sum_r1 * sum_r2) / np.sqrt(
+            (num_changes * sum_r1r1 - sum_r1**2) * (num_changes * sum_r2r2 - sum_r2**2)
+        )
+
+    return correlation, statistic, num_dates
+
+
+def _cross_sum(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Sums the products of every column of a with every column of b. Values
+    # are 0 on the dates they're missing, so each sum only covers the dates
+    # where both columns have values.
+    return a.T @ b
@@ -0,0 +1,191 @@
+"""
+Contains helpers to fan optimisation work out across a pool of worker
+processes.
+
+Price data is written once to shared memory in the Arrow IPC format, and each
+worker reads it once when it starts, so tasks only need to carry parameters
+rather than pickled copies of the data.
+"""
+
+# Polars is only imported for type checking, so that workers can size its
+# thread pool before they import it.
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import polars as pl
+
+# The DataFrames shared with this worker process, keyed by name.
+_shared_frames: dict[str, pl.DataFrame] = {}
+# How often to check whether to stop early while waiting for tasks, in
+# seconds.
+STOP_POLL_INTERVAL = 0.1
+
+
+def get_num_workers(n_jobs: int) -> int:
+    """
+    Resolves the number of worker processes to use.
+
+    Args:
+        n_jobs: The requested number of processes, or -1 to use every CPU.
+
+    Returns:
+        The number of worker processes.
+    """
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError(f"Invalid number of jobs: {n_jobs}")
+    return n_jobs
+
+
+def get_shared_frame(key: str) -> pl.DataFrame:
+    """
+    Gets a DataFrame shared with the worker processes of the current pool.
+
+    Args:
+        key: The name the DataFrame was shared under.
+
+    Returns:
+        The shared DataFrame.
+    """
+    return _shared_frames[key]
+
+
+def run_in_process_pool(
+    func: Callable[..., Any],
+    tasks: list[tuple],
+    frames: dict[str, pl.DataFrame],
+    n_jobs: int,
+    on_task_done: Callable[[int], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    on_result: Callable[[int, Any], None] | None = None,
+) -> list[Any]:
+    """
+    Runs a function over a list of tasks in a pool of worker processes.
+
+    Args:
+        func: A module-level function to call with the arguments of each task.
+              It can read the shared DataFrames with get_shared_frame.
+        tasks: The positional arguments of each call.
+        frames: The DataFrames to share with the workers, keyed by name.
+        n_jobs: The number of worker processes, or -1 to use every CPU.
+        on_task_done: An optional callback, called with the number of
+                      completed tasks each time a task completes.
+        should_stop: An optional callback, polled while waiting for tasks,
+                     which returns True to stop early. Tasks that haven't
+                     started are then cancelled, while those already running
+                     are left to finish, as workers can't be interrupted.
+        on_result: An optional callback, called with the index and result of
+                   each task as it completes, e.g. to checkpoint the results.
+
+    Returns:
+        The result of each task, in the same order as the tasks regardless of
+        the order they complete in, which is None for cancelled tasks.
+    """
+    num_workers = min(get_num_workers(n_jobs), max(len(tasks), 1))
+    results: list[Any] = [None] * len(tasks)
+    segments: list[shared_memory.SharedMemory] = []
+    try:
+        handles = {}
+        for key, frame in frames.items():
+            segment, size = _write_shared_frame(frame)
+            segments.append(segment)
+            handles[key] = (segment.name, size)
+
+        # Split the CPUs between the workers so that their Polars thread pools
+        # don't oversubscribe the machine.
+        threads_per_worker = max((os.cpu_count() or 1) // num_workers, 1)
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            # Forking a process that has started Polars' thread pool can
+            # deadlock, so the workers are started from scratch instead.
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_shared_frames,
+            initargs=(handles, threads_per_worker),
+        ) as executor:
+            future_to_index = {
+                executor.submit(func, *task): i for i, task in enumerate(tasks)
+            }
+            pending: set[Future] = set(future_to_index)
+            num_done = 0
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=None if should_stop is None else STOP_POLL_INTERVAL,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    index = future_to_index[future]
+                    results[index] = future.result()
+                    if on_result is not None:
+                        on_result(index, results[index])
+                    num_done += 1
+                    if on_task_done is not None:
+                        on_task_done(num_done)
+                if pending and should_stop is not None and should_stop():
+                    for future in pending:
+                        future.cancel()
+                    break
+        # Keep the results of the tasks that were left to finish.
+        for future in pending:
+            if not future.cancelled():
+                index = future_to_index[future]
+                results[index] = future.result()
+                if on_result is not None:
+                    on_result(index, results[index])
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    return results
+
+
+def split_into_chunks(items: list[Any], num_chunks: int) -> list[list[Any]]:
+    """
+    Splits a list into contiguous chunks of roughly equal size.
+
+    Args:
+        items: The list to split.
+        num_chunks: The maximum number of chunks.
+
+    Returns:
+        The non-empty chunks, in order.
+    """
+    chunk_size = max(-(-len(items) // max(num_chunks, 1)), 1)
+    return [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def _write_shared_frame(frame: pl.DataFrame) -> tuple[shared_memory.SharedMemory, int]:
+    buffer = io.BytesIO()
+    frame.write_ipc(buffer)
+    payload = buffer.getbuffer()
+    segment = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    assert segment.buf is not None
+    segment.buf[: len(payload)] = payload
+    return segment, len(payload)
+
+
+def _load_shared_frames(handles: dict[str, tuple[str, int]], max_threads: int) -> None:
+    # Polars sizes its thread pool from the environment when it's imported.
+    # The variable is set in the worker rather than the parent, where other
+    # sessions' Polars work would see it.
+    os.environ["POLARS_MAX_THREADS"] = str(max_threads)
+    import polars as pl
+
+    for key, (name, size) in handles.items():
+        # The parent process owns the segments and unlinks them when done.
+        segment = shared_memory.SharedMemory(name=name, track=False)
+        assert segment.buf is not None
+        try:
+            _shared_frames[key] = pl.read_ipc(io.BytesIO(segment.buf[:size]))
+        finally:
+            segment.close()
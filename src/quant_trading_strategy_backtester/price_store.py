@@ -0,0 +1,454 @@
+"""
+Contains a local on-disk store of historical prices, so that price data
+survives restarts and only dates that haven't been fetched before are
+downloaded.
+
+Each ticker's prices are kept in a zstd-compressed Parquet file, alongside an
+index of the range of dates that has been fetched for each ticker. Requests
+for any date range are answered by slicing the stored prices, after fetching
+whichever dates before or after the stored range are missing. Once a range
+has been fetched, it can be loaded without a network connection.
+
+Providers such as Yahoo Finance adjust the whole history of a ticker for each
+split and dividend, so the prices fetched before one no longer join up with
+those fetched after it. Each fetch therefore overlaps the stored prices, and
+if the overlapping prices have changed, the whole history is fetched again.
+"""
+
+import datetime
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+
+from quant_trading_strategy_backtester.utils import logger
+
+# The number of stored days each fetch also covers, to check whether the
+# provider has adjusted the ticker's prices since they were stored. A week
+# includes some trading days despite weekends and holidays.
+ADJUSTMENT_CHECK_OVERLAP = datetime.timedelta(days=7)
+# The largest relative difference between the stored and newly fetched closes
+# of a date that isn't counted as the prices being adjusted.
+ADJUSTMENT_TOLERANCE = 1e-6
+
+# Fetches the prices of a ticker between two dates (inclusive) from a provider,
+# raising an error if the request fails. The prices are empty if there were no
+# trading days in the range.
+PriceFetcher = Callable[[str, datetime.date, datetime.date], pl.DataFrame]
+# Fetches the prices of many tickers between two dates (inclusive) in one
+# request, returning the prices of each ticker fetched, which are empty if it
+# had no trading days in the range. Tickers whose requests failed are left out.
+BulkPriceFetcher = Callable[
+    [list[str], datetime.date, datetime.date], dict[str, pl.DataFrame]
+]
+
+
+class PriceStore:
+    """
+    A per-ticker store of historical prices in Parquet files.
+
+    Attributes:
+        directory: The directory the price files and index are kept in.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        fetch_prices: PriceFetcher,
+        fetch_many_prices: BulkPriceFetcher | None = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self._fetch_prices = fetch_prices
+        self._fetch_many_prices = fetch_many_prices
+        self._index_path = self.directory / "index.json"
+        self._fetched_ranges = self._read_index()
+        # Loads of the same ticker are serialised, while different tickers can
+        # be loaded concurrently.
+        self._ticker_locks: defaultdict[str, threading.Lock] = defaultdict(
+            threading.Lock
+        )
+        self._lock = threading.Lock()
+
+    def load(
+        self, ticker: str, start_date: datetime.date, end_date: datetime.date
+    ) -> pl.DataFrame:
+        """
+        Loads the prices of a ticker, fetching any dates in the range that
+        haven't been fetched before.
+
+        If fetching fails, the stored prices are returned on their own.
+
+        Args:
+            ticker: The stock ticker symbol.
+            start_date: The first date to load.
+            end_date: The last date to load.
+
+        Returns:
+            A DataFrame of the prices between the start and end dates
+            (inclusive), sorted by date.
+        """
+        with self._get_ticker_lock(ticker):
+            fetched = []
+            for missing_start, missing_end in get_missing_ranges(
+                self.get_fetched_range(ticker),
+                start_date,
+                end_date,
+                ADJUSTMENT_CHECK_OVERLAP,
+            ):
+                try:
+                    new_prices = self._fetch_prices(ticker, missing_start, missing_end)
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to fetch prices for {ticker} from {missing_start} "
+                        f"to {missing_end}, using stored prices only: {e}"
+                    )
+                    continue
+                fetched.append((new_prices, missing_start, missing_end))
+            prices = self._add_prices(ticker, fetched)
+
+        return _slice_prices(prices, start_date, end_date)
+
+    def load_many(
+        self, tickers: list[str], start_date: datetime.date, end_date: datetime.date
+    ) -> dict[str, pl.DataFrame]:
+        """
+        Loads the prices of many tickers, fetching the dates that haven't been
+        fetched before with one bulk request for all the tickers missing the
+        same dates.
+
+        If fetching fails, the stored prices are returned on their own.
+
+        Args:
+            tickers: The stock ticker symbols.
+            start_date: The first date to load.
+            end_date: The last date to load.
+
+        Returns:
+            A dictionary of tickers to DataFrames of their prices between the
+            start and end dates (inclusive), sorted by date.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if self._fetch_many_prices is None:
+            return {
+                ticker: self.load(ticker, start_date, end_date) for ticker in tickers
+            }
+
+        tickers_by_missing_range: defaultdict[
+            tuple[datetime.date, datetime.date], list[str]
+        ] = defaultdict(list)
+        for ticker in tickers:
+            for missing_range in get_missing_ranges(
+                self.get_fetched_range(ticker),
+                start_date,
+                end_date,
+                ADJUSTMENT_CHECK_OVERLAP,
+            ):
+                tickers_by_missing_range[missing_range].append(ticker)
+
+        fetched_by_ticker = defaultdict(list)
+        for (
+            missing_start,
+            missing_end,
+        ), missing_tickers in tickers_by_missing_range.items():
+            try:
+                new_prices_by_ticker = self._fetch_many_prices(
+                    missing_tickers, missing_start, missing_end
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Failed to fetch prices for {len(missing_tickers)} tickers "
+                    f"from {missing_start} to {missing_end}, using stored prices "
+                    f"only: {e}"
+                )
+                continue
+            for ticker, new_prices in new_prices_by_ticker.items():
+                fetched_by_ticker[ticker].append(
+                    (new_prices, missing_start, missing_end)
+                )
+
+        prices_by_ticker = {}
+        for ticker in tickers:
+            with self._get_ticker_lock(ticker):
+                prices = self._add_prices(ticker, fetched_by_ticker[ticker])
+            prices_by_ticker[ticker] = _slice_prices(prices, start_date, end_date)
+        return prices_by_ticker
+
+    def get_fetched_range(
+        self, ticker: str
+    ) -> tuple[datetime.date, datetime.date] | None:
+        """
+        Gets the range of dates that has been fetched for a ticker.
+
+        Args:
+            ticker: The stock ticker symbol.
+
+        Returns:
+            The first and last dates fetched (inclusive), or None if nothing
+            has been fetched.
+        """
+        with self._lock:
+            return self._fetched_ranges.get(ticker)
+
+    def _get_ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks[ticker]
+
+    def _add_prices(
+        self,
+        ticker: str,
+        fetched: list[tuple[pl.DataFrame, datetime.date, datetime.date]],
+    ) -> pl.DataFrame | None:
+        # Merges newly fetched prices, with the range each was fetched for,
+        # into the stored prices. The ticker's lock must be held.
+        prices = self._read_prices(ticker)
+        initial_range = fetched_range = self.get_fetched_range(ticker)
+        if (
+            prices is not None
+            and initial_range is not None
+            and any(
+                is_adjustment_changed(prices, prices_fetched, initial_range)
+                for prices_fetched, _, _ in fetched
+            )
+        ):
+            return self._refetch_prices(
+                ticker,
+                min(initial_range[0], *(start for _, start, _ in fetched)),
+                max(initial_range[1], *(end for _, _, end in fetched)),
+                prices,
+            )
+
+        new_prices = []
+        for prices_fetched, fetched_start, fetched_end in fetched:
+            # Failed requests raise rather than returning prices, so an empty
+            # result is a range without trading days, e.g. before the ticker
+            # listed or over a weekend, and is recorded as fetched too.
+            if not prices_fetched.is_empty():
+                new_prices.append(prices_fetched)
+            fetched_range = extend_range(fetched_range, fetched_start, fetched_end)
+
+        if new_prices:
+            prices = merge_prices(
+                [prices, *new_prices] if prices is not None else new_prices
+            )
+            self._write_prices(ticker, prices)
+        if fetched_range != initial_range:
+            self._set_fetched_range(ticker, fetched_range)
+        return prices
+
+    def _refetch_prices(
+        self,
+        ticker: str,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        stored_prices: pl.DataFrame,
+    ) -> pl.DataFrame:
+        # Replaces the stored prices of a ticker whose prices the provider has
+        # adjusted with its whole history on the new basis. The ticker's lock
+        # must be held.
+        logger.info(
+            f"The prices of {ticker} have been adjusted since they were stored, "
+            f"fetching them again from {start_date} to {end_date}"
+        )
+        try:
+            prices = self._fetch_prices(ticker, start_date, end_date)
+        except Exception as e:
+            logger.warning(
+                f"Failed to fetch the adjusted prices of {ticker} from "
+                f"{start_date} to {end_date}, using stored prices only: {e}"
+            )
+            return stored_prices
+
+        self._write_prices(ticker, prices)
+        self._set_fetched_range(ticker, extend_range(None, start_date, end_date))
+        return prices
+
+    def _read_index(self) -> dict[str, tuple[datetime.date, datetime.date]]:
+        if not self._index_path.exists():
+            return {}
+        with open(self._index_path) as f:
+            index = json.load(f)
+        return {
+            ticker: (
+                datetime.date.fromisoformat(start),
+                datetime.date.fromisoformat(end),
+            )
+            for ticker, (start, end) in index.items()
+        }
+
+    def _set_fetched_range(
+        self, ticker: str, fetched_range: tuple[datetime.date, datetime.date] | None
+    ) -> None:
+        with self._lock:
+            if fetched_range is None:
+                return
+            self._fetched_ranges[ticker] = fetched_range
+            index = {
+                ticker: [start.isoformat(), end.isoformat()]
+                for ticker, (start, end) in self._fetched_ranges.items()
+            }
+            _write_atomically(
+                self._index_path, lambda path: path.write_text(json.dumps(index))
+            )
+
+    def _get_prices_path(self, ticker: str) -> Path:
+        # Keep ticker symbols such as 'BRK.B' readable, but file-system safe.
+        return self.directory / f"{re.sub(r'[^A-Za-z0-9.^_-]', '_', ticker)}.parquet"
+
+    def _read_prices(self, ticker: str) -> pl.DataFrame | None:
+        path = self._get_prices_path(ticker)
+        if not path.exists():
+            return None
+        return pl.read_parquet(path)
+
+    def _write_prices(self, ticker: str, prices: pl.DataFrame) -> None:
+        _write_atomically(
+            self._get_prices_path(ticker),
+            lambda path: prices.write_parquet(path, compression="zstd"),
+        )
+
+
+def get_missing_ranges(
+    fetched_range: tuple[datetime.date, datetime.date] | None,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    overlap: datetime.timedelta = datetime.timedelta(0),
+) -> list[tuple[datetime.date, datetime.date]]:
+    """
+    Gets the ranges of dates that have to be fetched to cover a request, such
+    that the fetched range stays contiguous.
+
+    Args:
+        fetched_range: The first and last dates already fetched, if any.
+        start_date: The first date requested.
+        end_date: The last date requested.
+        overlap: How far each range extends into the fetched range, so the
+                 prices fetched can be checked against the stored ones.
+
+    Returns:
+        The first and last dates (inclusive) of each range to fetch, before
+        and then after the fetched range.
+    """
+    if fetched_range is None:
+        return [(start_date, end_date)]
+
+    one_day = datetime.timedelta(days=1)
+    fetched_start, fetched_end = fetched_range
+    missing_ranges = []
+    if start_date < fetched_start:
+        missing_ranges.append(
+            (start_date, min(fetched_start - one_day + overlap, fetched_end))
+        )
+    if end_date > fetched_end:
+        missing_ranges.append(
+            (max(fetched_end + one_day - overlap, fetched_start), end_date)
+        )
+    return missing_ranges
+
+
+def extend_range(
+    fetched_range: tuple[datetime.date, datetime.date] | None,
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> tuple[datetime.date, datetime.date] | None:
+    """
+    Extends the fetched range of dates with a newly fetched range.
+
+    Today's prices are still changing while the market is open, so the range
+    is only extended up to yesterday, and today is fetched again next time.
+
+    Args:
+        fetched_range: The first and last dates already fetched, if any.
+        start_date: The first date newly fetched.
+        end_date: The last date newly fetched.
+
+    Returns:
+        The extended range of fetched dates, or None if nothing settled has
+        been fetched.
+    """
+    end_date = min(end_date, datetime.date.today() - datetime.timedelta(days=1))
+    if end_date < start_date:
+        return fetched_range
+    if fetched_range is None:
+        return start_date, end_date
+    return min(fetched_range[0], start_date), max(fetched_range[1], end_date)
+
+
+def is_adjustment_changed(
+    stored_prices: pl.DataFrame,
+    new_prices: pl.DataFrame,
+    fetched_range: tuple[datetime.date, datetime.date],
+    tolerance: float = ADJUSTMENT_TOLERANCE,
+) -> bool:
+    """
+    Checks whether newly fetched prices are on a different adjustment basis
+    to the stored prices, e.g. because of a split or dividend in between.
+
+    Args:
+        stored_prices: The stored prices.
+        new_prices: The newly fetched prices.
+        fetched_range: The first and last dates of the stored prices that had
+                       settled when they were fetched.
+        tolerance: The largest relative difference between the closes of a
+                   date that isn't counted as a change.
+
+    Returns:
+        Whether the closes of any date in both differ by more than the
+        tolerance.
+    """
+    overlap = (
+        stored_prices.filter(pl.col("Date").dt.date().is_between(*fetched_range))
+        .select(pl.col("Date").dt.date(), "Close")
+        .join(
+            new_prices.select(
+                pl.col("Date").dt.date(), pl.col("Close").alias("New Close")
+            ),
+            on="Date",
+        )
+    )
+    return bool(
+        (
+            (overlap["New Close"] - overlap["Close"]).abs()
+            > tolerance * overlap["Close"].abs()
+        ).any()
+    )
+
+
+def merge_prices(prices: list[pl.DataFrame]) -> pl.DataFrame:
+    """
+    Merges price DataFrames, keeping the most recently fetched prices for any
+    dates that appear more than once.
+
+    Args:
+        prices: The price DataFrames, from the oldest fetch to the newest.
+
+    Returns:
+        The merged prices, sorted by date.
+    """
+    return (
+        pl.concat(prices, how="diagonal_relaxed")
+        .unique(subset="Date", keep="last", maintain_order=True)
+        .sort("Date")
+    )
+
+
+def _slice_prices(
+    prices: pl.DataFrame | None, start_date: datetime.date, end_date: datetime.date
+) -> pl.DataFrame:
+    if prices is None:
+        return pl.DataFrame(schema={"Date": pl.Datetime("ns"), "Close": pl.Float64})
+    return prices.filter(pl.col("Date").dt.date().is_between(start_date, end_date))
+
+
+def _write_atomically(path: Path, write: Callable[[Path], object]) -> None:
+    # Write to a temporary file first, so readers never see a partial file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(
+        f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    write(temporary_path)
+    os.replace(temporary_path, path)
@@ -0,0 +1,249 @@
+"""
+Contains a persistent cache of the performance metrics of parameter
+combinations evaluated by the optimiser, so that rerunning an overlapping or
+widened grid on the same price data only backtests the new combinations.
+
+Each result is keyed by a hash of the price data, the strategy type, its
+parameters in a canonical form and the version of the backtesting engine, so
+a change to any of them is a cache miss rather than a stale result.
+"""
+
+import datetime
+import hashlib
+import json
+import math
+import numbers
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import polars as pl
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from quant_trading_strategy_backtester import models
+from quant_trading_strategy_backtester.models import OptimisationResultModel
+
+# Bump this whenever a change to the backtesting engine changes the metrics it
+# computes, so that results cached by the old engine are no longer used.
+ENGINE_VERSION = 4
+# The most cache keys looked up in one query, to stay well within SQLite's
+# limit on the number of query parameters.
+LOOKUP_BATCH_SIZE = 500
+# The most results kept in the cache. Once there are more, the results cached
+# first are evicted, so the database doesn't grow with every new set of price
+# data. Using a result doesn't refresh it, so that lookups don't write.
+MAX_CACHED_RESULTS = 500_000
+# Counting the cached results scans the whole table, so the cache is only
+# checked for results to evict once this many have been added by the process
+# since the last check. It can hold up to this many more than the maximum.
+EVICTION_CHECK_INTERVAL = 10_000
+
+# The number of results added since the cache was last checked for results to
+# evict. It starts at the interval, so the first results added by the process
+# trigger a check.
+_num_added_since_eviction_check = EVICTION_CHECK_INTERVAL
+_eviction_check_lock = threading.Lock()
+
+
+def get_price_data_fingerprint(data: pl.DataFrame) -> str:
+    """
+    Hashes price data by its contents, for keying cached results.
+
+    The data is rechunked and hashed as an Arrow IPC stream, so the same
+    prices give the same fingerprint in every process, however they're
+    chunked in memory.
+
+    Args:
+        data: Historical price data.
+
+    Returns:
+        The hex digest of the SHA-256 hash of the data.
+    """
+    return hashlib.sha256(data.rechunk().write_ipc(None).getvalue()).hexdigest()
+
+
+def canonicalise_params(params: dict[str, Any]) -> str:
+    """
+    Serialises strategy parameters in a canonical form, so that equivalent
+    parameters always serialise the same way, e.g. a window of 20 and 20.0.
+
+    Args:
+        params: The parameters of the strategy.
+
+    Returns:
+        The parameters as JSON, with the keys sorted and numbers as floats.
+    """
+    return json.dumps(
+        {
+            name: float(value)
+            if isinstance(value, numbers.Real) and not isinstance(value, bool)
+            else value
+            for name, value in params.items()
+        },
+        sort_keys=True,
+    )
+
+
+def get_result_cache_keys(
+    data: pl.DataFrame,
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+) -> list[str]:
+    """
+    Gets the cache keys of parameter combinations backtested on price data.
+
+    Args:
+        data: Historical price data.
+        strategy_type: The type of strategy to backtest.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+
+    Returns:
+        The cache key of each combination, in order.
+    """
+    fingerprint = get_price_data_fingerprint(data)
+    return [
+        hashlib.sha256(
+            json.dumps(
+                [
+                    ENGINE_VERSION,
+                    fingerprint,
+                    strategy_type,
+                    canonicalise_params(dict(zip(param_names, params))),
+                ]
+            ).encode()
+        ).hexdigest()
+        for params in param_combinations
+    ]
+
+
+def get_cached_results(
+    cache_keys: list[str], session_factory: Callable[[], Any] | None = None
+) -> dict[str, dict[str, float]]:
+    """
+    Gets the cached performance metrics of parameter combinations.
+
+    Args:
+        cache_keys: The cache keys of the combinations.
+        session_factory: The session factory for the database. Defaults to the
+                         app's database session.
+
+    Returns:
+        A dictionary of the cache keys with cached results to their 'Total
+        Return', 'Sharpe Ratio' and 'Max Drawdown'.
+    """
+    if not cache_keys:
+        return {}
+
+    unique_keys = list(dict.fromkeys(cache_keys))
+    with models.session_scope(session_factory) as session:
+        results: dict[str, dict[str, float]] = {}
+        for i in range(0, len(unique_keys), LOOKUP_BATCH_SIZE):
+            rows = session.query(
+                OptimisationResultModel.cache_key,
+                OptimisationResultModel.total_return,
+                OptimisationResultModel.sharpe_ratio,
+                OptimisationResultModel.max_drawdown,
+            ).filter(
+                OptimisationResultModel.cache_key.in_(
+                    unique_keys[i : i + LOOKUP_BATCH_SIZE]
+                )
+            )
+            for cache_key, total_return, sharpe_ratio, max_drawdown in rows:
+                results[cache_key] = {
+                    "Total Return": _from_column(total_return),
+                    "Sharpe Ratio": _from_column(sharpe_ratio),
+                    "Max Drawdown": _from_column(max_drawdown),
+                }
+        return results
+
+
+def cache_results(
+    strategy_type: str,
+    param_names: list[str],
+    param_combinations: list[tuple],
+    cache_keys: list[str],
+    grid_metrics: pl.DataFrame,
+    session_factory: Callable[[], Any] | None = None,
+    max_results: int = MAX_CACHED_RESULTS,
+    eviction_check_interval: int = EVICTION_CHECK_INTERVAL,
+) -> None:
+    """
+    Caches the performance metrics of evaluated parameter combinations.
+    Combinations that are already cached, e.g. by another optimisation
+    running at the same time, are left as they are. Once enough results have
+    been added since the last check, if the cache holds more than max_results
+    results, the results cached first are evicted.
+
+    Args:
+        strategy_type: The type of strategy backtested.
+        param_names: The names of the strategy parameters.
+        param_combinations: The values of the parameters in each combination.
+        cache_keys: The cache key of each combination, in order.
+        grid_metrics: The performance metrics of each combination, in order.
+        session_factory: The session factory for the database. Defaults to the
+                         app's database session.
+        max_results: The most results to keep in the cache.
+        eviction_check_interval: How many results to add between checks for
+                                 results to evict.
+    """
+    global _num_added_since_eviction_check
+    if not param_combinations:
+        return
+
+    now = datetime.datetime.now()
+    rows = [
+        {
+            "cache_key": cache_key,
+            "strategy_type": strategy_type,
+            "parameters": dict(zip(param_names, params)),
+            "total_return": _to_column(metrics["Total Return"]),
+            "sharpe_ratio": _to_column(metrics["Sharpe Ratio"]),
+            "max_drawdown": _to_column(metrics["Max Drawdown"]),
+            "created_at": now,
+        }
+        for cache_key, params, metrics in zip(
+            cache_keys, param_combinations, grid_metrics.iter_rows(named=True)
+        )
+    ]
+    with models.session_scope(session_factory) as session:
+        num_added = len(
+            session.scalars(
+                insert(OptimisationResultModel)
+                .on_conflict_do_nothing()
+                .returning(OptimisationResultModel.cache_key),
+                rows,
+            ).all()
+        )
+        with _eviction_check_lock:
+            _num_added_since_eviction_check += num_added
+            should_check = _num_added_since_eviction_check >= eviction_check_interval
+            if should_check:
+                _num_added_since_eviction_check = 0
+
+        num_excess = (
+            session.query(OptimisationResultModel).count() - max_results
+            if should_check
+            else 0
+        )
+        if num_excess > 0:
+            oldest_keys = (
+                select(OptimisationResultModel.cache_key)
+                .order_by(OptimisationResultModel.created_at)
+                .limit(num_excess)
+            )
+            session.query(OptimisationResultModel).filter(
+                OptimisationResultModel.cache_key.in_(oldest_keys)
+            ).delete(synchronize_session=False)
+        session.commit()
+
+
+def _to_column(value: float | None) -> float | None:
+    # SQLite has no NaN, so NaN metrics are stored as nulls.
+    return None if value is None or math.isnan(value) else value
+
+
+def _from_column(value: float | None) -> float:
+    return float("nan") if value is None else value
@@ -0,0 +1,235 @@
+"""
+Contains a write-behind writer that persists backtest results to the database
+in batches on a background thread, so that optimisations evaluating many
+parameter combinations don't pay for a database round trip and commit on
+every backtest.
+"""
+
+import atexit
+import datetime
+import json
+import queue
+import threading
+from typing import Any, Callable
+
+from sqlalchemy import insert
+
+from quant_trading_strategy_backtester import models
+from quant_trading_strategy_backtester.models import StrategyModel
+from quant_trading_strategy_backtester.utils import logger
+
+
+class ResultsWriter:
+    """
+    Persists backtest result rows to the database in batches.
+
+    Rows are enqueued by backtests and drained in bulk by a background thread,
+    with each batch written as a single executemany insert in one transaction.
+    Rows that duplicate an existing strategy with the same name, parameters
+    and date range are skipped, matching the synchronous save behaviour. If a
+    batch fails to write, e.g. because the database is locked, its rows are
+    kept and written first by the next drain.
+
+    Attributes:
+        batch_size: The maximum number of rows written per transaction.
+        flush_interval: The number of seconds between background drains, or
+                        None to only write rows when flushed on demand.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any] | None = None,
+        batch_size: int = 500,
+        flush_interval: float | None = 1.0,
+    ) -> None:
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue()
+        # The rows taken off the queue whose write failed, to retry first.
+        self._failed_rows: list[dict[str, Any]] = []
+        # Serialises drains between the background thread and flush() callers.
+        self._drain_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def enqueue(self, row: dict[str, Any]) -> None:
+        """
+        Adds a result row to the queue to be written by the next drain.
+
+        Args:
+            row: The column values of a StrategyModel row.
+        """
+        if self._closed.is_set():
+            raise ValueError("Cannot enqueue results on a closed ResultsWriter")
+
+        self._queue.put(row)
+        if self.flush_interval is not None:
+            self._ensure_thread()
+            if self._queue.qsize() >= self.batch_size:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Writes all queued rows to the database in the calling thread.
+
+        Returns:
+            The number of rows inserted.
+
+        Raises:
+            Exception: The error of a batch that failed to write. Its rows,
+                       and those not written yet, are kept for the next
+                       drain.
+        """
+        return self._drain()
+
+    def close(self) -> None:
+        """
+        Stops the background thread and writes any remaining queued rows.
+        """
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+
+    def pending(self) -> int:
+        """
+        Returns:
+            The approximate number of rows waiting to be written.
+        """
+        return self._queue.qsize() + len(self._failed_rows)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="results-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._drain()
+            except Exception as e:
+                logger.error(f"Failed to write queued strategy results: {e}")
+
+    def _drain(self) -> int:
+        inserted = 0
+        with self._drain_lock:
+            while True:
+                batch = self._failed_rows[: self.batch_size]
+                del self._failed_rows[: self.batch_size]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return inserted
+                try:
+                    inserted += self._write_batch(batch)
+                except Exception:
+                    # Keep the rows for the next drain rather than losing
+                    # them, e.g. if the database was briefly locked.
+                    self._failed_rows[:0] = batch
+                    raise
+
+    def _write_batch(self, batch: list[dict[str, Any]]) -> int:
+        """
+        Writes a batch of rows in a single transaction, skipping rows that
+        already exist in the database or earlier in the batch.
+
+        Args:
+            batch: The rows to write.
+
+        Returns:
+            The number of rows inserted.
+        """
+        with models.session_scope(self._session_factory) as session:
+            names = {row["name"] for row in batch}
+            existing_keys = {
+                (name, parameters, start_date, end_date)
+                for name, parameters, start_date, end_date in session.query(
+                    StrategyModel.name,
+                    StrategyModel.parameters,
+                    StrategyModel.start_date,
+                    StrategyModel.end_date,
+                ).filter(StrategyModel.name.in_(names))
+            }
+
+            new_rows = []
+            for row in batch:
+                key = (
+                    row["name"],
+                    row["parameters"],
+                    row["start_date"],
+                    row["end_date"],
+                )
+                if key not in existing_keys:
+                    existing_keys.add(key)
+                    new_rows.append(row)
+
+            if new_rows:
+                session.execute(insert(StrategyModel), new_rows)
+            session.commit()
+            return len(new_rows)
+
+
+def make_result_row(
+    name: str,
+    parameters: dict[str, Any],
+    metrics: dict[str, float],
+    tickers: str | list[str] | None,
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> dict[str, Any]:
+    """
+    Builds the StrategyModel column values for a backtest result.
+
+    Args:
+        name: The name of the strategy class.
+        parameters: The strategy parameters.
+        metrics: The performance metrics of the backtest.
+        tickers: The ticker or tickers used in the backtest.
+        start_date: The first date of the backtest.
+        end_date: The last date of the backtest.
+
+    Returns:
+        A dictionary of column values.
+    """
+    return {
+        "date_created": datetime.datetime.now(),
+        "name": name,
+        "parameters": json.dumps(parameters),
+        "total_return": metrics["Total Return"],
+        "sharpe_ratio": metrics["Sharpe Ratio"],
+        "max_drawdown": metrics["Max Drawdown"],
+        "tickers": json.dumps(tickers),
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+_default_writer: ResultsWriter | None = None
+_default_writer_lock = threading.Lock()
+
+
+def get_results_writer() -> ResultsWriter:
+    """
+    Gets the process-wide results writer, creating it on first use. The writer
+    is flushed when the interpreter exits.
+
+    Returns:
+        The shared ResultsWriter.
+    """
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = ResultsWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer
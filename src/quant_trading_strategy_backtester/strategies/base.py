@@ -11,6 +11,8 @@ from typing import Any
 
 import polars as pl
 
+from quant_trading_strategy_backtester.feature_cache import RollingFeature
+
 TRADING_STRATEGIES = [
     "Buy and Hold",
     "Mean Reversion",
@@ -44,6 +46,61 @@ class BaseStrategy(ABC):
         """
         raise NotImplementedError("Method 'generate_signals' must be implemented.")
 
+    def generate_signals_lazy(self, data: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Builds a lazy query plan that generates trading signals.
+
+        The Backtester composes this plan with its returns calculation and
+        collects it once. Subclasses should override this with a pure
+        expression-based plan - the default falls back to the eager
+        generate_signals method.
+
+        Args:
+            data: Market data used to generate trading signals.
+
+        Returns:
+            A LazyFrame that evaluates to the trading signals.
+        """
+        return self.generate_signals(data.collect()).lazy()
+
+    def get_rolling_features(self) -> list[RollingFeature]:
+        """
+        Get the rolling statistics that the strategy's positions depend on.
+
+        Returns:
+            A list of the rolling features the strategy reads.
+        """
+        return []
+
+    def add_rolling_features(self, data: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Adds a column for each of the strategy's rolling features to the data.
+
+        Args:
+            data: Market data used to generate trading signals.
+
+        Returns:
+            A LazyFrame with the rolling feature columns added.
+        """
+        features = dict.fromkeys(self.get_rolling_features())
+        return data.with_columns([feature.expr() for feature in features])
+
+    def positions_expr(self) -> pl.Expr:
+        """
+        Builds an expression for the strategy's positions in terms of the
+        input price columns and the strategy's rolling feature columns.
+
+        This doesn't need any other intermediate columns, so the positions of
+        many strategies can be evaluated side by side in a single select, with
+        their rolling features computed once up front.
+
+        Returns:
+            An expression that evaluates to the positions column.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} doesn't provide a positions expression."
+        )
+
     def get_parameters(self) -> dict[str, Any]:
         """
         Get the parameters of the strategy.
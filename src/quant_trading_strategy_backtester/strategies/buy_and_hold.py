@@ -41,13 +41,32 @@ class BuyAndHoldStrategy(BaseStrategy):
                 ]
             )
 
-        signals = data.select([pl.col("Date"), pl.col("Close")])
-        # Add the 'signal' and 'positions' columns.
-        signals = signals.with_columns(
+        return self.generate_signals_lazy(data.lazy()).collect()
+
+    def generate_signals_lazy(self, data: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Builds the lazy query plan for the Buy and Hold signals.
+
+        Args:
+            data: Historical price data.
+
+        Returns:
+            A LazyFrame that evaluates to the trading signals.
+        """
+        return data.select(
             [
+                pl.col("Date"),
+                pl.col("Close"),
                 pl.lit(1.0).alias("signal"),
-                pl.lit(1.0).alias("positions"),
+                self.positions_expr().alias("positions"),
             ]
         )
 
-        return signals
+    def positions_expr(self) -> pl.Expr:
+        """
+        Builds the expression for a constant long position.
+
+        Returns:
+            An expression that evaluates to the positions column.
+        """
+        return pl.lit(1.0)
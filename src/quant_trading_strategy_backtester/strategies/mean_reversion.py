@@ -6,6 +6,7 @@ that asset prices tend to revert to their mean over time.
 from typing import Any
 
 import polars as pl
+from quant_trading_strategy_backtester.feature_cache import RollingFeature
 from quant_trading_strategy_backtester.strategies.base import BaseStrategy
 
 
@@ -31,6 +32,8 @@ class MeanReversionStrategy(BaseStrategy):
         # sets the upper and lower bands for buy and sell signals
         # (mean +/- std_dev).
         self.std_dev = float(params["std_dev"])
+        self.mean_feature = RollingFeature("Close", "mean", self.window)
+        self.std_feature = RollingFeature("Close", "std", self.window)
 
     def generate_signals(self, data: pl.DataFrame) -> pl.DataFrame:
         """
@@ -61,49 +64,70 @@ class MeanReversionStrategy(BaseStrategy):
                 ]
             )
 
-        signals = data.select([pl.col("Date"), pl.col("Close")])
-        signals = signals.with_columns(
+        return self.generate_signals_lazy(data.lazy()).collect()
+
+    def generate_signals_lazy(self, data: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Builds the lazy query plan for the mean reversion signals, so the
+        rolling statistics, bands and positions are evaluated in one pass.
+
+        Args:
+            data: A LazyFrame containing the price data. Must have a 'Close'
+                  column.
+
+        Returns:
+            A LazyFrame that evaluates to the trading signals.
+        """
+        return self.add_rolling_features(data).select(
             [
-                pl.col("Close")
-                .rolling_mean(window_size=self.window, min_periods=self.window)
-                .alias("mean"),
-                pl.col("Close")
-                .rolling_std(window_size=self.window, min_periods=self.window)
-                .alias("std"),
+                pl.col("Date"),
+                pl.col("Close"),
+                pl.col(self.mean_feature.name).alias("mean"),
+                self._std_expr().alias("std"),
+                self._upper_band_expr().alias("upper_band"),
+                self._lower_band_expr().alias("lower_band"),
+                self._signal_expr().alias("signal"),
+                self.positions_expr().alias("positions"),
             ]
         )
+
+    def positions_expr(self) -> pl.Expr:
+        """
+        Builds the expression for the positions, which are the changes in the
+        signal.
+
+        Returns:
+            An expression that evaluates to the positions column.
+        """
+        return self._signal_expr().diff().fill_null(0)
+
+    def get_rolling_features(self) -> list[RollingFeature]:
+        """
+        Get the moving average and standard deviation of the closing price.
+
+        Returns:
+            A list of the rolling features the strategy reads.
+        """
+        return [self.mean_feature, self.std_feature]
+
+    def _std_expr(self) -> pl.Expr:
+        std = pl.col(self.std_feature.name)
         # Avoid division by zero by replacing 0s with NaN.
-        signals = signals.with_columns(
-            [
-                pl.when(pl.col("std") == 0)
-                .then(pl.lit(float("nan")))
-                .otherwise(pl.col("std"))
-                .alias("std")
-            ]
-        )
+        return pl.when(std == 0).then(pl.lit(float("nan"))).otherwise(std)
 
-        signals = signals.with_columns(
-            [
-                (pl.col("mean") + (self.std_dev * pl.col("std"))).alias("upper_band"),
-                (pl.col("mean") - (self.std_dev * pl.col("std"))).alias("lower_band"),
-            ]
-        )
+    def _upper_band_expr(self) -> pl.Expr:
+        return pl.col(self.mean_feature.name) + (self.std_dev * self._std_expr())
 
-        signals = signals.with_columns(
-            [
-                # Buy signal
-                pl.when(pl.col("Close") < pl.col("lower_band"))
-                .then(1.0)
-                # Sell signal
-                .when(pl.col("Close") > pl.col("upper_band"))
-                .then(-1.0)
-                .otherwise(0.0)
-                .alias("signal")
-            ]
-        )
+    def _lower_band_expr(self) -> pl.Expr:
+        return pl.col(self.mean_feature.name) - (self.std_dev * self._std_expr())
 
-        signals = signals.with_columns(
-            [pl.col("signal").diff().fill_null(0).alias("positions")]
+    def _signal_expr(self) -> pl.Expr:
+        return (
+            # Buy signal
+            pl.when(pl.col("Close") < self._lower_band_expr())
+            .then(1.0)
+            # Sell signal
+            .when(pl.col("Close") > self._upper_band_expr())
+            .then(-1.0)
+            .otherwise(0.0)
         )
-
-        return signals
@@ -6,6 +6,7 @@ crossover of short-term and long-term moving averages of the closing price.
 from typing import Any
 
 import polars as pl
+from quant_trading_strategy_backtester.feature_cache import RollingFeature
 from quant_trading_strategy_backtester.strategies.base import BaseStrategy
 
 
@@ -26,6 +27,8 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
         # The number of days for the short-term and long-term moving average.
         self.short_window = int(params["short_window"])
         self.long_window = int(params["long_window"])
+        self.short_mavg_feature = RollingFeature("Close", "mean", self.short_window)
+        self.long_mavg_feature = RollingFeature("Close", "mean", self.long_window)
 
     def generate_signals(self, data: pl.DataFrame) -> pl.DataFrame:
         """
@@ -56,38 +59,59 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
                 ]
             )
 
-        signals = data.select([pl.col("Date"), pl.col("Close")])
-        signals = signals.with_columns(
-            [
-                pl.col("Close")
-                .rolling_mean(
-                    window_size=self.short_window, min_periods=self.short_window
-                )
-                .alias("short_mavg"),
-                pl.col("Close")
-                .rolling_mean(
-                    window_size=self.long_window, min_periods=self.long_window
-                )
-                .alias("long_mavg"),
-                pl.lit(0.0).alias("signal"),
-            ]
-        )
+        return self.generate_signals_lazy(data.lazy()).collect()
 
-        signals = signals.with_columns(
+    def generate_signals_lazy(self, data: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Builds the lazy query plan for the moving average crossover signals,
+        so both moving averages and the positions are evaluated in one pass.
+
+        Args:
+            data: A LazyFrame containing the price data. Must have a 'Close'
+                  column.
+
+        Returns:
+            A LazyFrame that evaluates to the trading signals.
+        """
+        return self.add_rolling_features(data).select(
             [
-                # If the short-term moving average is above the long-term moving
-                # average, generate a buy signal.
-                pl.when(pl.col("short_mavg") > pl.col("long_mavg"))
-                .then(1.0)
-                .otherwise(0.0)
-                .alias("signal")
+                pl.col("Date"),
+                pl.col("Close"),
+                pl.col(self.short_mavg_feature.name).alias("short_mavg"),
+                pl.col(self.long_mavg_feature.name).alias("long_mavg"),
+                self._signal_expr().alias("signal"),
+                self.positions_expr().alias("positions"),
             ]
         )
 
-        # If the short-term moving average is below the long-term moving
-        # average, generate a sell signal by setting all non-buy signals to -1.
-        signals = signals.with_columns(
-            [pl.col("signal").diff().fill_null(0.0).alias("positions")]
-        )
+    def positions_expr(self) -> pl.Expr:
+        """
+        Builds the expression for the positions, which are the changes in the
+        signal.
+
+        Returns:
+            An expression that evaluates to the positions column.
+        """
+        return self._signal_expr().diff().fill_null(0.0)
+
+    def get_rolling_features(self) -> list[RollingFeature]:
+        """
+        Get the short-term and long-term moving averages of the closing price.
 
-        return signals
+        Returns:
+            A list of the rolling features the strategy reads.
+        """
+        return [self.short_mavg_feature, self.long_mavg_feature]
+
+    def _signal_expr(self) -> pl.Expr:
+        # If the short-term moving average is above the long-term moving
+        # average, generate a buy signal. Otherwise, the signal is 0, so the
+        # change in the signal is a sell when the averages cross back.
+        return (
+            pl.when(
+                pl.col(self.short_mavg_feature.name)
+                > pl.col(self.long_mavg_feature.name)
+            )
+            .then(1.0)
+            .otherwise(0.0)
+        )
@@ -7,6 +7,10 @@ assets will continue.
 from typing import Any
 
 import polars as pl
+from quant_trading_strategy_backtester.feature_cache import (
+    DERIVED_COLUMNS,
+    RollingFeature,
+)
 from quant_trading_strategy_backtester.strategies.base import BaseStrategy
 
 
@@ -32,6 +36,8 @@ class PairsTradingStrategy(BaseStrategy):
         self.entry_z_score = float(params["entry_z_score"])
         # The z-score threshold for exiting a trade.
         self.exit_z_score = float(params["exit_z_score"])
+        self.spread_mean_feature = RollingFeature("spread", "mean", self.window)
+        self.spread_std_feature = RollingFeature("spread", "std", self.window)
 
     def generate_signals(self, data: pl.DataFrame) -> pl.DataFrame:
         """
@@ -73,62 +79,84 @@ class PairsTradingStrategy(BaseStrategy):
                     ("positions", pl.Float64),
                 ]
             )
-        if "Close_1" not in data.columns or "Close_2" not in data.columns:
+        return self.generate_signals_lazy(data.lazy()).collect()
+
+    def generate_signals_lazy(self, data: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Builds the lazy query plan for the pairs trading signals, so the
+        spread, its z-score, the signals and the positions are evaluated in
+        one pass.
+
+        Args:
+            data: A LazyFrame containing the price data. Must have 'Close_1'
+                  and 'Close_2' columns.
+
+        Returns:
+            A LazyFrame that evaluates to the trading signals.
+        """
+        columns = data.collect_schema().names()
+        if "Close_1" not in columns or "Close_2" not in columns:
             raise ValueError("Data must contain 'Close_1' and 'Close_2' columns")
 
-        signals = data.select(
+        return self.add_rolling_features(data).select(
             [
                 pl.col("Date"),
                 pl.col("Close_1"),
                 pl.col("Close_2"),
-                (pl.col("Close_1") - pl.col("Close_2")).alias("spread"),
+                self._spread_expr().alias("spread"),
+                pl.col(self.spread_mean_feature.name).alias("spread_mean"),
+                pl.col(self.spread_std_feature.name).alias("spread_std"),
+                self._z_score_expr().alias("z_score"),
+                self._signal_expr().alias("signal"),
+                self.positions_expr().alias("positions"),
             ]
         )
 
-        # Calculate rolling mean and std, handling potential division by zero
-        signals = signals.with_columns(
-            [
-                pl.col("spread")
-                .rolling_mean(window_size=self.window, min_periods=self.window)
-                .alias("spread_mean"),
-                pl.col("spread")
-                .rolling_std(window_size=self.window, min_periods=self.window)
-                .alias("spread_std"),
-            ]
-        )
+    def positions_expr(self) -> pl.Expr:
+        """
+        Builds the expression for the positions, which are the changes in the
+        signal.
 
-        # Calculate z-score, avoiding division by zero
-        signals = signals.with_columns(
-            [
-                pl.when(pl.col("spread_std") != 0)
-                .then((pl.col("spread") - pl.col("spread_mean")) / pl.col("spread_std"))
-                .otherwise(0)
-                .alias("z_score")
-            ]
-        )
+        Returns:
+            An expression that evaluates to the positions column.
+        """
+        return self._signal_expr().diff().fill_null(0)
 
-        # Generate trading signals
-        signals = signals.with_columns(
-            [
-                pl.when(pl.col("z_score") > self.entry_z_score)
-                .then(-1)
-                .when(pl.col("z_score") < -self.entry_z_score)
-                .then(1)
-                .when(pl.col("z_score").abs() < self.exit_z_score)
-                .then(0)
-                .otherwise(None)
-                .alias("signal")
-            ]
-        )
+    def get_rolling_features(self) -> list[RollingFeature]:
+        """
+        Get the rolling mean and standard deviation of the spread.
 
-        # Fill forward the signal
-        signals = signals.with_columns(
-            [pl.col("signal").forward_fill().fill_null(0).alias("signal")]
+        Returns:
+            A list of the rolling features the strategy reads.
+        """
+        return [self.spread_mean_feature, self.spread_std_feature]
+
+    def _spread_expr(self) -> pl.Expr:
+        return DERIVED_COLUMNS["spread"]
+
+    def _z_score_expr(self) -> pl.Expr:
+        # Avoid division by zero by using a z-score of 0 for a flat spread.
+        spread_std = pl.col(self.spread_std_feature.name)
+        return (
+            pl.when(spread_std != 0)
+            .then(
+                (self._spread_expr() - pl.col(self.spread_mean_feature.name))
+                / spread_std
+            )
+            .otherwise(0)
         )
 
-        # Calculate positions (changes in signal)
-        signals = signals.with_columns(
-            [pl.col("signal").diff().fill_null(0).alias("positions")]
+    def _signal_expr(self) -> pl.Expr:
+        z_score = self._z_score_expr()
+        return (
+            pl.when(z_score > self.entry_z_score)
+            .then(-1)
+            .when(z_score < -self.entry_z_score)
+            .then(1)
+            .when(z_score.abs() < self.exit_z_score)
+            .then(0)
+            .otherwise(None)
+            # Hold the previous signal between the entry and exit thresholds.
+            .forward_fill()
+            .fill_null(0)
         )
-
-        return signals
@@ -7,16 +7,23 @@ import datetime
 from typing import Any, cast
 
 import streamlit as st
+from quant_trading_strategy_backtester.optimiser import SEARCH_METHODS
 from quant_trading_strategy_backtester.strategies.base import TRADING_STRATEGIES
 from quant_trading_strategy_backtester.utils import (
     NUM_TOP_COMPANIES_ONE_TICKER,
     NUM_TOP_COMPANIES_TWO_TICKERS,
 )
 
+SEARCH_METHOD_NAMES = {
+    "grid": "Grid Search",
+    "successive_halving": "Successive Halving",
+    "bayesian": "Bayesian Search",
+}
 
-def get_user_inputs_except_strategy_params() -> (
-    tuple[str | tuple[str, str] | None, datetime.date, datetime.date, str, bool]
-):
+
+def get_user_inputs_except_strategy_params() -> tuple[
+    str | tuple[str, str] | None, datetime.date, datetime.date, str, bool
+]:
     """
     Gets user inputs besides strategy parameters from the Streamlit sidebar.
 
@@ -185,3 +192,44 @@ def get_user_inputs_for_strategy_params(
         params = get_fixed_params(strategy_type)
 
     return optimise, params
+
+
+def get_search_method() -> str:
+    """
+    Gets how to search the strategy parameters when optimising them from the
+    Streamlit sidebar.
+
+    Returns:
+        The search method, one of SEARCH_METHODS.
+    """
+    return cast(
+        str,
+        st.sidebar.selectbox(
+            "Search Method",
+            SEARCH_METHODS,
+            format_func=lambda method: SEARCH_METHOD_NAMES[method],
+            help="Successive halving only evaluates the most promising "
+            "parameters on the full date range, which is faster for large "
+            "grids. Bayesian search evaluates a fixed budget of parameters "
+            "anywhere between the lowest and highest values, rather than only "
+            "the grid points.",
+        ),
+    )
+
+
+def get_time_limit() -> float | None:
+    """
+    Gets the time limit for optimising from the Streamlit sidebar.
+
+    Returns:
+        The time limit in seconds, or None for no time limit.
+    """
+    time_limit = st.sidebar.number_input(
+        "Time Limit (seconds)",
+        min_value=0,
+        value=0,
+        step=10,
+        help="Stop optimising after this many seconds and use the best result "
+        "found so far. 0 means no time limit.",
+    )
+    return float(time_limit) if time_limit else None
@@ -0,0 +1,85 @@
+"""
+Contains a local store of dated snapshots of a universe of stocks, such as the
+S&P 500 constituents and their market caps.
+
+Building a snapshot means scraping the constituents and fetching the market
+cap of every one of them, so snapshots are saved as Parquet files named after
+their date and reused until they're too old, rather than rebuilt every run.
+Older snapshots are kept, so the universe on an earlier date can be reloaded.
+"""
+
+import datetime
+from pathlib import Path
+
+import polars as pl
+
+
+class UniverseSnapshotStore:
+    """
+    A store of dated snapshots of a universe of stocks in Parquet files.
+
+    Attributes:
+        directory: The directory the snapshot files are kept in.
+        name: The name of the universe, used as the prefix of the file names.
+    """
+
+    def __init__(self, directory: str | Path, name: str) -> None:
+        self.directory = Path(directory)
+        self.name = name
+
+    def list_dates(self) -> list[datetime.date]:
+        """
+        Lists the dates of the saved snapshots.
+
+        Returns:
+            The date of each snapshot, from oldest to newest.
+        """
+        prefix = f"{self.name}_"
+        return sorted(
+            datetime.date.fromisoformat(path.stem.removeprefix(prefix))
+            for path in self.directory.glob(f"{prefix}*.parquet")
+        )
+
+    def get_latest_date(self) -> datetime.date | None:
+        """
+        Returns:
+            The date of the newest snapshot, or None if there are none.
+        """
+        dates = self.list_dates()
+        return dates[-1] if dates else None
+
+    def load(self, snapshot_date: datetime.date | None = None) -> pl.DataFrame:
+        """
+        Loads a snapshot.
+
+        Args:
+            snapshot_date: The date of the snapshot to load. Defaults to the
+                           newest snapshot.
+
+        Returns:
+            The snapshot.
+        """
+        snapshot_date = snapshot_date or self.get_latest_date()
+        if snapshot_date is None:
+            raise ValueError(f"No {self.name} snapshots available")
+        return pl.read_parquet(self._get_snapshot_path(snapshot_date))
+
+    def save(
+        self, snapshot: pl.DataFrame, snapshot_date: datetime.date | None = None
+    ) -> None:
+        """
+        Saves a snapshot, replacing any snapshot from the same date.
+
+        Args:
+            snapshot: The snapshot to save.
+            snapshot_date: The date of the snapshot. Defaults to today.
+        """
+        path = self._get_snapshot_path(snapshot_date or datetime.date.today())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so readers never see a partial file.
+        temporary_path = path.with_name(f".{path.name}.tmp")
+        snapshot.write_parquet(temporary_path, compression="zstd")
+        temporary_path.replace(path)
+
+    def _get_snapshot_path(self, snapshot_date: datetime.date) -> Path:
+        return self.directory / f"{self.name}_{snapshot_date.isoformat()}.parquet"
@@ -10,7 +10,9 @@ from quant_trading_strategy_backtester.models import Base
 
 logger = logging.getLogger(__name__)
 NUM_TOP_COMPANIES_ONE_TICKER = 100
-NUM_TOP_COMPANIES_TWO_TICKERS = 20
+NUM_TOP_COMPANIES_TWO_TICKERS = 100
+# The number of pairs backtested after the pairs are screened.
+NUM_CANDIDATE_PAIRS = 50
 
 
 def clear_database():
@@ -2,10 +2,14 @@
 Contains functions to display backtest results using Streamlit and Plotly.
 """
 
+import io
+
 import plotly.graph_objects as go
 import polars as pl
 import streamlit as st
 
+from quant_trading_strategy_backtester.grid_results import GridResults, TickerRanking
+
 
 def display_performance_metrics(
     metrics: dict[str, float], company_name: str | None
@@ -138,3 +142,94 @@ def display_returns_by_month(results: pl.DataFrame) -> None:
             use_container_width=False,
             hide_index=True,
         )
+
+
+def display_grid_results(grid_results: GridResults) -> None:
+    """
+    Displays the results of a parameter grid search: a leaderboard of the best
+    parameter combinations, a heatmap of the Sharpe ratio across the first two
+    parameters, and a download of every result as a Parquet file.
+
+    Args:
+        grid_results: The results of the grid search.
+    """
+    if not len(grid_results):
+        return
+
+    st.subheader("Top Parameter Combinations")
+    st.dataframe(
+        grid_results.get_leaderboard().to_pandas(),
+        use_container_width=True,
+        hide_index=True,
+    )
+    if len(grid_results.param_names) >= 2:
+        plot_parameter_heatmap(grid_results.to_frame(), *grid_results.param_names[:2])
+
+    buffer = io.BytesIO()
+    grid_results.write_parquet(buffer)
+    st.download_button(
+        "Download All Results (Parquet)",
+        buffer.getvalue(),
+        file_name="grid_results.parquet",
+        mime="application/octet-stream",
+    )
+
+
+def display_ticker_ranking(ranking: TickerRanking) -> None:
+    """
+    Displays every ticker evaluated in a ticker selection, ranked by total
+    return.
+
+    Args:
+        ranking: The ranking of the evaluated tickers.
+    """
+    if not len(ranking):
+        return
+
+    st.subheader("Ticker Ranking")
+    st.dataframe(
+        ranking.to_frame().to_pandas(),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def plot_parameter_heatmap(
+    results: pl.DataFrame, x_param: str, y_param: str, metric: str = "Sharpe Ratio"
+) -> None:
+    """
+    Plots a heatmap of a performance metric across two strategy parameters.
+    Where the grid has other parameters, each cell shows the best value of
+    the metric across them.
+
+    Args:
+        results: The results table of a grid search, from GridResults.
+        x_param: The parameter on the x-axis.
+        y_param: The parameter on the y-axis.
+        metric: The performance metric to plot.
+    """
+    heatmap = (
+        results.group_by(x_param, y_param)
+        .agg(pl.col(metric).fill_nan(None).max())
+        .sort(x_param, y_param)
+        .pivot(on=x_param, index=y_param, values=metric)
+        .sort(y_param)
+    )
+
+    st.subheader(f"{metric} by {x_param} and {y_param}")
+    fig = go.Figure(
+        data=go.Heatmap(
+            x=heatmap.columns[1:],
+            y=heatmap[y_param].to_list(),
+            z=heatmap.drop(y_param).to_numpy(),
+            colorscale="RdYlGn",
+            colorbar={"title": metric},
+        )
+    )
+    fig.update_layout(
+        xaxis_title=x_param,
+        yaxis_title=y_param,
+        xaxis_type="category",
+        yaxis_type="category",
+    )
+    st.plotly_chart(fig)
@@ -2,12 +2,18 @@
 Contains pytest fixtures for tests, such as mock data.
 """
 
+import datetime
+import math
+from collections.abc import Callable
+
 import pandas as pd
 import polars as pl
 import pytest
+import yfinance
 from quant_trading_strategy_backtester.models import Base
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 
 @pytest.fixture
@@ -35,6 +41,43 @@ def mock_polars_data(mock_yfinance_data: pd.DataFrame) -> pl.DataFrame:
     return pl.from_pandas(mock_yfinance_data)
 
 
+@pytest.fixture
+def sine_wave_data() -> Callable[..., pl.DataFrame]:
+    # Generates daily prices following a sine wave with the given period (in
+    # days) and a linear trend, which strategies trade on.
+    def get_sine_wave_data(
+        period: float = 7, trend: float = 0.1, num_dates: int = 120
+    ) -> pl.DataFrame:
+        return pl.DataFrame(
+            {
+                "Date": [
+                    datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                    for i in range(num_dates)
+                ],
+                "Close": [
+                    100 + 10 * math.sin(i / period) + i * trend
+                    for i in range(num_dates)
+                ],
+            }
+        )
+
+    return get_sine_wave_data
+
+
+@pytest.fixture
+def sine_wave_closes(
+    sine_wave_data: Callable[..., pl.DataFrame],
+) -> dict[str, pl.Series]:
+    # The closing prices of tickers with different sine waves, for choosing
+    # between tickers or pairs of them.
+    return {
+        "AAPL": sine_wave_data(7, 0.1)["Close"],
+        "GOOGL": sine_wave_data(9, 0.05)["Close"],
+        "MSFT": sine_wave_data(5, 0.2)["Close"],
+        "AMZN": sine_wave_data(11, -0.1)["Close"],
+    }
+
+
 @pytest.fixture
 def mock_yfinance_pairs_data() -> pd.DataFrame:
     dates = pd.date_range(start="1/1/2020", end="1/31/2020")
@@ -58,20 +101,32 @@ def mock_polars_pairs_data(mock_yfinance_pairs_data: pd.DataFrame) -> pl.DataFra
 
 @pytest.fixture(scope="function", autouse=True)
 def mock_db_session(monkeypatch):
-    def mock_session():
-        return session
-
-    engine = create_engine("sqlite:///:memory:")
+    # Share one connection between threads, so that data fetched in
+    # background threads sees the same in-memory database.
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
     Base.metadata.create_all(engine)
-    TestingSessionLocal = sessionmaker(bind=engine)
+    # Give each thread its own session, since a session can't be used by
+    # several threads at once, e.g. one closing it while another queries.
+    TestingSessionLocal = scoped_session(sessionmaker(bind=engine))
     session = TestingSessionLocal()
     monkeypatch.setattr(
-        "quant_trading_strategy_backtester.models.Session", mock_session
+        "quant_trading_strategy_backtester.models.Session", TestingSessionLocal
     )
     yield session
     session.close()
 
 
+@pytest.fixture(autouse=True)
+def temporary_data_stores(monkeypatch, tmp_path):
+    # Keep the prices and snapshots fetched by each test in their own stores.
+    monkeypatch.setenv("PRICE_STORE_DIR", str(tmp_path / "price_store"))
+    monkeypatch.setenv("UNIVERSE_SNAPSHOT_DIR", str(tmp_path / "universe_snapshots"))
+
+
 @pytest.fixture(autouse=True)
 def mock_yfinance_functions(monkeypatch):
     def mock_load_one_ticker(*args, **kwargs):
@@ -90,6 +145,20 @@ def mock_yfinance_functions(monkeypatch):
             }
         )
 
+    def mock_iter_many_tickers(tickers, *args, **kwargs):
+        for ticker in tickers:
+            yield ticker, mock_load_one_ticker()
+
+    def mock_load_panel(tickers, *args, **kwargs):
+        dates = pd.date_range(start="1/1/2020", end="1/31/2020")
+        return pl.DataFrame(
+            {"Date": dates}
+            | {
+                ticker: [100.0 + i * 0.1 / (j + 1) for i in range(len(dates))]
+                for j, ticker in enumerate(tickers)
+            }
+        )
+
     # Mock all potential yfinance data loading functions
     monkeypatch.setattr(
         "quant_trading_strategy_backtester.data.load_yfinance_data_one_ticker",
@@ -108,12 +177,12 @@ def mock_yfinance_functions(monkeypatch):
         mock_load_two_tickers,
     )
     monkeypatch.setattr(
-        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_one_ticker",
-        mock_load_one_ticker,
+        "quant_trading_strategy_backtester.optimiser.iter_yfinance_data_many_tickers",
+        mock_iter_many_tickers,
     )
     monkeypatch.setattr(
-        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_two_tickers",
-        mock_load_two_tickers,
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        mock_load_panel,
     )
 
 
@@ -135,3 +204,29 @@ def mock_yfinance_download(monkeypatch):
         "yfinance.Ticker",
         lambda x: type("MockTicker", (), {"history": lambda **kwargs: mock_download()}),
     )
+
+
+@pytest.fixture
+def yfinance_downloads(monkeypatch) -> list[list[str]]:
+    # Mock yf.download with the histories of whichever yfinance.Ticker a test
+    # mocks, recording the tickers requested by each download. Like
+    # yf.download, tickers whose history fails are left out rather than
+    # raising.
+    downloads = []
+
+    def download(tickers, *args, start=None, end=None, **kwargs):
+        downloads.append(list(tickers))
+        histories = {}
+        for ticker in tickers:
+            try:
+                histories[ticker] = yfinance.Ticker(ticker).history(
+                    start=start, end=end
+                )
+            except Exception:
+                continue
+        if not histories:
+            return pd.DataFrame()
+        return pd.concat(histories, axis=1)
+
+    monkeypatch.setattr("yfinance.download", download)
+    return downloads
@@ -0,0 +1,133 @@
+"""
+Contains tests for stopping optimisations at a deadline.
+"""
+
+import time
+from collections.abc import Callable
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.anytime import (
+    CoverageReport,
+    Deadline,
+    record_coverage,
+    should_stop,
+)
+from quant_trading_strategy_backtester.grid_results import GridResults
+from quant_trading_strategy_backtester.optimiser import (
+    ANYTIME_CHUNK_SIZE,
+    optimise_strategy_params,
+)
+
+
+@pytest.fixture
+def sine_data(sine_wave_data: Callable[..., pl.DataFrame]) -> pl.DataFrame:
+    return sine_wave_data()
+
+
+def test_deadline_and_coverage_report() -> None:
+    deadline = Deadline(0.05)
+    assert deadline.get_stop_reason() is None
+    # An optimisation always makes at least one evaluation.
+    assert not should_stop(deadline, 0)
+    time.sleep(0.06)
+    assert deadline.get_stop_reason() == "deadline"
+    assert should_stop(deadline, 1)
+    assert not should_stop(None, 1)
+
+    deadline = Deadline()
+    deadline.cancel()
+    assert deadline.get_stop_reason() == "cancelled"
+    with pytest.raises(ValueError, match="Invalid time limit"):
+        Deadline(0)
+
+    coverage = CoverageReport()
+    record_coverage(coverage, deadline, 3, 12)
+    assert not coverage.is_complete
+    assert coverage.get_summary().startswith("Completed 3 / 12 evaluations (25%)")
+    # A search that covered everything is complete, even if it was cancelled
+    # at the end.
+    record_coverage(coverage, deadline, 12, 12)
+    assert coverage.is_complete
+
+
+def test_deadline_from_expiry_time() -> None:
+    # A deadline passed to a worker process by its expiry time keeps its time
+    # limit.
+    deadline = Deadline.from_expiry_time(Deadline(0.05).get_expiry_time())
+    assert deadline.time_limit == pytest.approx(0.05, abs=0.01)
+    assert deadline.get_stop_reason() is None
+    time.sleep(0.06)
+    assert deadline.get_stop_reason() == "deadline"
+
+    assert Deadline().get_expiry_time() is None
+    assert Deadline.from_expiry_time(None).get_stop_reason() is None
+    assert Deadline.from_expiry_time(time.time() - 1).get_stop_reason() == "deadline"
+
+
+def test_optimise_strategy_params_stops_at_deadline(sine_data: pl.DataFrame) -> None:
+    parameter_ranges = {"window": range(5, 41), "std_dev": [0.5, 1.0, 1.5, 2.0]}
+    total_combinations = 36 * 4
+
+    # Without running out of time, the search covers the whole grid and finds
+    # the same combination as a search without a deadline.
+    coverage = CoverageReport()
+    best_params, best_metrics = optimise_strategy_params(
+        sine_data,
+        "Mean Reversion",
+        parameter_ranges,
+        "AAPL",
+        use_result_cache=False,
+        deadline=Deadline(600),
+        coverage=coverage,
+    )
+    expected_params, expected_metrics = optimise_strategy_params(
+        sine_data, "Mean Reversion", parameter_ranges, "AAPL", use_result_cache=False
+    )
+    assert coverage.is_complete
+    assert coverage.num_evaluated == total_combinations
+    assert best_params == expected_params
+    assert best_metrics == pytest.approx(expected_metrics)
+
+    # Once cancelled, the search stops after the first chunk, which is spread
+    # across the whole grid, and returns the best combination in it.
+    deadline = Deadline()
+    deadline.cancel()
+    grid_results = GridResults(list(parameter_ranges))
+    best_params, _ = optimise_strategy_params(
+        sine_data,
+        "Mean Reversion",
+        parameter_ranges,
+        "AAPL",
+        grid_results=grid_results,
+        use_result_cache=False,
+        deadline=deadline,
+        coverage=coverage,
+    )
+    assert coverage.stop_reason == "cancelled"
+    assert coverage.num_evaluated == ANYTIME_CHUNK_SIZE
+    assert coverage.num_planned == total_combinations
+    results = grid_results.to_frame()
+    assert len(results) == ANYTIME_CHUNK_SIZE
+    assert results["window"].min() == 5
+    assert results["window"].max() > 35
+    best_result = grid_results.get_leaderboard().row(0, named=True)
+    assert {name: best_result[name] for name in parameter_ranges} == best_params
+
+
+def test_optimise_strategy_params_with_deadline_handles_an_empty_grid(
+    sine_data: pl.DataFrame,
+) -> None:
+    coverage = CoverageReport()
+    with pytest.raises(ValueError, match="Parameter optimisation failed"):
+        optimise_strategy_params(
+            sine_data,
+            "Mean Reversion",
+            {"window": range(0), "std_dev": [1.0, 2.0]},
+            "AAPL",
+            use_result_cache=False,
+            deadline=Deadline(600),
+            coverage=coverage,
+        )
+    assert coverage.num_evaluated == 0
+    assert coverage.num_planned == 0
@@ -4,6 +4,7 @@ Contains tests for the Backtester class and its methods.
 
 import datetime
 import math
+from collections.abc import Callable
 from typing import Any
 
 import polars as pl
@@ -234,3 +235,150 @@ def test_backtester_save_results(mock_db_session, mock_polars_data):
     )
 
     assert saved_strategy.max_drawdown is not None
+
+
+def get_eager_moving_average_crossover_signals(
+    data: pl.DataFrame, short_window: int, long_window: int
+) -> pl.DataFrame:
+    # The signals as computed step by step before the lazy query plans.
+    signals = data.select("Date", "Close").with_columns(
+        pl.col("Close")
+        .rolling_mean(window_size=short_window, min_samples=short_window)
+        .alias("short_mavg"),
+        pl.col("Close")
+        .rolling_mean(window_size=long_window, min_samples=long_window)
+        .alias("long_mavg"),
+    )
+    signals = signals.with_columns(
+        pl.when(pl.col("short_mavg") > pl.col("long_mavg"))
+        .then(1.0)
+        .otherwise(0.0)
+        .alias("signal")
+    )
+    return signals.with_columns(
+        pl.col("signal").diff().fill_null(0.0).alias("positions")
+    )
+
+
+def get_eager_mean_reversion_signals(
+    data: pl.DataFrame, window: int, std_dev: float
+) -> pl.DataFrame:
+    # The signals as computed step by step before the lazy query plans.
+    signals = data.select("Date", "Close").with_columns(
+        pl.col("Close")
+        .rolling_mean(window_size=window, min_samples=window)
+        .alias("mean"),
+        pl.col("Close")
+        .rolling_std(window_size=window, min_samples=window)
+        .alias("std"),
+    )
+    signals = signals.with_columns(
+        pl.when(pl.col("std") == 0)
+        .then(pl.lit(float("nan")))
+        .otherwise(pl.col("std"))
+        .alias("std")
+    )
+    signals = signals.with_columns(
+        (pl.col("mean") + std_dev * pl.col("std")).alias("upper_band"),
+        (pl.col("mean") - std_dev * pl.col("std")).alias("lower_band"),
+    )
+    signals = signals.with_columns(
+        pl.when(pl.col("Close") < pl.col("lower_band"))
+        .then(1.0)
+        .when(pl.col("Close") > pl.col("upper_band"))
+        .then(-1.0)
+        .otherwise(0.0)
+        .alias("signal")
+    )
+    return signals.with_columns(pl.col("signal").diff().fill_null(0).alias("positions"))
+
+
+def get_eager_pairs_trading_signals(
+    data: pl.DataFrame, window: int, entry_z_score: float, exit_z_score: float
+) -> pl.DataFrame:
+    # The signals as computed step by step before the lazy query plans.
+    signals = data.select(
+        "Date",
+        "Close_1",
+        "Close_2",
+        (pl.col("Close_1") - pl.col("Close_2")).alias("spread"),
+    )
+    signals = signals.with_columns(
+        pl.col("spread")
+        .rolling_mean(window_size=window, min_samples=window)
+        .alias("spread_mean"),
+        pl.col("spread")
+        .rolling_std(window_size=window, min_samples=window)
+        .alias("spread_std"),
+    )
+    signals = signals.with_columns(
+        pl.when(pl.col("spread_std") != 0)
+        .then((pl.col("spread") - pl.col("spread_mean")) / pl.col("spread_std"))
+        .otherwise(0)
+        .alias("z_score")
+    )
+    signals = signals.with_columns(
+        pl.when(pl.col("z_score") > entry_z_score)
+        .then(-1)
+        .when(pl.col("z_score") < -entry_z_score)
+        .then(1)
+        .when(pl.col("z_score").abs() < exit_z_score)
+        .then(0)
+        .otherwise(None)
+        .alias("signal")
+    )
+    signals = signals.with_columns(pl.col("signal").forward_fill().fill_null(0))
+    return signals.with_columns(pl.col("signal").diff().fill_null(0).alias("positions"))
+
+
+@pytest.mark.parametrize(
+    "strategy_class,params,get_eager_signals",
+    [
+        (
+            MovingAverageCrossoverStrategy,
+            {"short_window": 5, "long_window": 20},
+            get_eager_moving_average_crossover_signals,
+        ),
+        (
+            MeanReversionStrategy,
+            {"window": 5, "std_dev": 1.0},
+            get_eager_mean_reversion_signals,
+        ),
+        (
+            PairsTradingStrategy,
+            {"window": 20, "entry_z_score": 1.0, "exit_z_score": 0.5},
+            get_eager_pairs_trading_signals,
+        ),
+    ],
+)
+def test_backtester_lazy_signals_match_eager_signals(
+    sine_wave_data: Callable[..., pl.DataFrame],
+    sine_wave_closes: dict[str, pl.Series],
+    strategy_class: type[BaseStrategy],
+    params: dict[str, Any],
+    get_eager_signals: Callable[..., pl.DataFrame],
+) -> None:
+    data = sine_wave_data()
+    if strategy_class is PairsTradingStrategy:
+        data = data.select(
+            "Date",
+            sine_wave_closes["AAPL"].alias("Close_1"),
+            sine_wave_closes["GOOGL"].alias("Close_2"),
+        )
+    strategy = strategy_class(params)
+    lazy_signals = strategy.generate_signals_lazy(data.lazy())
+    expected_signals = get_eager_signals(data, **params)
+
+    assert isinstance(lazy_signals, pl.LazyFrame)
+    signals = lazy_signals.collect()
+    # The signals trade, so the comparison isn't trivially all zeroes.
+    assert signals["positions"].abs().sum() > 0
+    for col in ("signal", "positions"):
+        assert (
+            signals[col].cast(pl.Float64).to_list()
+            == expected_signals[col].cast(pl.Float64).to_list()
+        )
+
+    results = Backtester(data, strategy).run()
+    for col in signals.columns:
+        assert col in results.columns
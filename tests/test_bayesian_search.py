@@ -0,0 +1,103 @@
+"""
+Contains tests for the Bayesian search of strategy parameters.
+"""
+
+import datetime
+
+import numpy as np
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.bayesian_search import TreeParzenEstimator
+from quant_trading_strategy_backtester.grid_results import GridResults
+from quant_trading_strategy_backtester.optimiser import optimise_strategy_params
+
+
+def get_score(params: tuple) -> float:
+    # Peaks at a window of 30 and a z-score of 1.7.
+    window, z_score = params
+    return -(((window - 30) / 100) ** 2) - (z_score - 1.7) ** 2
+
+
+def test_tree_parzen_estimator_suggests_new_combinations_within_bounds() -> None:
+    estimator = TreeParzenEstimator({"window": (5, 100), "z_score": (0.5, 3.0)}, seed=0)
+    suggested = []
+    while len(estimator) < 60:
+        batch = estimator.suggest(10)
+        estimator.observe(batch, [get_score(params) for params in batch])
+        suggested.extend(batch)
+
+    assert len(set(suggested)) == 60
+    assert all(
+        isinstance(window, int) and 5 <= window <= 100 and 0.5 <= z_score <= 3.0
+        for window, z_score in suggested
+    )
+    # Later batches are proposed near the best combinations found so far.
+    assert max(get_score(params) for params in suggested) > -0.01
+    assert np.mean([get_score(params) for params in suggested[-20:]]) > np.mean(
+        [get_score(params) for params in suggested[:10]]
+    )
+
+
+def test_tree_parzen_estimator_runs_out_of_integer_combinations() -> None:
+    estimator = TreeParzenEstimator({"window": (1, 4)}, seed=0)
+    batch = estimator.suggest(10)
+    assert sorted(batch) == [(1,), (2,), (3,), (4,)]
+
+    # Combinations whose Sharpe ratios are NaN are still never suggested again.
+    estimator.observe(batch, [1.0, float("nan"), 0.5, 0.0])
+    assert estimator.suggest(10) == []
+
+    with pytest.raises(ValueError, match="Invalid bounds for window"):
+        TreeParzenEstimator({"window": (10, 5)})
+
+
+def test_optimise_strategy_params_by_bayesian_search() -> None:
+    rng = np.random.default_rng(0)
+    num_dates = 250
+    base = 100 + np.cumsum(rng.normal(size=num_dates))
+    data = pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                for i in range(num_dates)
+            ],
+            "Close_1": base,
+            "Close_2": 0.5 * base + rng.normal(size=num_dates),
+        }
+    )
+    parameter_ranges = {
+        "window": (10, 50),
+        "entry_z_score": (1.0, 3.0),
+        "exit_z_score": (0.1, 1.0),
+    }
+    grid_results = GridResults(list(parameter_ranges))
+
+    best_params, best_metrics = optimise_strategy_params(
+        data,
+        "Pairs Trading",
+        parameter_ranges,
+        ["AAA", "BBB"],
+        grid_results=grid_results,
+        search_method="bayesian",
+        max_evaluations=25,
+    )
+
+    results = grid_results.to_frame()
+    assert len(results) == 25
+    for name, (low, high) in parameter_ranges.items():
+        assert results[name].is_between(low, high).all()
+    # The thresholds are searched continuously rather than on a grid.
+    assert results["entry_z_score"].n_unique() > 20
+    best_result = grid_results.get_leaderboard().row(0, named=True)
+    assert {name: best_result[name] for name in parameter_ranges} == best_params
+    assert best_metrics["Sharpe Ratio"] == pytest.approx(best_result["Sharpe Ratio"])
+
+    with pytest.raises(ValueError, match="Invalid maximum number of evaluations"):
+        optimise_strategy_params(
+            data,
+            "Pairs Trading",
+            parameter_ranges,
+            ["AAA", "BBB"],
+            search_method="bayesian",
+            max_evaluations=0,
+        )
@@ -0,0 +1,272 @@
+"""
+Contains tests for checkpointing and resuming long optimisations.
+"""
+
+import datetime
+import math
+from collections.abc import Callable
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester import optimiser
+from quant_trading_strategy_backtester.anytime import Deadline
+from quant_trading_strategy_backtester.checkpoint import (
+    CHECKPOINT_TTL,
+    Checkpoint,
+    get_checkpoint_key,
+)
+from quant_trading_strategy_backtester.models import OptimisationCheckpointModel
+from quant_trading_strategy_backtester.optimiser import (
+    optimise_pairs_trading_tickers,
+    optimise_single_ticker_strategy_ticker,
+)
+
+
+def test_checkpoint_round_trip() -> None:
+    key = get_checkpoint_key(
+        "pairs_trading_tickers",
+        {"start_date": datetime.date(2020, 1, 1), "window": range(10, 30, 10)},
+    )
+    assert key == get_checkpoint_key(
+        "pairs_trading_tickers",
+        {"window": range(10, 30, 10), "start_date": datetime.date(2020, 1, 1)},
+    )
+    assert key != get_checkpoint_key(
+        "pairs_trading_tickers",
+        {"start_date": datetime.date(2020, 1, 2), "window": range(10, 30, 10)},
+    )
+
+    checkpoint = Checkpoint(key)
+    metrics = {"Total Return": 0.1, "Sharpe Ratio": math.nan, "Max Drawdown": -0.05}
+    checkpoint.add(("AAPL", "MSFT"), ({"window": 20}, metrics))
+    checkpoint.add(("AAPL", "AMZN"), None)
+    # Results are only written periodically, or when flushed.
+    assert Checkpoint(key).load() == {}
+    checkpoint.flush()
+
+    loaded = Checkpoint(key).load()
+    assert set(loaded) == {("AAPL", "MSFT"), ("AAPL", "AMZN")}
+    assert loaded[("AAPL", "AMZN")] is None
+    params, loaded_metrics = loaded[("AAPL", "MSFT")]
+    assert params == {"window": 20}
+    assert math.isnan(loaded_metrics["Sharpe Ratio"])
+    assert loaded_metrics["Max Drawdown"] == -0.05
+
+    checkpoint.delete()
+    assert Checkpoint(key).load() == {}
+
+
+def test_checkpoint_load_deletes_stale_checkpoints(mock_db_session) -> None:
+    metrics = {"Total Return": 0.1, "Sharpe Ratio": 1.5, "Max Drawdown": -0.05}
+    for key in ("stale", "fresh"):
+        checkpoint = Checkpoint(key)
+        checkpoint.add("AAPL", ({"window": 20}, metrics))
+        checkpoint.add("MSFT", None)
+        checkpoint.flush()
+    # The stale checkpoint was last written to before its time to live.
+    mock_db_session.query(OptimisationCheckpointModel).filter(
+        OptimisationCheckpointModel.checkpoint_key == "stale"
+    ).update(
+        {
+            "created_at": datetime.datetime.now()
+            - CHECKPOINT_TTL
+            - datetime.timedelta(hours=1)
+        }
+    )
+    mock_db_session.commit()
+
+    # Loading any checkpoint deletes the stale ones, and keeps the rest.
+    assert set(Checkpoint("other").load()) == set()
+    remaining_keys = {
+        key
+        for (key,) in mock_db_session.query(OptimisationCheckpointModel.checkpoint_key)
+    }
+    assert remaining_keys == {"fresh"}
+    assert set(Checkpoint("fresh").load()) == {"AAPL", "MSFT"}
+
+
+def test_optimise_pairs_trading_tickers_resumes_from_checkpoint(
+    monkeypatch,
+    sine_wave_data: Callable[..., pl.DataFrame],
+    sine_wave_closes: dict[str, pl.Series],
+) -> None:
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        lambda tickers, *args, **kwargs: pl.DataFrame(
+            {"Date": sine_wave_data()["Date"]}
+            | {ticker: sine_wave_closes[ticker] for ticker in tickers}
+        ),
+    )
+    optimised_pairs = []
+
+    def mock_optimise_strategy_params(
+        data, strategy_type, parameter_ranges, tickers, **kwargs
+    ):
+        # Interrupt the optimisation, as a Streamlit rerun would, on the
+        # fourth pair.
+        optimised_pairs.append(tuple(tickers))
+        if len(optimised_pairs) == 4:
+            raise RuntimeError("Interrupted")
+        return optimise_strategy_params(
+            data, strategy_type, parameter_ranges, tickers, **kwargs
+        )
+
+    optimise_strategy_params = optimiser.optimise_strategy_params
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.optimise_strategy_params",
+        mock_optimise_strategy_params,
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in sine_wave_closes]
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 12, 31)
+    strategy_params = {
+        "window": [10, 20, 30],
+        "entry_z_score": [1.0, 2.0],
+        "exit_z_score": 0.5,
+    }
+
+    with pytest.raises(RuntimeError, match="Interrupted"):
+        optimise_pairs_trading_tickers(
+            top_companies, start_date, end_date, strategy_params, True
+        )
+    # The three pairs evaluated before the interruption aren't evaluated again.
+    best_pair, best_params, best_metrics = optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, True
+    )
+    assert len(optimised_pairs) == 7
+    assert len(set(optimised_pairs)) == 6
+
+    expected_pair, expected_params, expected_metrics = optimise_pairs_trading_tickers(
+        top_companies,
+        start_date,
+        end_date,
+        strategy_params,
+        True,
+        use_checkpoint=False,
+    )
+    assert best_pair == expected_pair
+    assert best_params == expected_params
+    assert best_metrics == pytest.approx(expected_metrics)
+
+    # The checkpoint is deleted once every pair has been evaluated, so the
+    # next optimisation starts over.
+    optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, True
+    )
+    assert len(optimised_pairs) == 19
+
+
+def test_optimise_pairs_trading_tickers_redoes_pairs_stopped_early(
+    monkeypatch,
+    sine_wave_data: Callable[..., pl.DataFrame],
+    sine_wave_closes: dict[str, pl.Series],
+) -> None:
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        lambda tickers, *args, **kwargs: pl.DataFrame(
+            {"Date": sine_wave_data()["Date"]}
+            | {ticker: sine_wave_closes[ticker] for ticker in tickers}
+        ),
+    )
+    deadline = Deadline()
+    pair_coverages = []
+
+    def mock_optimise_strategy_params(
+        data, strategy_type, parameter_ranges, tickers, **kwargs
+    ):
+        # Cancel the optimisation, as a Streamlit rerun would, during the
+        # parameter search of the second pair.
+        if len(pair_coverages) == 1:
+            deadline.cancel()
+        result = optimise_strategy_params(
+            data, strategy_type, parameter_ranges, tickers, **kwargs
+        )
+        pair_coverages.append((tuple(tickers), kwargs["coverage"]))
+        return result
+
+    optimise_strategy_params = optimiser.optimise_strategy_params
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.optimise_strategy_params",
+        mock_optimise_strategy_params,
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in sine_wave_closes]
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 12, 31)
+    # More combinations than are evaluated before checking the deadline.
+    strategy_params = {
+        "window": range(5, 41),
+        "entry_z_score": [1.0, 2.0],
+        "exit_z_score": 0.5,
+    }
+    num_combinations = 36 * 2
+
+    optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, True, deadline=deadline
+    )
+    assert len(pair_coverages) == 2
+    stopped_pair, stopped_coverage = pair_coverages[1]
+    assert stopped_coverage.num_evaluated < num_combinations
+
+    # The pair stopped early isn't checkpointed, so its whole grid is searched
+    # on resuming, while the pair before it isn't evaluated again.
+    optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, True
+    )
+    resumed_coverages = dict(pair_coverages[2:])
+    assert len(resumed_coverages) == 5
+    assert pair_coverages[0][0] not in resumed_coverages
+    assert resumed_coverages[stopped_pair].num_evaluated == num_combinations
+
+
+def test_optimise_single_ticker_strategy_ticker_resumes_from_checkpoint(
+    monkeypatch,
+    sine_wave_data: Callable[..., pl.DataFrame],
+    sine_wave_closes: dict[str, pl.Series],
+) -> None:
+    closes = dict(sine_wave_closes)
+    loaded_tickers = []
+
+    def mock_iter_data(tickers, *args, **kwargs):
+        for ticker in tickers:
+            loaded_tickers.append(ticker)
+            if len(loaded_tickers) == 3:
+                raise RuntimeError("Interrupted")
+            yield ticker, sine_wave_data().with_columns(closes[ticker].alias("Close"))
+
+    backtested_tickers = []
+
+    def mock_run_backtest(data, strategy_type, strategy_params, ticker, **kwargs):
+        backtested_tickers.append(ticker)
+        return run_backtest(data, strategy_type, strategy_params, ticker, **kwargs)
+
+    run_backtest = optimiser.run_backtest
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.iter_yfinance_data_many_tickers",
+        mock_iter_data,
+    )
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.run_backtest", mock_run_backtest
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in closes]
+    args = (
+        top_companies,
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 12, 31),
+        "Mean Reversion",
+        {"window": 20, "std_dev": 1.0},
+    )
+
+    with pytest.raises(RuntimeError, match="Interrupted"):
+        optimise_single_ticker_strategy_ticker(*args)
+    assert backtested_tickers == ["AAPL", "GOOGL"]
+    # The last bar of GOOGL changes before the optimisation is resumed, e.g.
+    # as today's bar settles.
+    closes["GOOGL"] = closes["GOOGL"].clone().scatter(119, 150.0)
+
+    best_ticker = optimise_single_ticker_strategy_ticker(*args)
+    # Only the tickers that weren't evaluated, or whose prices changed, are
+    # evaluated again.
+    assert backtested_tickers[2:] == ["GOOGL", "MSFT", "AMZN"]
+    assert best_ticker == optimise_single_ticker_strategy_ticker(
+        *args, use_checkpoint=False
+    )
@@ -0,0 +1,102 @@
+"""
+Contains tests for the company metadata cache.
+"""
+
+import datetime
+
+import pytest
+from quant_trading_strategy_backtester.company_metadata import get_company_metadata
+from quant_trading_strategy_backtester.data import get_company_names
+from quant_trading_strategy_backtester.failed_tickers import get_failed_tickers
+from quant_trading_strategy_backtester.models import CompanyMetadataModel
+
+COMPANY_INFO = {
+    "GOOGL": {"quoteType": "EQUITY", "longName": "Alphabet Inc.", "marketCap": 2.0e12},
+    "GOOG": {"quoteType": "EQUITY", "longName": "Alphabet Inc.", "marketCap": 2.0e12},
+    "AAPL": {"quoteType": "EQUITY", "longName": "Apple Inc.", "marketCap": 3.0e12},
+    "NONAME": {"quoteType": "EQUITY", "trailingPegRatio": None},
+    # Yahoo Finance's info for a ticker it doesn't know.
+    "UNKNOWN": {"trailingPegRatio": None},
+}
+
+
+@pytest.fixture
+def info_requests(monkeypatch) -> list[str]:
+    requests = []
+
+    class MockTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        @property
+        def info(self):
+            requests.append(self.ticker)
+            if self.ticker not in COMPANY_INFO:
+                raise Exception("API Error")
+            return COMPANY_INFO[self.ticker]
+
+    monkeypatch.setattr("yfinance.Ticker", MockTicker)
+    return requests
+
+
+def test_get_company_metadata_caches_fields(info_requests: list[str]) -> None:
+    metadata = get_company_metadata(["AAPL", "NONAME", "ERROR"])
+    assert metadata == {
+        "AAPL": {"long_name": "Apple Inc.", "market_cap": 3.0e12},
+        "NONAME": {"long_name": None, "market_cap": None},
+    }
+    assert sorted(info_requests) == ["AAPL", "ERROR", "NONAME"]
+
+    # Fields that Yahoo Finance doesn't have are cached too, while tickers
+    # that failed are fetched again.
+    info_requests.clear()
+    assert get_company_metadata(["AAPL", "NONAME", "ERROR"], ["long_name"]) == {
+        "AAPL": {"long_name": "Apple Inc."},
+        "NONAME": {"long_name": None},
+    }
+    assert info_requests == ["ERROR"]
+
+    info_requests.clear()
+    get_company_metadata(["AAPL"], force_refresh=True)
+    assert info_requests == ["AAPL"]
+
+    with pytest.raises(ValueError, match="Unexpected metadata field"):
+        get_company_metadata(["AAPL"], ["sector"])
+
+
+def test_get_company_metadata_records_unknown_tickers(
+    info_requests: list[str],
+) -> None:
+    assert get_company_metadata(["NONAME", "UNKNOWN"], ["long_name"]) == {
+        "NONAME": {"long_name": None},
+        "UNKNOWN": {"long_name": None},
+    }
+    # A ticker without a name is still known to Yahoo Finance.
+    assert get_failed_tickers(["NONAME", "UNKNOWN"]) == {
+        "UNKNOWN": "No company info found"
+    }
+
+
+def test_get_company_metadata_refreshes_stale_fields(
+    info_requests: list[str], mock_db_session
+) -> None:
+    get_company_metadata(["AAPL", "GOOGL"])
+    # Make the AAPL market cap 2 days old, which is past its time to live.
+    row = mock_db_session.get(CompanyMetadataModel, "AAPL")
+    row.market_cap_updated_at -= datetime.timedelta(days=2)
+    mock_db_session.commit()
+
+    info_requests.clear()
+    get_company_metadata(["AAPL", "GOOGL"], ["long_name"])
+    assert info_requests == []
+    get_company_metadata(["AAPL", "GOOGL"], ["market_cap"])
+    assert info_requests == ["AAPL"]
+
+
+def test_get_company_names(info_requests: list[str]) -> None:
+    company_names = get_company_names(["GOOGL", "GOOG", "AAPL", "NONAME", "ERROR"])
+    assert company_names == {
+        "GOOGL": "alphabet inc.",
+        "GOOG": "alphabet inc.",
+        "AAPL": "apple inc.",
+    }
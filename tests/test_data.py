@@ -3,24 +3,50 @@ Contains tests for data fetching functions.
 """
 
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import polars as pl
 from quant_trading_strategy_backtester.data import (
+    fetch_yfinance_prices,
+    fetch_yfinance_prices_many,
     get_full_company_name,
+    get_pair_data,
     is_same_company,
+    iter_yfinance_data_many_tickers,
     load_yfinance_data_one_ticker,
+    load_yfinance_data_panel,
     load_yfinance_data_two_tickers,
 )
+from yfinance.exceptions import YFPricesMissingError, YFRateLimitError
+
+
+def mock_ticker_history(get_history):
+    """
+    Mocks yfinance.Ticker with a history method that calls get_history with
+    the ticker and the keyword arguments.
+    """
+
+    class MockTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, **kwargs):
+            return get_history(self.ticker, **kwargs)
+
+    return MockTicker
 
 
 def test_load_yfinance_data_one_ticker(
     monkeypatch, mock_yfinance_data: pd.DataFrame
 ) -> None:
-    def mock_download(*args, **kwargs):
-        return mock_yfinance_data.set_index("Date")
-
-    monkeypatch.setattr("yfinance.download", mock_download)
+    monkeypatch.setattr(
+        "yfinance.Ticker",
+        mock_ticker_history(
+            lambda *args, **kwargs: mock_yfinance_data.set_index("Date")
+        ),
+    )
 
     data = load_yfinance_data_one_ticker(
         "AAPL", datetime.date(2020, 1, 1), datetime.date(2020, 1, 31)
@@ -35,10 +61,12 @@ def test_load_yfinance_data_one_ticker(
 def test_load_yfinance_data_two_tickers(
     monkeypatch, mock_yfinance_data: pd.DataFrame
 ) -> None:
-    def mock_download(*args, **kwargs):
-        return mock_yfinance_data.set_index("Date")
-
-    monkeypatch.setattr("yfinance.download", mock_download)
+    monkeypatch.setattr(
+        "yfinance.Ticker",
+        mock_ticker_history(
+            lambda *args, **kwargs: mock_yfinance_data.set_index("Date")
+        ),
+    )
 
     data = load_yfinance_data_two_tickers(
         "AAPL", "MSFT", datetime.date(2020, 1, 1), datetime.date(2020, 1, 31)
@@ -51,6 +79,146 @@ def test_load_yfinance_data_two_tickers(
     assert len(data) == 31
 
 
+def test_load_yfinance_data_panel(
+    monkeypatch, yfinance_downloads: list[list[str]]
+) -> None:
+    downloads = []
+
+    def get_history(ticker, **kwargs):
+        downloads.append(ticker)
+        # Yahoo Finance gives the dates in the exchange's time zone.
+        dates = pd.date_range(start="1/1/2020", end="1/10/2020", tz="America/New_York")
+        # MSFT only starts trading on the third day.
+        if ticker == "MSFT":
+            dates = dates[2:]
+        return pd.DataFrame(
+            {"Close": [float(len(ticker))] * len(dates)},
+            index=pd.Index(dates, name="Date"),
+        )
+
+    monkeypatch.setattr("yfinance.Ticker", mock_ticker_history(get_history))
+
+    tickers = ["AAPL", "MSFT", "GOOGL"]
+    panel = load_yfinance_data_panel(
+        tickers, datetime.date(2020, 1, 1), datetime.date(2020, 1, 10)
+    )
+    assert panel.columns == ["Date", *tickers]
+    assert len(panel) == 10
+    assert panel["Date"].dt.hour().to_list() == [0] * 10
+    assert panel["MSFT"].null_count() == 2
+    # Each ticker is downloaded once, however many pairs it's in, in one
+    # batched download.
+    assert sorted(downloads) == sorted(tickers)
+    assert len(yfinance_downloads) == 1
+
+    pair_data = get_pair_data(panel, "AAPL", "MSFT")
+    assert pair_data.columns == ["Date", "Close_1", "Close_2"]
+    assert len(pair_data) == 8
+    assert pair_data["Close_1"].to_list() == [4.0] * 8
+    assert pair_data["Close_2"].to_list() == [4.0] * 8
+    assert get_pair_data(panel, "AAPL", "AMZN").is_empty()
+
+
+def test_iter_yfinance_data_many_tickers(
+    monkeypatch, yfinance_downloads: list[list[str]]
+) -> None:
+    requests = []
+
+    def get_history(ticker, **kwargs):
+        requests.append(ticker)
+        if ticker in ("MSFT", "AMZN", "NVDA"):
+            raise YFPricesMissingError(ticker, "")
+        dates = pd.date_range(start="1/1/2020", end="1/10/2020")
+        return pd.DataFrame(
+            {
+                "Close": [float(i) for i in range(len(dates))],
+                "Volume": [float(i) for i in range(len(dates))],
+            },
+            index=pd.Index(dates, name="Date"),
+        )
+
+    monkeypatch.setattr("yfinance.Ticker", mock_ticker_history(get_history))
+
+    tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA"]
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 1, 10)
+    data = list(
+        iter_yfinance_data_many_tickers(tickers, start_date, end_date, chunk_size=2)
+    )
+    assert [ticker for ticker, _ in data] == tickers
+    # The tickers without prices in a batched download are requested again
+    # on their own, to find out why.
+    assert sorted(requests) == sorted([*tickers, "MSFT", "AMZN", "NVDA"])
+    # Each chunk of tickers is fetched with one batched download.
+    assert yfinance_downloads == [["AAPL", "MSFT"], ["GOOGL", "AMZN"], ["NVDA"]]
+    for ticker, ticker_data in data:
+        if ticker in ("MSFT", "AMZN", "NVDA"):
+            assert ticker_data.is_empty()
+        else:
+            assert ticker_data.columns == ["Date", "Close", "Volume"]
+            assert ticker_data["Close"].to_list() == [float(i) for i in range(10)]
+
+    # Every ticker is loaded from the price store from then on, including
+    # those without prices in the date range.
+    requests.clear()
+    list(iter_yfinance_data_many_tickers(tickers, start_date, end_date))
+    assert requests == []
+
+
+def test_fetch_yfinance_prices_many_retries_rate_limited_tickers(
+    monkeypatch, yfinance_downloads: list[list[str]]
+) -> None:
+    requests = []
+
+    def get_history(ticker, **kwargs):
+        requests.append(ticker)
+        if requests.count(ticker) <= 2 and ticker == "MSFT":
+            raise YFRateLimitError()
+        dates = pd.date_range(start="1/1/2020", end="1/10/2020")
+        return pd.DataFrame(
+            {"Close": [1.0] * len(dates)}, index=pd.Index(dates, name="Date")
+        )
+
+    monkeypatch.setattr("yfinance.Ticker", mock_ticker_history(get_history))
+
+    data_by_ticker = fetch_yfinance_prices_many(
+        ["AAPL", "MSFT"], datetime.date(2020, 1, 1), datetime.date(2020, 1, 10)
+    )
+    assert sorted(data_by_ticker) == ["AAPL", "MSFT"]
+    assert all(len(data) == 10 for data in data_by_ticker.values())
+    # A ticker that Yahoo Finance throttles in the batched download is
+    # requested again on its own, and retried until it isn't throttled.
+    assert yfinance_downloads == [["AAPL", "MSFT"]]
+    assert requests == ["AAPL", "MSFT", "MSFT", "MSFT"]
+
+
+def test_fetch_yfinance_prices_coalesces_concurrent_requests(monkeypatch) -> None:
+    requests = []
+
+    def get_history(ticker, **kwargs):
+        requests.append(ticker)
+        time.sleep(0.2)
+        dates = pd.date_range(start="1/1/2020", end="1/10/2020")
+        return pd.DataFrame(
+            {"Close": [1.0] * len(dates)}, index=pd.Index(dates, name="Date")
+        )
+
+    monkeypatch.setattr("yfinance.Ticker", mock_ticker_history(get_history))
+
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 1, 10)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda _: fetch_yfinance_prices("AAPL", start_date, end_date),
+                range(4),
+            )
+        )
+    # Concurrent sessions share one download.
+    assert requests == ["AAPL"]
+    assert all(result.equals(results[0]) for result in results)
+
+
 def test_get_full_company_name_success(monkeypatch):
     def mock_ticker_info(*args, **kwargs):
         class MockTicker:
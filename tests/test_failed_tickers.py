@@ -0,0 +1,117 @@
+"""
+Contains tests for the negative cache of failed tickers.
+"""
+
+import datetime
+
+import pandas as pd
+import pytest
+from quant_trading_strategy_backtester.company_metadata import get_company_metadata
+from quant_trading_strategy_backtester.data import (
+    fetch_yfinance_prices,
+    fetch_yfinance_prices_many,
+)
+from quant_trading_strategy_backtester.failed_tickers import (
+    get_failed_tickers,
+    normalise_ticker,
+    record_failed_tickers,
+)
+from quant_trading_strategy_backtester.models import (
+    CompanyMetadataModel,
+    FailedTickerModel,
+)
+from yfinance.exceptions import YFTzMissingError
+
+
+@pytest.fixture
+def history_requests(monkeypatch, yfinance_downloads: list[list[str]]) -> list[str]:
+    requests = []
+
+    class MockTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, **kwargs):
+            requests.append(self.ticker)
+            if self.ticker == "DEAD":
+                raise YFTzMissingError(self.ticker)
+            dates = pd.date_range(start="1/1/2020", end="1/10/2020")
+            return pd.DataFrame(
+                {"Close": [1.0] * len(dates)}, index=pd.Index(dates, name="Date")
+            )
+
+        @property
+        def info(self):
+            requests.append(self.ticker)
+            # Yahoo Finance's info for a ticker it doesn't know isn't empty.
+            if self.ticker == "DEAD":
+                return {"trailingPegRatio": None}
+            return {"quoteType": "EQUITY", "marketCap": 1.0e12}
+
+    monkeypatch.setattr("yfinance.Ticker", MockTicker)
+    return requests
+
+
+@pytest.mark.parametrize(
+    "ticker,expected_ticker",
+    [("AAPL", "AAPL"), ("BRK.B", "BRK-B"), (" bf.b ", "BF-B"), ("BRK-B", "BRK-B")],
+)
+def test_normalise_ticker(ticker: str, expected_ticker: str) -> None:
+    assert normalise_ticker(ticker) == expected_ticker
+
+
+def test_failed_tickers_expire(mock_db_session) -> None:
+    record_failed_tickers({"DEAD": "Delisted", "GONE": "Delisted"})
+    assert get_failed_tickers(["AAPL", "DEAD", "GONE"]) == {
+        "DEAD": "Delisted",
+        "GONE": "Delisted",
+    }
+
+    # Recording a ticker again replaces its reason.
+    record_failed_tickers({"DEAD": "Not found"})
+    assert get_failed_tickers(["DEAD"]) == {"DEAD": "Not found"}
+
+    row = mock_db_session.get(FailedTickerModel, "GONE")
+    row.failed_at -= datetime.timedelta(days=8)
+    mock_db_session.commit()
+    assert get_failed_tickers(["DEAD", "GONE"]) == {"DEAD": "Not found"}
+
+
+def test_fetch_yfinance_prices_skips_failed_tickers(
+    history_requests: list[str],
+) -> None:
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 1, 10)
+
+    data_by_ticker = fetch_yfinance_prices_many(["AAPL", "DEAD"], start_date, end_date)
+    assert list(data_by_ticker) == ["AAPL"]
+    assert sorted(history_requests) == ["AAPL", "DEAD", "DEAD"]
+    assert "DEAD" in get_failed_tickers(["DEAD"])
+
+    # The failed ticker is skipped without a request from then on.
+    history_requests.clear()
+    fetch_yfinance_prices_many(["AAPL", "DEAD"], start_date, end_date)
+    with pytest.raises(ValueError, match="Skipped DEAD"):
+        fetch_yfinance_prices("DEAD", start_date, end_date)
+    assert history_requests == ["AAPL"]
+
+
+def test_get_company_metadata_skips_failed_tickers(
+    history_requests: list[str], mock_db_session
+) -> None:
+    assert get_company_metadata(["AAPL", "DEAD"], ["market_cap"]) == {
+        "AAPL": {"market_cap": 1.0e12},
+        "DEAD": {"market_cap": None},
+    }
+    assert get_failed_tickers(["AAPL", "DEAD"]) == {"DEAD": "No company info found"}
+
+    # The failed ticker isn't refreshed when its fields are stale, unless
+    # every ticker is refreshed.
+    row = mock_db_session.get(CompanyMetadataModel, "DEAD")
+    row.market_cap_updated_at -= datetime.timedelta(days=2)
+    mock_db_session.commit()
+    history_requests.clear()
+    get_company_metadata(["AAPL", "DEAD"], ["market_cap"])
+    assert history_requests == []
+    get_company_metadata(["DEAD"], force_refresh=True)
+    assert history_requests == ["DEAD"]
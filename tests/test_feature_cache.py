@@ -0,0 +1,101 @@
+"""
+Contains tests for the rolling feature cache.
+"""
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.feature_cache import (
+    RollingFeature,
+    RollingFeatureCache,
+    get_data_fingerprint,
+)
+from quant_trading_strategy_backtester.grid_backtester import backtest_strategies
+from quant_trading_strategy_backtester.strategies.mean_reversion import (
+    MeanReversionStrategy,
+)
+
+
+def test_rolling_feature_expr(mock_polars_data: pl.DataFrame) -> None:
+    feature = RollingFeature("Close", "mean", 5)
+    column = mock_polars_data.select(feature.expr()).to_series()
+
+    assert column.name == "Close_rolling_mean_5"
+    assert column.equals(
+        mock_polars_data["Close"]
+        .rolling_mean(window_size=5, min_samples=5)
+        .alias(feature.name)
+    )
+
+    with pytest.raises(ValueError, match="Unexpected rolling statistic"):
+        RollingFeature("Close", "median", 5).expr()
+
+
+def test_get_data_fingerprint(mock_polars_data: pl.DataFrame) -> None:
+    assert get_data_fingerprint(mock_polars_data) == get_data_fingerprint(
+        mock_polars_data.clone()
+    )
+    assert get_data_fingerprint(mock_polars_data) != get_data_fingerprint(
+        mock_polars_data.with_columns(pl.col("Close") + 1)
+    )
+
+
+def test_rolling_feature_cache_computes_each_feature_once(
+    mock_polars_data: pl.DataFrame,
+) -> None:
+    cache = RollingFeatureCache()
+    features = [
+        RollingFeature("Close", "mean", 5),
+        RollingFeature("Close", "std", 5),
+        RollingFeature("Close", "mean", 5),
+    ]
+
+    columns = cache.get_features(mock_polars_data, features)
+    assert [column.name for column in columns] == [f.name for f in features]
+    assert cache.misses == 2
+
+    cache.get_features(mock_polars_data, features[:2])
+    assert cache.misses == 2
+    assert cache.hits == 2
+
+
+def test_rolling_feature_cache_evicts_least_recently_used(
+    mock_polars_data: pl.DataFrame,
+) -> None:
+    column_size = (
+        mock_polars_data.select(RollingFeature("Close", "mean", 5).expr())
+        .to_series()
+        .estimated_size()
+    )
+    cache = RollingFeatureCache(max_bytes=2 * column_size)
+    mean_5, mean_10, mean_15 = (RollingFeature("Close", "mean", w) for w in (5, 10, 15))
+
+    cache.get_features(mock_polars_data, [mean_5, mean_10])
+    # Use the 5-day mean again so the 10-day mean is the least recently used.
+    cache.get_features(mock_polars_data, [mean_5])
+    cache.get_features(mock_polars_data, [mean_15])
+    assert cache.size_bytes <= cache.max_bytes
+
+    misses = cache.misses
+    cache.get_features(mock_polars_data, [mean_5, mean_15])
+    assert cache.misses == misses
+    cache.get_features(mock_polars_data, [mean_10])
+    assert cache.misses == misses + 1
+
+
+def test_backtest_strategies_shares_rolling_windows(
+    mock_polars_data: pl.DataFrame,
+) -> None:
+    cache = RollingFeatureCache()
+    strategies = [
+        MeanReversionStrategy({"window": window, "std_dev": std_dev})
+        for window in (5, 10, 15)
+        for std_dev in (0.5, 1.0, 2.0)
+    ]
+
+    backtest_strategies(mock_polars_data, strategies, feature_cache=cache)
+    # One rolling mean and standard deviation per distinct window rather than
+    # per strategy.
+    assert cache.misses == 6
+
+    backtest_strategies(mock_polars_data, strategies, feature_cache=cache)
+    assert cache.misses == 6
@@ -0,0 +1,291 @@
+"""
+Contains tests for the async fetch layer, against a local stub server.
+"""
+
+import asyncio
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from quant_trading_strategy_backtester.fetching import (
+    AsyncFetcher,
+    RateLimiter,
+    get_backoff_delay,
+)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Serves /ok, /slow?delay=<seconds> and /flaky?failures=<count>, which
+    responds with 503 until it's been requested the given number of times.
+    Records the time and path of each request and the most requests that
+    were in flight at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubRequestHandler)
+        self.lock = threading.Lock()
+        self.requests: list[tuple[float, str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), url.path))
+            num_requests = sum(path == url.path for _, path in self.server.requests)
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        try:
+            if url.path == "/slow":
+                time.sleep(float(query["delay"]))
+            if url.path == "/flaky" and num_requests <= int(query["failures"]):
+                self.send_response(503)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"ok")
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubServer]:
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(url: str) -> str:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read().decode()
+
+
+def make_fetcher(**kwargs) -> AsyncFetcher:
+    return AsyncFetcher(**{"backoff_base": 0.01} | kwargs)
+
+
+def test_fetch_many_limits_concurrency(stub_server: StubServer) -> None:
+    fetcher = make_fetcher(max_concurrency=3)
+    try:
+        results = fetcher.fetch_many_sync(
+            get, [(f"{stub_server.url}/slow?delay=0.1&i={i}",) for i in range(12)]
+        )
+    finally:
+        fetcher.close()
+
+    assert results == ["ok"] * 12
+    assert stub_server.max_in_flight == 3
+
+
+def test_fetch_limits_request_rate(stub_server: StubServer) -> None:
+    fetcher = make_fetcher(requests_per_second=20)
+    try:
+        fetcher.fetch_many_sync(
+            get, [(f"{stub_server.url}/ok?i={i}",) for i in range(6)]
+        )
+    finally:
+        fetcher.close()
+
+    request_times = sorted(request_time for request_time, _ in stub_server.requests)
+    # The requests start at least 0.05 seconds apart, with a little slack for
+    # the time they take to reach the server.
+    assert request_times[-1] - request_times[0] >= 5 * 0.05 - 0.02
+
+
+def test_fetch_counts_each_request_of_a_call_towards_the_rate(
+    stub_server: StubServer,
+) -> None:
+    def get_many(urls: tuple[str, ...]) -> list[str]:
+        return [get(url) for url in urls]
+
+    fetcher = make_fetcher(requests_per_second=20)
+    try:
+        fetcher.fetch_sync(
+            get_many,
+            tuple(f"{stub_server.url}/ok?i={i}" for i in range(4)),
+            num_requests=4,
+        )
+        fetcher.fetch_sync(get, f"{stub_server.url}/ok?i=4")
+    finally:
+        fetcher.close()
+
+    request_times = sorted(request_time for request_time, _ in stub_server.requests)
+    # The call after one making four requests waits for all four of their
+    # slots, with a little slack for the time they take to reach the server.
+    assert request_times[-1] - request_times[0] >= 4 * 0.05 - 0.02
+
+
+def test_fetch_retries_failed_requests(stub_server: StubServer) -> None:
+    fetcher = make_fetcher(max_retries=3)
+    try:
+        assert fetcher.fetch_sync(get, f"{stub_server.url}/flaky?failures=2") == "ok"
+        assert len(stub_server.requests) == 3
+
+        # The error from the last attempt is raised once the retries run out.
+        stub_server.requests.clear()
+        with pytest.raises(urllib.error.HTTPError, match="503"):
+            fetcher.fetch_sync(get, f"{stub_server.url}/flaky?failures=5")
+        assert len(stub_server.requests) == 4
+    finally:
+        fetcher.close()
+
+
+def test_fetch_does_not_retry_other_errors() -> None:
+    attempts = []
+
+    def fail() -> None:
+        attempts.append(1)
+        raise ValueError("Bad response")
+
+    fetcher = make_fetcher(max_retries=3)
+    try:
+        with pytest.raises(ValueError, match="Bad response"):
+            fetcher.fetch_sync(fail)
+    finally:
+        fetcher.close()
+    assert len(attempts) == 1
+
+
+def test_fetch_times_out_slow_requests(stub_server: StubServer) -> None:
+    fetcher = make_fetcher(timeout=0.1, max_retries=1)
+    try:
+        start_time = time.monotonic()
+        results = fetcher.fetch_many_sync(
+            get,
+            [(f"{stub_server.url}/slow?delay=1",), (f"{stub_server.url}/ok",)],
+        )
+        duration = time.monotonic() - start_time
+    finally:
+        # Closing waits for the abandoned requests to finish.
+        fetcher.close()
+
+    # A request that times out doesn't hold up the others.
+    assert isinstance(results[0], TimeoutError)
+    assert results[1] == "ok"
+    assert duration < 1
+    assert [path for _, path in stub_server.requests].count("/slow") == 2
+
+
+def test_fetch_from_event_loop(stub_server: StubServer) -> None:
+    fetcher = make_fetcher()
+
+    async def fetch_async(url: str) -> str:
+        return await asyncio.to_thread(get, url)
+
+    async def main() -> tuple[str, list[str]]:
+        return (
+            await fetcher.fetch(get, f"{stub_server.url}/ok"),
+            await fetcher.fetch_many(fetch_async, [(f"{stub_server.url}/ok",)] * 2),
+        )
+
+    try:
+        assert asyncio.run(main()) == ("ok", ["ok", "ok"])
+    finally:
+        fetcher.close()
+
+
+def test_fetch_coalesces_identical_requests() -> None:
+    requests = []
+
+    def fetch_prices(ticker: str) -> list[float]:
+        requests.append(ticker)
+        time.sleep(0.2)
+        if ticker == "DEAD":
+            raise ValueError("Ticker not found")
+        return [1.0, 2.0]
+
+    fetcher = make_fetcher()
+    try:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            aapl = executor.submit(fetcher.fetch_sync, fetch_prices, "AAPL")
+            many = executor.submit(
+                fetcher.fetch_many_sync,
+                fetch_prices,
+                [("AAPL",), ("MSFT",), ("DEAD",)],
+            )
+            dead = executor.submit(fetcher.fetch_sync, fetch_prices, "DEAD")
+
+            # The callers share the result of one request for each ticker.
+            assert many.result()[0] is aapl.result()
+            assert isinstance(many.result()[2], ValueError)
+            with pytest.raises(ValueError, match="Ticker not found"):
+                dead.result()
+        assert sorted(requests) == ["AAPL", "DEAD", "MSFT"]
+
+        # A request that's finished is made again.
+        fetcher.fetch_sync(fetch_prices, "AAPL")
+        assert requests.count("AAPL") == 2
+    finally:
+        fetcher.close()
+
+
+@pytest.mark.parametrize("attempt,expected_maximum", [(0, 0.5), (2, 2.0), (10, 5.0)])
+def test_get_backoff_delay(attempt: int, expected_maximum: float) -> None:
+    delays = [get_backoff_delay(attempt, 0.5, 5.0) for _ in range(100)]
+    assert all(0 <= delay <= expected_maximum for delay in delays)
+    # The delays are jittered.
+    assert len(set(delays)) > 1
+
+
+def test_invalid_limits() -> None:
+    with pytest.raises(ValueError, match="Invalid max concurrency"):
+        AsyncFetcher(max_concurrency=0)
+    with pytest.raises(ValueError, match="Invalid requests per second"):
+        RateLimiter(0)
+
+
+def test_fetch_holds_slots_until_timed_out_calls_finish() -> None:
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def slow_fetch(i: int) -> int:
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        try:
+            time.sleep(0.2)
+            return i
+        finally:
+            with lock:
+                in_flight -= 1
+
+    fetcher = make_fetcher(max_concurrency=2, timeout=0.05, max_retries=1)
+    try:
+        results = fetcher.fetch_many_sync(slow_fetch, [(i,) for i in range(4)])
+    finally:
+        fetcher.close()
+
+    # Calls abandoned on timeout keep running in their threads, so retries
+    # wait for them to finish rather than going over the limit.
+    assert all(isinstance(result, TimeoutError) for result in results)
+    assert max_in_flight <= 2
@@ -0,0 +1,415 @@
+"""
+Contains tests for the vectorised grid backtesting engine.
+"""
+
+import datetime
+import itertools
+import math
+from typing import Any
+
+import numpy as np
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.data import get_pair_data
+from quant_trading_strategy_backtester.grid_backtester import (
+    backtest_strategies,
+    backtest_ticker_pairs,
+    get_rolling_means_matrix,
+    rank_buy_and_hold_tickers,
+)
+from quant_trading_strategy_backtester.grid_results import TickerRanking
+from quant_trading_strategy_backtester.optimiser import (
+    create_strategy,
+    optimise_buy_and_hold_ticker,
+    optimise_strategy_params,
+    run_backtest,
+)
+
+
+@pytest.fixture
+def trending_polars_data() -> pl.DataFrame:
+    dates = [datetime.date(2020, 1, 1) + datetime.timedelta(days=i) for i in range(120)]
+    close_1 = [100 + 10 * math.sin(i / 7) + i * 0.1 for i in range(120)]
+    close_2 = [100 + 8 * math.sin(i / 9) + i * 0.05 for i in range(120)]
+    return pl.DataFrame(
+        {
+            "Date": dates,
+            "Close": close_1,
+            "Close_1": close_1,
+            "Close_2": close_2,
+        }
+    )
+
+
+GRIDS = [
+    (
+        "Moving Average Crossover",
+        {"short_window": range(5, 21, 5), "long_window": range(20, 61, 20)},
+    ),
+    ("Mean Reversion", {"window": range(5, 31, 5), "std_dev": [0.5, 1.0, 2.0]}),
+    (
+        "Pairs Trading",
+        {
+            "window": range(10, 31, 10),
+            "entry_z_score": [1.0, 2.0],
+            "exit_z_score": [0.1, 0.5],
+        },
+    ),
+]
+
+
+def get_combinations(parameter_ranges: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        dict(zip(parameter_ranges.keys(), params))
+        for params in itertools.product(*parameter_ranges.values())
+    ]
+
+
+@pytest.mark.parametrize("strategy_type,parameter_ranges", GRIDS)
+def test_backtest_strategies_matches_backtester(
+    trending_polars_data: pl.DataFrame,
+    strategy_type: str,
+    parameter_ranges: dict[str, Any],
+) -> None:
+    data = trending_polars_data
+    if strategy_type == "Pairs Trading":
+        data = data.drop("Close")
+    combinations = get_combinations(parameter_ranges)
+
+    grid_metrics = backtest_strategies(
+        data, [create_strategy(strategy_type, params) for params in combinations]
+    )
+
+    assert len(grid_metrics) == len(combinations)
+    for params, metrics in zip(combinations, grid_metrics.iter_rows(named=True)):
+        _, expected_metrics = run_backtest(
+            data, strategy_type, params, "AAPL", persist=False
+        )
+        for name, value in expected_metrics.items():
+            assert metrics[name] == pytest.approx(value, nan_ok=True)
+
+
+@pytest.mark.parametrize("strategy_type,parameter_ranges", GRIDS)
+def test_optimise_strategy_params_picks_best_combination(
+    trending_polars_data: pl.DataFrame,
+    strategy_type: str,
+    parameter_ranges: dict[str, Any],
+) -> None:
+    data = trending_polars_data
+    if strategy_type == "Pairs Trading":
+        data = data.drop("Close")
+
+    best_params, best_metrics = optimise_strategy_params(
+        data, strategy_type, parameter_ranges, "AAPL"
+    )
+
+    sharpe_ratios = [
+        run_backtest(data, strategy_type, params, "AAPL", persist=False)[1][
+            "Sharpe Ratio"
+        ]
+        for params in get_combinations(parameter_ranges)
+    ]
+    assert best_metrics["Sharpe Ratio"] == pytest.approx(
+        max(sharpe for sharpe in sharpe_ratios if not math.isnan(sharpe))
+    )
+    _, expected_metrics = run_backtest(
+        data, strategy_type, best_params, "AAPL", persist=False
+    )
+    assert best_metrics["Sharpe Ratio"] == pytest.approx(
+        expected_metrics["Sharpe Ratio"]
+    )
+
+
+def test_backtest_strategies_with_empty_data() -> None:
+    strategy = create_strategy("Mean Reversion", {"window": 5, "std_dev": 2.0})
+    with pytest.raises(ValueError, match="No data available"):
+        backtest_strategies(
+            pl.DataFrame(schema=[("Date", pl.Date), ("Close", pl.Float64)]),
+            [strategy],
+        )
+
+
+def test_rank_buy_and_hold_tickers_matches_backtester(
+    trending_polars_data: pl.DataFrame,
+) -> None:
+    data_by_ticker = {
+        "AAPL": trending_polars_data.select("Date", "Close"),
+        "MSFT": trending_polars_data.select("Date", pl.col("Close_2").alias("Close")),
+        # A ticker that started trading part way through the date range.
+        "NVDA": trending_polars_data.select(
+            "Date", (200 - pl.col("Close")).alias("Close")
+        ).slice(40),
+        "AMZN": pl.DataFrame(schema=[("Date", pl.Date), ("Close", pl.Float64)]),
+    }
+
+    ranking = rank_buy_and_hold_tickers(data_by_ticker)
+
+    assert ranking["Total Return"].is_sorted(descending=True)
+    assert set(ranking["Ticker"]) == {"AAPL", "MSFT", "NVDA"}
+    for metrics in ranking.iter_rows(named=True):
+        _, expected_metrics = run_backtest(
+            data_by_ticker[metrics["Ticker"]],
+            "Buy and Hold",
+            {},
+            metrics["Ticker"],
+            persist=False,
+        )
+        for name, value in expected_metrics.items():
+            assert metrics[name] == pytest.approx(value, nan_ok=True)
+
+
+def test_optimise_buy_and_hold_ticker_matches_backtester(
+    monkeypatch, trending_polars_data: pl.DataFrame
+) -> None:
+    closes = {
+        "AAPL": pl.col("Close"),
+        "MSFT": pl.col("Close_2"),
+        "NVDA": 200 - pl.col("Close"),
+    }
+
+    def mock_iter_data(tickers, *args, **kwargs):
+        for ticker in tickers:
+            yield (
+                ticker,
+                trending_polars_data.select("Date", closes[ticker].alias("Close")),
+            )
+
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.iter_yfinance_data_many_tickers",
+        mock_iter_data,
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in closes]
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 12, 31)
+
+    # Saving every backtest runs a Backtester for each ticker.
+    expected = optimise_buy_and_hold_ticker(
+        top_companies, start_date, end_date, persist="all"
+    )
+    best_ticker, params, metrics = optimise_buy_and_hold_ticker(
+        top_companies, start_date, end_date
+    )
+
+    assert best_ticker == expected[0]
+    assert params == expected[1]
+    assert metrics == pytest.approx(expected[2])
+
+
+@pytest.mark.parametrize("persist", ["none", "all"])
+def test_optimise_buy_and_hold_ticker_ranks_every_ticker(
+    monkeypatch, trending_polars_data: pl.DataFrame, persist: str
+) -> None:
+    closes = {
+        "AAPL": pl.col("Close"),
+        "MSFT": pl.col("Close_2"),
+        "NVDA": 200 - pl.col("Close"),
+    }
+
+    def mock_iter_data(tickers, *args, **kwargs):
+        for ticker in tickers:
+            yield (
+                ticker,
+                trending_polars_data.select("Date", closes[ticker].alias("Close")),
+            )
+
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.iter_yfinance_data_many_tickers",
+        mock_iter_data,
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in closes]
+    data_by_ticker = dict(mock_iter_data(closes))
+
+    ranking = TickerRanking()
+    best_ticker, _, metrics = optimise_buy_and_hold_ticker(
+        top_companies,
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 12, 31),
+        persist=persist,
+        ranking=ranking,
+    )
+
+    table = ranking.to_frame()
+    expected = rank_buy_and_hold_tickers(data_by_ticker)
+    assert table["Ticker"].to_list() == expected["Ticker"].to_list()
+    assert table["Ticker"][0] == best_ticker
+    assert table.row(0, named=True)["Total Return"] == pytest.approx(
+        metrics["Total Return"]
+    )
+    for name in ["Total Return", "Sharpe Ratio", "Max Drawdown"]:
+        assert table[name].to_list() == pytest.approx(
+            expected[name].to_list(), nan_ok=True
+        )
+
+
+@pytest.mark.parametrize(
+    "strategy_params",
+    [
+        {"window": 20, "entry_z_score": 1.5, "exit_z_score": 0.5},
+        {"window": 5, "entry_z_score": 1.0, "exit_z_score": 0.1},
+    ],
+)
+@pytest.mark.parametrize("memory_budget", [2**30, 1])
+def test_backtest_ticker_pairs_matches_backtester(
+    strategy_params: dict[str, Any], memory_budget: int
+) -> None:
+    rng = np.random.default_rng(1)
+    num_dates = 200
+    base = 100 + np.cumsum(rng.normal(size=num_dates))
+    closes = {
+        "AAPL": base,
+        "MSFT": 2 * base + 5 + 3 * rng.normal(size=num_dates),
+        "GOOGL": 50 + np.cumsum(rng.normal(size=num_dates)),
+        "NVDA": base + rng.normal(size=num_dates),
+    }
+    # GOOGL only starts trading on the 31st day, and NVDA has a gap.
+    closes["GOOGL"][:30] = np.nan
+    closes["NVDA"][100:110] = np.nan
+    panel = pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                for i in range(num_dates)
+            ]
+        }
+        | closes
+    ).fill_nan(None)
+    ticker_pairs = list(itertools.combinations(closes, 2))
+
+    pair_metrics = backtest_ticker_pairs(
+        panel, [*ticker_pairs, ("AAPL", "AMZN")], strategy_params, memory_budget
+    )
+
+    # Pairs with a ticker missing from the panel are left out.
+    assert pair_metrics.select("Ticker 1", "Ticker 2").rows() == ticker_pairs
+    for metrics in pair_metrics.iter_rows(named=True):
+        data = get_pair_data(panel, metrics["Ticker 1"], metrics["Ticker 2"])
+        _, expected_metrics = run_backtest(
+            data, "Pairs Trading", strategy_params, "AAPL", persist=False
+        )
+        for name, value in expected_metrics.items():
+            assert metrics[name] == pytest.approx(value, nan_ok=True)
+
+
+def test_backtest_strategies_sweeps_pairs_trading_thresholds() -> None:
+    rng = np.random.default_rng(0)
+    num_dates = 300
+    base = 100 + np.cumsum(rng.normal(size=num_dates))
+    data = pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                for i in range(num_dates)
+            ],
+            "Close_1": base,
+            "Close_2": 0.5 * base + 40 + rng.normal(size=num_dates),
+        }
+    )
+    # The windows are interleaved, so the sweep has to put the metrics of
+    # each window's thresholds back in the order given.
+    combinations = [
+        {"window": window, "entry_z_score": entry_z_score, "exit_z_score": 0.5}
+        for entry_z_score, window in itertools.product([1.0, 2.0, 3.0], [10, 40])
+    ]
+
+    grid_metrics = backtest_strategies(
+        data, [create_strategy("Pairs Trading", params) for params in combinations]
+    )
+
+    for params, metrics in zip(combinations, grid_metrics.iter_rows(named=True)):
+        _, expected_metrics = run_backtest(
+            data, "Pairs Trading", params, "AAPL", persist=False
+        )
+        for name, value in expected_metrics.items():
+            assert metrics[name] == pytest.approx(value, nan_ok=True)
+
+
+def test_backtest_strategies_sweeps_mean_reversion_bands() -> None:
+    rng = np.random.default_rng(0)
+    num_dates = 300
+    close = 100 + np.cumsum(rng.normal(size=num_dates))
+    # The price is flat for a while, so its rolling standard deviation is 0.
+    close[100:130] = close[100]
+    data = pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                for i in range(num_dates)
+            ],
+            "Close": close,
+        }
+    )
+    combinations = [
+        {"window": window, "std_dev": std_dev}
+        for std_dev, window in itertools.product([0.5, 1.5, 3.0], [5, 20])
+    ]
+
+    grid_metrics = backtest_strategies(
+        data, [create_strategy("Mean Reversion", params) for params in combinations]
+    )
+
+    for params, metrics in zip(combinations, grid_metrics.iter_rows(named=True)):
+        _, expected_metrics = run_backtest(
+            data, "Mean Reversion", params, "AAPL", persist=False
+        )
+        for name, value in expected_metrics.items():
+            assert metrics[name] == pytest.approx(value, nan_ok=True)
+
+
+def test_get_rolling_means_matrix_matches_polars() -> None:
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(size=300))
+    windows = [1, 5, 20, 300, 301]
+
+    moving_averages = get_rolling_means_matrix(close, windows)
+
+    assert moving_averages.shape == (300, 5)
+    for i, window in enumerate(windows):
+        expected = (
+            pl.Series(close)
+            .rolling_mean(window_size=window, min_samples=window)
+            .fill_null(np.nan)
+            .to_numpy()
+        )
+        np.testing.assert_allclose(moving_averages[:, i], expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("has_flat_stretches", [False, True])
+def test_backtest_strategies_sweeps_moving_average_crossovers(
+    has_flat_stretches: bool,
+) -> None:
+    rng = np.random.default_rng(0)
+    num_dates = 300
+    close = 100 + np.cumsum(rng.normal(size=num_dates))
+    if has_flat_stretches:
+        # Over a flat stretch, the moving averages of every window are equal,
+        # so neither is above the other, and the price steps between the
+        # stretches.
+        for start in range(0, num_dates, 60):
+            close[start + 20 : start + 55] = round(close[start + 20], 2)
+    data = pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                for i in range(num_dates)
+            ],
+            "Close": close,
+        }
+    )
+    combinations = [
+        {"short_window": short_window, "long_window": long_window}
+        for long_window, short_window in itertools.product([20, 30, 50], [5, 10, 20])
+    ]
+
+    grid_metrics = backtest_strategies(
+        data,
+        [
+            create_strategy("Moving Average Crossover", params)
+            for params in combinations
+        ],
+    )
+
+    for params, metrics in zip(combinations, grid_metrics.iter_rows(named=True)):
+        _, expected_metrics = run_backtest(
+            data, "Moving Average Crossover", params, "AAPL", persist=False
+        )
+        for name, value in expected_metrics.items():
+            assert metrics[name] == pytest.approx(value, nan_ok=True)
@@ -0,0 +1,99 @@
+"""
+Contains tests for the collector of parameter grid search results.
+"""
+
+import itertools
+import math
+from collections.abc import Callable
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.grid_results import GridResults
+from quant_trading_strategy_backtester.optimiser import optimise_strategy_params
+
+
+def get_metrics(sharpe_ratios: list[float]) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "Total Return": [0.1] * len(sharpe_ratios),
+            "Sharpe Ratio": sharpe_ratios,
+            "Max Drawdown": [-0.05] * len(sharpe_ratios),
+        }
+    )
+
+
+def test_grid_results_keeps_every_combination_and_the_best() -> None:
+    grid_results = GridResults(["window", "std_dev"], top_k=3)
+    grid_results.add([(5, 0.5), (5, 1.0), (10, 0.5)], get_metrics([1.0, 2.0, 0.5]), 0.3)
+    grid_results.add(
+        [(10, 1.0), (15, 0.5), (15, 1.0)], get_metrics([math.nan, 2.0, 1.5]), 0.6
+    )
+
+    results = grid_results.to_frame()
+    assert len(grid_results) == 6
+    assert results.columns == [
+        "window",
+        "std_dev",
+        "Total Return",
+        "Sharpe Ratio",
+        "Max Drawdown",
+        "Evaluation Time (s)",
+    ]
+    assert results["window"].to_list() == [5, 5, 10, 10, 15, 15]
+    assert results["Evaluation Time (s)"].to_list() == pytest.approx(
+        [0.1] * 3 + [0.2] * 3
+    )
+
+    # Combinations with the same Sharpe ratio are ranked in the order they
+    # were evaluated.
+    leaderboard = grid_results.get_leaderboard()
+    assert leaderboard.columns == results.columns
+    assert leaderboard.select("window", "std_dev").rows() == [
+        (5, 1.0),
+        (15, 0.5),
+        (15, 1.0),
+    ]
+
+
+def test_grid_results_ranks_nan_sharpe_ratios_last(tmp_path) -> None:
+    grid_results = GridResults(["window"], top_k=5)
+    assert grid_results.get_leaderboard().is_empty()
+
+    grid_results.add([(5,), (10,), (15,)], get_metrics([math.nan, -1.0, 0.0]), 0.3)
+    assert grid_results.get_leaderboard()["window"].to_list() == [15, 10, 5]
+
+    path = tmp_path / "grid_results.parquet"
+    grid_results.write_parquet(path)
+    assert pl.read_parquet(path).equals(grid_results.to_frame())
+
+    with pytest.raises(ValueError, match="Invalid leaderboard size"):
+        GridResults(["window"], top_k=0)
+
+
+@pytest.mark.parametrize("persist", ["all", "none"])
+def test_optimise_strategy_params_records_every_combination(
+    mock_db_session, sine_wave_data: Callable[..., pl.DataFrame], persist: str
+) -> None:
+    data = sine_wave_data(trend=0)
+    parameter_ranges = {"short_window": [5, 10, 15], "long_window": [20, 25]}
+    grid_results = GridResults(list(parameter_ranges), top_k=2)
+
+    best_params, best_metrics = optimise_strategy_params(
+        data,
+        "Moving Average Crossover",
+        parameter_ranges,
+        "AAPL",
+        persist=persist,
+        grid_results=grid_results,
+    )
+
+    results = grid_results.to_frame()
+    assert results.select(list(parameter_ranges)).rows() == list(
+        itertools.product(*parameter_ranges.values())
+    )
+    # The leaderboard starts with the best combination.
+    best_result = grid_results.get_leaderboard().row(0, named=True)
+    assert {name: best_result[name] for name in parameter_ranges} == best_params
+    assert {name: best_result[name] for name in best_metrics} == pytest.approx(
+        best_metrics
+    )
@@ -3,6 +3,7 @@ Contains tests for optimisation functions.
 """
 
 import datetime
+import math
 from typing import Any
 
 import polars as pl
@@ -12,10 +13,13 @@ from quant_trading_strategy_backtester.app import (
     prepare_pairs_trading_strategy_with_optimisation,
     prepare_single_ticker_strategy_with_optimisation,
 )
+from quant_trading_strategy_backtester import optimiser
 from quant_trading_strategy_backtester.optimiser import (
+    get_successive_halving_rungs,
     optimise_buy_and_hold_ticker,
     optimise_pairs_trading_tickers,
     optimise_single_ticker_strategy_ticker,
+    optimise_strategy_params,
     run_backtest,
     run_optimisation,
 )
@@ -175,6 +179,15 @@ def test_optimise_pairs_trading_tickers(monkeypatch):
             "Sharpe Ratio": 1.8
         }
 
+    def mock_backtest_ticker_pairs(panel, ticker_pairs, strategy_params):
+        return pl.DataFrame(
+            {
+                "Ticker 1": [ticker1 for ticker1, _ in ticker_pairs],
+                "Ticker 2": [ticker2 for _, ticker2 in ticker_pairs],
+                "Sharpe Ratio": [1.5] * len(ticker_pairs),
+            }
+        )
+
     monkeypatch.setattr(
         "quant_trading_strategy_backtester.data.load_yfinance_data_two_tickers",
         mock_load_data,
@@ -186,6 +199,10 @@ def test_optimise_pairs_trading_tickers(monkeypatch):
         "quant_trading_strategy_backtester.optimiser.optimise_strategy_params",
         mock_optimise_strategy_params,
     )
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.backtest_ticker_pairs",
+        mock_backtest_ticker_pairs,
+    )
 
     start_date = datetime.date(2020, 1, 1)
     end_date = datetime.date(2020, 12, 31)
@@ -381,8 +398,9 @@ def test_optimise_single_ticker_strategy_ticker(monkeypatch):
         }
     )
 
-    def mock_load_data(*args, **kwargs):
-        return mock_polars_data
+    def mock_iter_data(tickers, *args, **kwargs):
+        for ticker in tickers:
+            yield ticker, mock_polars_data
 
     def mock_run_backtest(*args, **kwargs):
         strategy_type = args[1]
@@ -394,8 +412,8 @@ def test_optimise_single_ticker_strategy_ticker(monkeypatch):
             return None, {"Sharpe Ratio": 1.0}
 
     monkeypatch.setattr(
-        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_one_ticker",
-        mock_load_data,
+        "quant_trading_strategy_backtester.optimiser.iter_yfinance_data_many_tickers",
+        mock_iter_data,
     )
     monkeypatch.setattr(
         "quant_trading_strategy_backtester.optimiser.run_backtest",
@@ -532,3 +550,84 @@ def test_prepare_single_ticker_strategy_with_optimisation_no_param_optimisation(
     assert ticker_display == "AAPL"
     assert isinstance(final_params, dict)
     assert final_params == strategy_params  # Parameters should remain unchanged
+
+
+def test_get_successive_halving_rungs() -> None:
+    # Each rung scores a third as many bars after the 100 warm-up bars, and
+    # rungs scoring fewer than 20 bars are left out.
+    assert get_successive_halving_rungs(200, 1000, 100) == [133, 200, 400, 1000]
+    assert get_successive_halving_rungs(200, 1000, 0) == [37, 111, 333, 1000]
+    # Too few combinations or bars to halve.
+    assert get_successive_halving_rungs(2, 1000, 100) == [1000]
+    assert get_successive_halving_rungs(200, 150, 100) == [150]
+
+
+def test_optimise_strategy_params_by_successive_halving(monkeypatch) -> None:
+    data = pl.DataFrame(
+        {
+            "Date": [
+                datetime.date(2020, 1, 1) + datetime.timedelta(days=i)
+                for i in range(600)
+            ],
+            "Close": [
+                100 + 10 * math.sin(i / 7) + 5 * math.sin(i / 23) for i in range(600)
+            ],
+        }
+    )
+    evaluations = []
+
+    def mock_backtest_parameter_grid(data, strategy_type, param_names, combinations):
+        evaluations.append((len(data), combinations))
+        return backtest_parameter_grid(data, strategy_type, param_names, combinations)
+
+    backtest_parameter_grid = optimiser.backtest_parameter_grid
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.backtest_parameter_grid",
+        mock_backtest_parameter_grid,
+    )
+
+    parameter_ranges = {"window": range(5, 50, 5), "std_dev": [0.5, 1.0, 1.5]}
+    best_params, best_metrics = optimise_strategy_params(
+        data,
+        "Mean Reversion",
+        parameter_ranges,
+        "AAPL",
+        search_method="successive_halving",
+        use_result_cache=False,
+    )
+
+    # Each rung evaluates a third of the candidates on three times as many
+    # bars after the 45 warm-up bars, until one is evaluated on all 600.
+    assert [
+        (num_bars, len(combinations)) for num_bars, combinations in evaluations
+    ] == [
+        (65, 27),
+        (106, 9),
+        (230, 3),
+        (600, 1),
+    ]
+    # Survivors are a subset of the candidates of the rung before.
+    for (_, candidates), (_, survivors) in zip(evaluations, evaluations[1:]):
+        assert set(survivors) <= set(candidates)
+
+    # The winner is the best of the survivors on the full history.
+    final_metrics = backtest_parameter_grid(
+        data, "Mean Reversion", ["window", "std_dev"], evaluations[-1][1]
+    )
+    best_index = final_metrics["Sharpe Ratio"].arg_max()
+    assert tuple(best_params.values()) == evaluations[-1][1][best_index]
+    assert best_metrics == pytest.approx(final_metrics.row(best_index, named=True))
+
+    with pytest.raises(ValueError, match="Invalid search method"):
+        optimise_strategy_params(
+            data, "Mean Reversion", parameter_ranges, "AAPL", search_method="random"
+        )
+    with pytest.raises(ValueError, match="Only a grid search"):
+        optimise_strategy_params(
+            data,
+            "Mean Reversion",
+            parameter_ranges,
+            "AAPL",
+            persist="all",
+            search_method="successive_halving",
+        )
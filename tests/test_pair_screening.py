@@ -0,0 +1,170 @@
+"""
+Contains tests for the screening of ticker pairs for pairs trading.
+"""
+
+import datetime
+
+import numpy as np
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.anytime import CoverageReport, Deadline
+from quant_trading_strategy_backtester.grid_backtester import backtest_ticker_pairs
+from quant_trading_strategy_backtester.optimiser import optimise_pairs_trading_tickers
+from quant_trading_strategy_backtester.pair_screening import (
+    get_pair_statistics,
+    screen_ticker_pairs,
+    select_candidate_pairs,
+)
+
+
+@pytest.fixture
+def prices_panel() -> pl.DataFrame:
+    # COINT is cointegrated with BASE, while WALK wanders off on its own and
+    # only starts trading on the 21st day.
+    rng = np.random.default_rng(0)
+    num_dates = 300
+    base = 100 + np.cumsum(rng.normal(size=num_dates))
+    walk = 50 + np.cumsum(rng.normal(size=num_dates))
+    walk[:20] = np.nan
+    return pl.DataFrame(
+        {
+            "Date": pl.datetime_range(
+                datetime.datetime(2020, 1, 1),
+                datetime.datetime(2020, 1, 1) + datetime.timedelta(days=num_dates - 1),
+                interval="1d",
+                eager=True,
+            ),
+            "BASE": base,
+            "COINT": 2 * base + 5 + rng.normal(size=num_dates),
+            "WALK": walk,
+        }
+    )
+
+
+def get_reference_statistics(y: np.ndarray, x: np.ndarray) -> tuple[float, float]:
+    # Runs the regressions of the Engle-Granger test for one pair directly.
+    traded = ~np.isnan(y) & ~np.isnan(x)
+    beta, alpha = np.polyfit(x[traded], y[traded], 1)
+    residuals = y - alpha - beta * x
+    changed = traded[1:] & traded[:-1]
+    change = (residuals[1:] - residuals[:-1])[changed]
+    previous = residuals[:-1][changed]
+    gamma = change @ previous / (previous @ previous)
+    residual_variance = ((change - gamma * previous) ** 2).sum() / (len(change) - 1)
+    statistic = gamma / np.sqrt(residual_variance / (previous @ previous))
+
+    returns_y = (y[1:] / y[:-1] - 1)[changed]
+    returns_x = (x[1:] / x[:-1] - 1)[changed]
+    return np.corrcoef(returns_y, returns_x)[0, 1], statistic
+
+
+def test_get_pair_statistics_matches_pairwise_regressions(
+    prices_panel: pl.DataFrame,
+) -> None:
+    prices = prices_panel.select("BASE", "COINT", "WALK").to_numpy()
+    correlation, statistic, observations = get_pair_statistics(prices)
+
+    for i, j in [(0, 1), (1, 0), (0, 2), (2, 1)]:
+        expected_correlation, expected_statistic = get_reference_statistics(
+            prices[:, i], prices[:, j]
+        )
+        assert correlation[i, j] == pytest.approx(expected_correlation)
+        assert statistic[i, j] == pytest.approx(expected_statistic)
+    assert observations[0, 1] == 300
+    assert observations[0, 2] == 280
+
+
+def test_screen_ticker_pairs_ranks_cointegrated_pairs_first(
+    prices_panel: pl.DataFrame,
+) -> None:
+    ticker_pairs = [("BASE", "WALK"), ("BASE", "COINT"), ("COINT", "WALK")]
+    screened = screen_ticker_pairs(prices_panel, [*ticker_pairs, ("BASE", "AMZN")])
+
+    assert screened.columns == [
+        "Ticker 1",
+        "Ticker 2",
+        "Correlation",
+        "Cointegration Statistic",
+        "Observations",
+    ]
+    # Pairs with a ticker missing from the panel are left out.
+    assert len(screened) == 3
+    assert screened.row(0)[:2] == ("BASE", "COINT")
+    assert screened["Cointegration Statistic"].is_sorted()
+
+    assert select_candidate_pairs(prices_panel, ticker_pairs, 1) == [("BASE", "COINT")]
+    # The selected pairs keep the order given.
+    assert select_candidate_pairs(prices_panel, ticker_pairs, 3) == ticker_pairs
+    with pytest.raises(ValueError, match="Invalid number of candidate pairs"):
+        select_candidate_pairs(prices_panel, ticker_pairs, 0)
+
+
+def test_optimise_pairs_trading_tickers_backtests_screened_pairs(
+    monkeypatch, prices_panel: pl.DataFrame
+) -> None:
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        lambda *args, **kwargs: prices_panel,
+    )
+    backtested_pairs = []
+
+    def mock_backtest_ticker_pairs(panel, ticker_pairs, strategy_params):
+        backtested_pairs.extend(ticker_pairs)
+        return backtest_ticker_pairs(panel, ticker_pairs, strategy_params)
+
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.backtest_ticker_pairs",
+        mock_backtest_ticker_pairs,
+    )
+
+    best_pair, _, _ = optimise_pairs_trading_tickers(
+        [("BASE", 3.0), ("COINT", 2.0), ("WALK", 1.0)],
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 10, 26),
+        {"window": 20, "entry_z_score": 2.0, "exit_z_score": 0.5},
+        False,
+        num_candidate_pairs=1,
+    )
+    assert backtested_pairs == [("BASE", "COINT")]
+    assert best_pair == ("BASE", "COINT")
+
+
+def test_optimise_pairs_trading_tickers_backtests_cointegrated_pairs_first(
+    monkeypatch, prices_panel: pl.DataFrame
+) -> None:
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        lambda *args, **kwargs: prices_panel,
+    )
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.ANYTIME_PAIRS_BLOCK_SIZE", 1
+    )
+    backtested_pairs = []
+
+    def mock_backtest_ticker_pairs(panel, ticker_pairs, strategy_params):
+        backtested_pairs.extend(ticker_pairs)
+        return backtest_ticker_pairs(panel, ticker_pairs, strategy_params)
+
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.backtest_ticker_pairs",
+        mock_backtest_ticker_pairs,
+    )
+
+    # The most cointegrated pair is backtested first, so it's the one found
+    # when the optimisation is cancelled straight away.
+    deadline = Deadline()
+    deadline.cancel()
+    coverage = CoverageReport()
+    best_pair, _, _ = optimise_pairs_trading_tickers(
+        [("WALK", 3.0), ("BASE", 2.0), ("COINT", 1.0)],
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 10, 26),
+        {"window": 20, "entry_z_score": 2.0, "exit_z_score": 0.5},
+        False,
+        deadline=deadline,
+        coverage=coverage,
+    )
+    assert backtested_pairs == [("BASE", "COINT")]
+    assert best_pair == ("BASE", "COINT")
+    assert (coverage.num_evaluated, coverage.num_planned) == (1, 3)
+    assert coverage.stop_reason == "cancelled"
@@ -0,0 +1,176 @@
+"""
+Contains tests for running optimisations in a pool of worker processes.
+"""
+
+import datetime
+import os
+from collections.abc import Callable
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.optimiser import (
+    optimise_pairs_trading_tickers,
+    optimise_strategy_params,
+)
+from quant_trading_strategy_backtester.parallel import (
+    get_num_workers,
+    run_in_process_pool,
+    split_into_chunks,
+)
+
+
+def test_split_into_chunks() -> None:
+    assert split_into_chunks(list(range(10)), 3) == [
+        [0, 1, 2, 3],
+        [4, 5, 6, 7],
+        [8, 9],
+    ]
+    assert split_into_chunks([1, 2], 4) == [[1], [2]]
+    assert split_into_chunks([], 4) == []
+
+
+def test_get_num_workers() -> None:
+    assert get_num_workers(3) == 3
+    assert get_num_workers(-1) >= 1
+    with pytest.raises(ValueError, match="Invalid number of jobs"):
+        get_num_workers(0)
+
+
+def _get_polars_max_threads() -> str | None:
+    return os.environ.get("POLARS_MAX_THREADS")
+
+
+def test_run_in_process_pool_sets_polars_threads_in_workers(monkeypatch) -> None:
+    monkeypatch.delenv("POLARS_MAX_THREADS", raising=False)
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+
+    results = run_in_process_pool(_get_polars_max_threads, [(), ()], {}, n_jobs=2)
+
+    # The CPUs are split between the workers, without changing the parent
+    # process's environment.
+    assert results == ["2", "2"]
+    assert "POLARS_MAX_THREADS" not in os.environ
+
+
+def test_optimise_strategy_params_in_process_pool_matches_serial(
+    sine_wave_data: Callable[..., pl.DataFrame],
+) -> None:
+    data = sine_wave_data()
+    parameter_ranges = {"window": range(5, 31, 5), "std_dev": [0.5, 1.0, 2.0]}
+
+    serial_params, serial_metrics = optimise_strategy_params(
+        data, "Mean Reversion", parameter_ranges, "AAPL"
+    )
+    parallel_params, parallel_metrics = optimise_strategy_params(
+        data, "Mean Reversion", parameter_ranges, "AAPL", n_jobs=2
+    )
+
+    assert parallel_params == serial_params
+    assert parallel_metrics == pytest.approx(serial_metrics)
+
+
+@pytest.mark.parametrize("optimise", [True, False])
+def test_optimise_pairs_trading_tickers_in_process_pool_matches_serial(
+    monkeypatch,
+    sine_wave_data: Callable[..., pl.DataFrame],
+    sine_wave_closes: dict[str, pl.Series],
+    optimise: bool,
+) -> None:
+    closes = {ticker: sine_wave_closes[ticker] for ticker in ("AAPL", "GOOGL", "MSFT")}
+
+    def mock_load_panel(tickers, *args, **kwargs):
+        return pl.DataFrame(
+            {"Date": sine_wave_data()["Date"]}
+            | {ticker: closes[ticker] for ticker in tickers}
+        )
+
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        mock_load_panel,
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in closes]
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 12, 31)
+    if optimise:
+        strategy_params = {
+            "window": [10, 20, 30],
+            "entry_z_score": [1.0, 2.0],
+            "exit_z_score": 0.5,
+        }
+    else:
+        strategy_params = {"window": 20, "entry_z_score": 1.0, "exit_z_score": 0.5}
+
+    serial_pair, serial_params, serial_metrics = optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, optimise
+    )
+    parallel_pair, parallel_params, parallel_metrics = optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, optimise, n_jobs=2
+    )
+
+    assert parallel_pair == serial_pair
+    assert parallel_params == serial_params
+    assert parallel_metrics == pytest.approx(serial_metrics)
+
+
+def test_optimise_pairs_trading_tickers_skips_pairs_that_fail(
+    monkeypatch,
+    sine_wave_data: Callable[..., pl.DataFrame],
+    sine_wave_closes: dict[str, pl.Series],
+) -> None:
+    # No parameters give a valid Sharpe ratio for the pair with flat prices.
+    flat_closes = pl.Series([100.0] * len(sine_wave_closes["AAPL"]))
+    closes = {
+        "AAPL": sine_wave_closes["AAPL"],
+        "FLAT1": flat_closes,
+        "FLAT2": flat_closes / 2,
+        "GOOGL": sine_wave_closes["GOOGL"],
+    }
+
+    def mock_load_panel(tickers, *args, **kwargs):
+        return pl.DataFrame(
+            {"Date": sine_wave_data()["Date"]}
+            | {ticker: closes[ticker] for ticker in tickers}
+        )
+
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.load_yfinance_data_panel",
+        mock_load_panel,
+    )
+    top_companies = [(ticker, 1000000.0) for ticker in closes]
+    start_date = datetime.date(2020, 1, 1)
+    end_date = datetime.date(2020, 12, 31)
+    strategy_params = {
+        "window": [10, 20],
+        "entry_z_score": [1.0, 2.0],
+        "exit_z_score": 0.5,
+    }
+
+    # The pair is skipped rather than failing the whole optimisation.
+    serial_pair, serial_params, serial_metrics = optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, True
+    )
+    parallel_pair, parallel_params, parallel_metrics = optimise_pairs_trading_tickers(
+        top_companies, start_date, end_date, strategy_params, True, n_jobs=2
+    )
+
+    assert serial_pair != ("FLAT1", "FLAT2")
+    assert parallel_pair == serial_pair
+    assert parallel_params == serial_params
+    assert parallel_metrics == pytest.approx(serial_metrics)
+
+
+def test_run_in_process_pool_stops_early() -> None:
+    # Once asked to stop, the tasks that haven't started are cancelled, while
+    # those already running are left to finish.
+    num_done = []
+    results = run_in_process_pool(
+        sum,
+        [(range(10**7),)] * 8,
+        {},
+        1,
+        on_task_done=num_done.append,
+        should_stop=lambda: bool(num_done),
+    )
+    assert len(results) == 8
+    assert results[0] == sum(range(10**7))
+    assert results[-1] is None
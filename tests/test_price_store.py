@@ -0,0 +1,202 @@
+"""
+Contains tests for the local price store.
+"""
+
+import datetime
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.price_store import (
+    ADJUSTMENT_CHECK_OVERLAP,
+    PriceStore,
+    extend_range,
+    get_missing_ranges,
+)
+
+
+class MockFetcher:
+    """
+    Generates a daily price for every date requested, and records the
+    requests made.
+    """
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, datetime.date, datetime.date]] = []
+        self.offline = False
+        # The factor the provider currently adjusts the prices by.
+        self.adjustment = 1.0
+
+    def __call__(
+        self, ticker: str, start_date: datetime.date, end_date: datetime.date
+    ) -> pl.DataFrame:
+        if self.offline:
+            raise ConnectionError("No network connection")
+        self.requests.append((ticker, start_date, end_date))
+        dates = pl.datetime_range(
+            start_date, end_date, interval="1d", time_unit="ns", eager=True
+        )
+        return pl.DataFrame(
+            {
+                "Date": dates,
+                "Close": [float(date.toordinal()) * self.adjustment for date in dates],
+            }
+        )
+
+
+def date(day: int) -> datetime.date:
+    return datetime.date(2020, 1, 1) + datetime.timedelta(days=day)
+
+
+def test_price_store_fetches_only_missing_ranges(tmp_path) -> None:
+    fetcher = MockFetcher()
+    store = PriceStore(tmp_path, fetcher)
+
+    prices = store.load("AAPL", date(10), date(19))
+    assert len(prices) == 10
+    assert fetcher.requests == [("AAPL", date(10), date(19))]
+
+    # A range inside the fetched range is sliced from the stored prices.
+    prices = store.load("AAPL", date(12), date(15))
+    assert prices["Date"].dt.date().to_list() == [date(i) for i in range(12, 16)]
+    assert len(fetcher.requests) == 1
+
+    # A wider range only fetches the missing head and tail, overlapping the
+    # stored prices to check that they haven't been adjusted since.
+    prices = store.load("AAPL", date(5), date(24))
+    assert len(prices) == 20
+    assert prices["Date"].is_sorted()
+    assert fetcher.requests[1:] == [
+        ("AAPL", date(5), date(16)),
+        ("AAPL", date(13), date(24)),
+    ]
+    assert store.get_fetched_range("AAPL") == (date(5), date(24))
+
+
+def test_price_store_persists_between_instances(tmp_path) -> None:
+    fetcher = MockFetcher()
+    PriceStore(tmp_path, fetcher).load("AAPL", date(0), date(9))
+    assert list(tmp_path.glob("*.parquet")) == [tmp_path / "AAPL.parquet"]
+
+    # A new store on the same directory works offline once the prices are
+    # stored.
+    fetcher.offline = True
+    prices = PriceStore(tmp_path, fetcher).load("AAPL", date(0), date(9))
+    assert len(prices) == 10
+
+
+def test_price_store_uses_stored_prices_when_fetching_fails(tmp_path) -> None:
+    fetcher = MockFetcher()
+    store = PriceStore(tmp_path, fetcher)
+    store.load("AAPL", date(0), date(9))
+
+    fetcher.offline = True
+    prices = store.load("AAPL", date(5), date(14))
+    assert len(prices) == 5
+    assert store.get_fetched_range("AAPL") == (date(0), date(9))
+
+    assert store.load("MSFT", date(0), date(9)).is_empty()
+    assert store.get_fetched_range("MSFT") is None
+
+
+def test_price_store_records_ranges_without_prices(tmp_path) -> None:
+    fetcher = MockFetcher()
+
+    def fetch_prices(ticker, start_date, end_date):
+        # The ticker only listed on day 5.
+        prices = fetcher(ticker, start_date, end_date)
+        return prices.filter(pl.col("Date").dt.date() >= date(5))
+
+    store = PriceStore(tmp_path, fetch_prices)
+    assert store.load("AAPL", date(0), date(4)).is_empty()
+    assert store.get_fetched_range("AAPL") == (date(0), date(4))
+    assert len(store.load("AAPL", date(0), date(9))) == 5
+
+    # Once fetched, the range before the listing loads without a request.
+    fetcher.offline = True
+    assert len(store.load("AAPL", date(0), date(9))) == 5
+    assert store.get_fetched_range("AAPL") == (date(0), date(9))
+
+
+def test_price_store_refetches_adjusted_prices(tmp_path) -> None:
+    fetcher = MockFetcher()
+    store = PriceStore(tmp_path, fetcher)
+    store.load("AAPL", date(10), date(19))
+
+    # A split halves the provider's prices of every date before it, so the
+    # overlap of the tail with the stored prices has a different scale.
+    fetcher.adjustment = 0.5
+    prices = store.load("AAPL", date(10), date(24))
+    assert fetcher.requests[1:] == [
+        ("AAPL", date(13), date(24)),
+        ("AAPL", date(10), date(24)),
+    ]
+    # The whole history is on the new basis, without a jump at the join.
+    assert prices["Close"].to_list() == [
+        date(i).toordinal() * 0.5 for i in range(10, 25)
+    ]
+    assert store.get_fetched_range("AAPL") == (date(10), date(24))
+
+    # The refetched prices are stored, so they can be loaded offline.
+    fetcher.offline = True
+    assert store.load("AAPL", date(10), date(24)).equals(prices)
+
+
+def test_price_store_load_many_fetches_tickers_together(tmp_path) -> None:
+    fetcher = MockFetcher()
+    bulk_requests = []
+
+    def fetch_many_prices(tickers, start_date, end_date):
+        bulk_requests.append((tickers, start_date, end_date))
+        return {ticker: fetcher(ticker, start_date, end_date) for ticker in tickers}
+
+    store = PriceStore(tmp_path, fetcher, fetch_many_prices)
+    store.load("AAPL", date(0), date(9))
+
+    prices = store.load_many(["AAPL", "MSFT", "GOOGL"], date(0), date(14))
+    assert all(len(prices[ticker]) == 15 for ticker in ("AAPL", "MSFT", "GOOGL"))
+    # Tickers missing the same dates are fetched in one request.
+    assert bulk_requests == [
+        (["AAPL"], date(10) - ADJUSTMENT_CHECK_OVERLAP, date(14)),
+        (["MSFT", "GOOGL"], date(0), date(14)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "fetched_range,expected_ranges",
+    [
+        (None, [(date(10), date(19))]),
+        ((date(10), date(19)), []),
+        ((date(0), date(14)), [(date(15), date(19))]),
+        ((date(15), date(29)), [(date(10), date(14))]),
+        ((date(12), date(15)), [(date(10), date(11)), (date(16), date(19))]),
+        # The gap to a range that was fetched earlier is fetched as well.
+        ((date(0), date(4)), [(date(5), date(19))]),
+    ],
+)
+def test_get_missing_ranges(
+    fetched_range: tuple[datetime.date, datetime.date] | None,
+    expected_ranges: list[tuple[datetime.date, datetime.date]],
+) -> None:
+    assert get_missing_ranges(fetched_range, date(10), date(19)) == expected_ranges
+
+
+def test_get_missing_ranges_overlap_the_fetched_range() -> None:
+    overlap = datetime.timedelta(days=2)
+    assert get_missing_ranges((date(12), date(15)), date(10), date(19), overlap) == [
+        (date(10), date(13)),
+        (date(14), date(19)),
+    ]
+    # The overlap doesn't extend past the fetched range.
+    assert get_missing_ranges((date(12), date(12)), date(10), date(19), overlap) == [
+        (date(10), date(12)),
+        (date(12), date(19)),
+    ]
+
+
+def test_extend_range_excludes_today() -> None:
+    today = datetime.date.today()
+    yesterday = today - datetime.timedelta(days=1)
+
+    assert extend_range(None, date(0), date(9)) == (date(0), date(9))
+    assert extend_range((date(0), date(9)), date(10), today) == (date(0), yesterday)
+    assert extend_range(None, today, today) is None
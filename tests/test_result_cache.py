@@ -0,0 +1,176 @@
+"""
+Contains tests for the persistent cache of optimisation results.
+"""
+
+import math
+from collections.abc import Callable
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester import optimiser, result_cache
+from quant_trading_strategy_backtester.optimiser import optimise_strategy_params
+from quant_trading_strategy_backtester.result_cache import (
+    cache_results,
+    get_cached_results,
+    get_price_data_fingerprint,
+    get_result_cache_keys,
+)
+
+
+@pytest.fixture
+def sine_data(sine_wave_data: Callable[..., pl.DataFrame]) -> pl.DataFrame:
+    return sine_wave_data(trend=0)
+
+
+def test_cache_keys_depend_on_data_strategy_and_params(
+    sine_data: pl.DataFrame,
+) -> None:
+    # The fingerprint doesn't depend on how the data is chunked in memory.
+    chunked = pl.concat([sine_data.head(50), sine_data.tail(70)], rechunk=False)
+    assert get_price_data_fingerprint(chunked) == get_price_data_fingerprint(sine_data)
+    assert get_price_data_fingerprint(
+        sine_data.with_columns(pl.col("Close") * 2)
+    ) != get_price_data_fingerprint(sine_data)
+
+    keys = get_result_cache_keys(
+        sine_data,
+        "Mean Reversion",
+        ["window", "std_dev"],
+        [(20, 2), (20.0, 2.0), (20, 1.5)],
+    )
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+    assert (
+        get_result_cache_keys(
+            sine_data, "Mean Reversion", ["std_dev", "window"], [(2, 20)]
+        )
+        == keys[:1]
+    )
+    assert (
+        get_result_cache_keys(
+            sine_data, "Moving Average Crossover", ["window", "std_dev"], [(20, 2)]
+        )
+        != keys[:1]
+    )
+
+
+def test_cache_results_round_trip(sine_data: pl.DataFrame) -> None:
+    keys = get_result_cache_keys(sine_data, "Mean Reversion", ["window"], [(5,), (10,)])
+    metrics = pl.DataFrame(
+        {
+            "Total Return": [0.1, 0.0],
+            "Sharpe Ratio": [1.5, math.nan],
+            "Max Drawdown": [-0.05, 0.0],
+        }
+    )
+    cache_results("Mean Reversion", ["window"], [(5,), (10,)], keys, metrics)
+    # Results that are already cached are left as they are.
+    cache_results(
+        "Mean Reversion",
+        ["window"],
+        [(5,)],
+        keys[:1],
+        metrics.with_columns(pl.lit(9.0).alias("Sharpe Ratio")),
+    )
+
+    cached = get_cached_results([*keys, "missing"])
+    assert set(cached) == set(keys)
+    assert cached[keys[0]] == {
+        "Total Return": 0.1,
+        "Sharpe Ratio": 1.5,
+        "Max Drawdown": -0.05,
+    }
+    assert math.isnan(cached[keys[1]]["Sharpe Ratio"])
+
+
+def test_cache_results_evicts_the_oldest_results(sine_data: pl.DataFrame) -> None:
+    combinations = [(5,), (10,), (15,)]
+    keys = get_result_cache_keys(sine_data, "Mean Reversion", ["window"], combinations)
+    metrics = pl.DataFrame(
+        {"Total Return": [0.1], "Sharpe Ratio": [1.5], "Max Drawdown": [-0.05]}
+    )
+    for combination, key in zip(combinations, keys):
+        cache_results(
+            "Mean Reversion",
+            ["window"],
+            [combination],
+            [key],
+            metrics,
+            max_results=2,
+            eviction_check_interval=1,
+        )
+
+    assert set(get_cached_results(keys)) == set(keys[1:])
+
+
+def test_cache_results_only_checks_for_eviction_periodically(
+    monkeypatch, sine_data: pl.DataFrame
+) -> None:
+    monkeypatch.setattr(result_cache, "_num_added_since_eviction_check", 0)
+    combinations = [(5,), (10,), (15,)]
+    keys = get_result_cache_keys(sine_data, "Mean Reversion", ["window"], combinations)
+    metrics = pl.DataFrame(
+        {"Total Return": [0.1], "Sharpe Ratio": [1.5], "Max Drawdown": [-0.05]}
+    )
+
+    def cache(combination: tuple, key: str) -> None:
+        cache_results(
+            "Mean Reversion",
+            ["window"],
+            [combination],
+            [key],
+            metrics,
+            max_results=1,
+            eviction_check_interval=3,
+        )
+
+    cache(combinations[0], keys[0])
+    cache(combinations[1], keys[1])
+    # Results that were already cached don't count towards the next check.
+    cache(combinations[0], keys[0])
+    assert set(get_cached_results(keys)) == set(keys[:2])
+
+    # The third result added triggers a check, which evicts all but the
+    # result cached last.
+    cache(combinations[2], keys[2])
+    assert set(get_cached_results(keys)) == {keys[2]}
+
+
+def test_optimise_strategy_params_only_evaluates_uncached_combinations(
+    monkeypatch, sine_data: pl.DataFrame
+) -> None:
+    evaluated = []
+
+    def mock_backtest_parameter_grid(data, strategy_type, param_names, combinations):
+        evaluated.append(combinations)
+        return backtest_parameter_grid(data, strategy_type, param_names, combinations)
+
+    backtest_parameter_grid = optimiser.backtest_parameter_grid
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.optimiser.backtest_parameter_grid",
+        mock_backtest_parameter_grid,
+    )
+
+    optimise_strategy_params(
+        sine_data,
+        "Moving Average Crossover",
+        {"short_window": [5, 10], "long_window": [20, 25]},
+        "AAPL",
+    )
+    # Widening the grid only evaluates the new combinations.
+    parameter_ranges = {"short_window": [5, 10, 15], "long_window": [20, 25]}
+    best_params, best_metrics = optimise_strategy_params(
+        sine_data, "Moving Average Crossover", parameter_ranges, "AAPL"
+    )
+    assert evaluated[1] == [(15, 20), (15, 25)]
+
+    expected_params, expected_metrics = optimise_strategy_params(
+        sine_data,
+        "Moving Average Crossover",
+        parameter_ranges,
+        "AAPL",
+        use_result_cache=False,
+    )
+    assert len(evaluated[2]) == 6
+    assert best_params == expected_params
+    assert best_metrics == pytest.approx(expected_metrics)
@@ -0,0 +1,152 @@
+"""
+Contains tests for the write-behind results writer.
+"""
+
+import datetime
+import time
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.backtester import Backtester
+from quant_trading_strategy_backtester.models import StrategyModel
+from quant_trading_strategy_backtester.results_writer import (
+    ResultsWriter,
+    make_result_row,
+)
+from quant_trading_strategy_backtester.strategies.moving_average_crossover import (
+    MovingAverageCrossoverStrategy,
+)
+from sqlalchemy.exc import OperationalError
+
+MOCK_METRICS = {"Total Return": 0.1, "Sharpe Ratio": 1.2, "Max Drawdown": -0.05}
+
+
+def make_row(params: dict) -> dict:
+    return make_result_row(
+        "MovingAverageCrossoverStrategy",
+        params,
+        MOCK_METRICS,
+        "AAPL",
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 1, 31),
+    )
+
+
+def test_results_writer_flush_writes_batches(mock_db_session):
+    writer = ResultsWriter(
+        session_factory=lambda: mock_db_session, batch_size=2, flush_interval=None
+    )
+    for short_window in range(5):
+        writer.enqueue(make_row({"short_window": short_window, "long_window": 20}))
+
+    assert writer.pending() == 5
+    assert mock_db_session.query(StrategyModel).count() == 0
+
+    assert writer.flush() == 5
+    assert writer.pending() == 0
+    assert mock_db_session.query(StrategyModel).count() == 5
+
+
+def test_results_writer_skips_duplicates(mock_db_session):
+    writer = ResultsWriter(session_factory=lambda: mock_db_session, flush_interval=None)
+    row = make_row({"short_window": 5, "long_window": 20})
+    writer.enqueue(row)
+    writer.enqueue(row)
+    assert writer.flush() == 1
+
+    writer.enqueue(row)
+    assert writer.flush() == 0
+    saved_strategy = mock_db_session.query(StrategyModel).one()
+    assert saved_strategy.parameters == '{"short_window": 5, "long_window": 20}'
+    assert saved_strategy.total_return == MOCK_METRICS["Total Return"]
+
+
+def make_flaky_session_factory(session, num_failures: int):
+    # Fails to open a session the given number of times, as if the database
+    # were locked, and then opens the given session.
+    num_calls = 0
+
+    def session_factory():
+        nonlocal num_calls
+        num_calls += 1
+        if num_calls <= num_failures:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return session
+
+    return session_factory
+
+
+def test_results_writer_keeps_rows_when_flushing_fails(mock_db_session):
+    writer = ResultsWriter(
+        session_factory=make_flaky_session_factory(mock_db_session, 1),
+        batch_size=2,
+        flush_interval=None,
+    )
+    for short_window in range(3):
+        writer.enqueue(make_row({"short_window": short_window, "long_window": 20}))
+
+    with pytest.raises(OperationalError, match="database is locked"):
+        writer.flush()
+    assert writer.pending() == 3
+
+    assert writer.flush() == 3
+    assert writer.pending() == 0
+    assert mock_db_session.query(StrategyModel).count() == 3
+
+
+def test_results_writer_retries_rows_in_the_background(mock_db_session):
+    writer = ResultsWriter(
+        session_factory=make_flaky_session_factory(mock_db_session, 2),
+        batch_size=2,
+        flush_interval=0.01,
+    )
+    for short_window in range(3):
+        writer.enqueue(make_row({"short_window": short_window, "long_window": 20}))
+
+    # The background thread keeps the rows of the failed drains, and writes
+    # them once the database is available again.
+    deadline = time.monotonic() + 5
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert mock_db_session.query(StrategyModel).count() == 3
+
+
+def test_backtester_queues_results_on_writer(
+    monkeypatch, mock_db_session, mock_polars_data: pl.DataFrame
+):
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.backtester.is_running_locally",
+        lambda: True,
+    )
+    writer = ResultsWriter(session_factory=lambda: mock_db_session, flush_interval=None)
+    strategy = MovingAverageCrossoverStrategy({"short_window": 5, "long_window": 20})
+    Backtester(
+        mock_polars_data,
+        strategy,
+        session=mock_db_session,
+        tickers="AAPL",
+        results_writer=writer,
+    ).run()
+
+    assert writer.pending() == 1
+    assert mock_db_session.query(StrategyModel).count() == 0
+    writer.close()
+    assert mock_db_session.query(StrategyModel).count() == 1
+
+
+def test_backtester_without_persistence(
+    monkeypatch, mock_db_session, mock_polars_data: pl.DataFrame
+):
+    monkeypatch.setattr(
+        "quant_trading_strategy_backtester.backtester.is_running_locally",
+        lambda: True,
+    )
+    strategy = MovingAverageCrossoverStrategy({"short_window": 5, "long_window": 20})
+    backtester = Backtester(
+        mock_polars_data, strategy, session=mock_db_session, persist=False
+    )
+    backtester.run()
+
+    assert backtester.get_performance_metrics() is not None
+    assert mock_db_session.query(StrategyModel).count() == 0
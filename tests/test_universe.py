@@ -0,0 +1,98 @@
+"""
+Contains tests for the S&P 500 universe snapshots.
+"""
+
+import datetime
+from pathlib import Path
+
+import polars as pl
+import pytest
+from quant_trading_strategy_backtester.data import (
+    fetch_sp500_snapshot,
+    get_sp500_snapshot,
+    get_top_sp500_companies,
+)
+from quant_trading_strategy_backtester.universe import UniverseSnapshotStore
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "sp500_constituents.csv"
+
+
+@pytest.fixture
+def sp500_fixture_source(monkeypatch) -> None:
+    monkeypatch.setenv("SP500_SOURCE", str(FIXTURE_PATH))
+
+
+def test_fetch_sp500_snapshot_from_fixture() -> None:
+    snapshot = fetch_sp500_snapshot(str(FIXTURE_PATH))
+
+    assert snapshot.columns == ["Ticker", "Market Cap"]
+    assert len(snapshot) == 12
+    assert snapshot["Market Cap"].is_sorted(descending=True)
+    assert snapshot["Ticker"].head(3).to_list() == ["AAPL", "NVDA", "MSFT"]
+    # Companies with the same market cap keep their order in the source.
+    assert snapshot["Ticker"].to_list().index("GOOGL") == 4
+    assert snapshot["Ticker"].to_list().index("GOOG") == 5
+
+
+def test_fetch_sp500_snapshot_fetches_missing_market_caps(
+    monkeypatch, tmp_path
+) -> None:
+    source = tmp_path / "constituents.csv"
+    source.write_text("Symbol,Security\nAAPL,Apple Inc.\nMSFT,Microsoft\nXYZ,XYZ\n")
+    market_caps = {"AAPL": 3.0e12, "MSFT": 3.1e12}
+
+    class MockTicker:
+        def __init__(self, ticker):
+            self.info = {"marketCap": market_caps.get(ticker)}
+
+    monkeypatch.setattr("yfinance.Ticker", MockTicker)
+
+    snapshot = fetch_sp500_snapshot(str(source))
+    assert list(snapshot.iter_rows()) == [("MSFT", 3.1e12), ("AAPL", 3.0e12)]
+
+
+def test_get_sp500_snapshot_reuses_latest_snapshot(
+    monkeypatch, sp500_fixture_source
+) -> None:
+    snapshot = get_sp500_snapshot()
+
+    # The snapshot is reused without reading the source again.
+    monkeypatch.setenv("SP500_SOURCE", "missing.csv")
+    assert get_sp500_snapshot().equals(snapshot)
+
+    # Refreshing falls back to the latest snapshot if the source fails.
+    assert get_sp500_snapshot(refresh=True).equals(snapshot)
+
+
+def test_get_sp500_snapshot_refreshes_old_snapshot(
+    tmp_path, sp500_fixture_source
+) -> None:
+    snapshot_store = UniverseSnapshotStore(tmp_path / "universe_snapshots", "sp500")
+    old_date = datetime.date.today() - datetime.timedelta(days=30)
+    old_snapshot = pl.DataFrame({"Ticker": ["IBM"], "Market Cap": [1.0e11]})
+    snapshot_store.save(old_snapshot, old_date)
+
+    snapshot = get_sp500_snapshot()
+    assert len(snapshot) == 12
+    assert snapshot_store.list_dates() == [old_date, datetime.date.today()]
+    # Older snapshots are kept.
+    assert snapshot_store.load(old_date).equals(old_snapshot)
+
+
+def test_get_top_sp500_companies_from_snapshot(sp500_fixture_source) -> None:
+    get_top_sp500_companies.clear()
+    try:
+        assert get_top_sp500_companies(3) == [
+            ("AAPL", 3.4e12),
+            ("NVDA", 3.3e12),
+            ("MSFT", 3.1e12),
+        ]
+        assert len(get_top_sp500_companies(0)) == 12
+    finally:
+        get_top_sp500_companies.clear()
+
+
+def test_fetch_sp500_snapshot_normalises_tickers() -> None:
+    snapshot = fetch_sp500_snapshot(str(FIXTURE_PATH))
+    assert "BRK-B" in snapshot["Ticker"].to_list()
+    assert "BRK.B" not in snapshot["Ticker"].to_list()